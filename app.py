@@ -4,15 +4,16 @@ import re
 import json
 import math
 from pathlib import Path
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Iterator
 
 import pandas as pd
 import streamlit as st
-import plotly.express as px
 
-from baiten_api import search_baiten_post
-from data_utils import normalize_baiten_payload, build_dataframe, REQUIRED_COLUMNS
-from fee_monitor import render_monitor_management_ui, add_fees_to_monitor
+from baiten_api import search_baiten_post, DEFAULT_APP_KEY, DEFAULT_APP_SECRET
+from data_utils import normalize_baiten_payload, build_dataframe, apply_filters, dashboard_aggregates, result_styles, REQUIRED_COLUMNS
+from fee_monitor import render_monitor_management_ui, add_fees_to_monitor, session_monitor
+from result_store import ResultHandle, get_store
+import timing
 
 cnipa_module = None
 try:
@@ -41,8 +42,19 @@ except Exception as e:
 st.set_page_config(page_title="企南针 · 中国专利检索与监控", layout="wide")
 
 # 固定密钥
-APP_KEY = "n3krd7sx4vks2fip"
-APP_SECRET = "5df54358-2885-4cde-9254-e7916cecbe69"
+APP_KEY = DEFAULT_APP_KEY
+APP_SECRET = DEFAULT_APP_SECRET
+# 本地数据集模式下列表最多显示的行数（筛选与仪表盘统计仍基于全部命中记录）
+DATASET_VIEW_LIMIT = int(os.getenv("PATENT_DATASET_VIEW_LIMIT", "5000"))
+# 超过该行数的结果表格不着色、改用列配置渲染（Styler 序列化耗时随单元格数线性增长，且受 styler.render.max_elements 限制）
+STYLE_MAX_ROWS = int(os.getenv("PATENT_STYLE_MAX_ROWS", "5000"))
+# 耗时统计为进程级，清空会影响所有会话与退出时的 PATENT_FEE_TIMING_DUMP；仅在服务端显式允许时显示“清空统计”
+TIMING_RESET_ENABLED = os.getenv("PATENT_FEE_TIMING_RESET", "").strip() not in ("", "0", "false", "False")
+RESULT_COLUMN_CONFIG = {
+    "专利号": st.column_config.TextColumn("专利号", width="medium"),
+    "专利类型": st.column_config.TextColumn("专利类型", width="small"),
+    "当前法律状态": st.column_config.TextColumn("当前法律状态", width="small"),
+}
 # 固定登录状态（直接写入，无需上传 state.json）
 def _load_persisted_cnipa_state() -> Optional[Dict[str, Any]]:
     """尝试从磁盘加载持久化的 CNIPA 登录状态，成功则返回字典。"""
@@ -136,6 +148,94 @@ def _search_and_normalize(app_key: str, app_secret: str, query: str, extra_param
     return df, total_count
 
 
+def _iter_search_pages(query: str, page_size: int, max_pages: int) -> Iterator[Tuple[int, pd.DataFrame, Optional[int]]]:
+    """逐页检索的生成器：每取到一页就 yield (页码, 当页 DataFrame, API 总数)，遇到空页即停止。"""
+    for page_num in range(1, max_pages + 1):
+        df_page, total_count = _search_and_normalize(
+            app_key=APP_KEY, app_secret=APP_SECRET, query=query,
+            extra_params={"page_index": page_num, "page_size": page_size}
+        )
+        if df_page.empty:
+            return
+        yield page_num, df_page, total_count
+        if total_count is not None and page_num * page_size >= total_count:
+            return
+
+
+@st.cache_resource(show_spinner=False)
+def _patent_store():
+    from patent_store import PatentStore
+    return PatentStore()
+
+
+@st.cache_resource(show_spinner=False)
+def _patent_dataset():
+    from patent_dataset import PatentDataset
+    return PatentDataset()
+
+
+# 数据集查询结果按数据集版本（文件修改时间）缓存，写入新数据后自动失效
+@st.cache_data(show_spinner=False, max_entries=8)
+def _dataset_options(version: float) -> Dict[str, List[str]]:
+    ds = _patent_dataset()
+    return {c: ds.distinct(c) for c in ("公司名称", "专利类型", "当前法律状态")}
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _dataset_scan(version: float, filters: Dict[str, Any], limit: int) -> Tuple[pd.DataFrame, int]:
+    ds = _patent_dataset()
+    return ds.scan(filters, limit=limit), ds.count(filters)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _dataset_projection(version: float, filters: Dict[str, Any], pay_ratio: float, fees_stamp: Tuple, today: str,
+                        _fees: List[Dict[str, Any]]) -> Dict[str, Any]:
+    patents = _patent_dataset().scan(filters, columns=["专利号", "公司名称", "专利类型", "申请时间", "当前法律状态"])
+    return _projection_rollups(patents, _fees, pay_ratio)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _dataset_aggregates(version: float, filters: Dict[str, Any]) -> Dict[str, pd.DataFrame]:
+    return _patent_dataset().aggregates(filters)
+
+
+def _share_result(name: str, value: Any):
+    """把结果放入进程内共享存储，会话中只保存句柄；内容相同的结果在各会话间只保存一份。"""
+    old = st.session_state.get(name)
+    st.session_state[name] = get_store().put(value) if value is not None else None
+    if isinstance(old, ResultHandle):
+        old.release()
+
+
+def _session_result(name: str) -> Any:
+    """会话中结果的只读视图（不得原地修改）。"""
+    value = st.session_state.get(name)
+    return value.value if isinstance(value, ResultHandle) else value
+
+
+def _sync_search(query: str, page_size: int, max_pages: int, harvest_all: bool, progress_text) -> pd.DataFrame:
+    """增量同步：已同步过的检索式翻到已知且未变的页即停止，结果取自本地专利库。"""
+    from patent_store import SyncResult, sync_query
+
+    store = _patent_store()
+    first = store.last_sync(query) is None
+    if first and harvest_all:
+        from portfolio_harvest import harvest_portfolio
+        res = harvest_portfolio(query, app_key=APP_KEY, app_secret=APP_SECRET, on_progress=progress_text.text)
+        stats = store.upsert(res.records, query=query)
+        sync = SyncResult(query=query, pages=res.requests, new=stats.new, changed=stats.changed, full=True)
+        store.record_sync(sync)
+    else:
+        def pages():
+            for page_num, df_page, _ in _iter_search_pages(query, page_size, max_pages if first else 10 ** 6):
+                progress_text.text(f"正在同步第 {page_num} 页...")
+                yield df_page.to_dict("records")
+        sync = sync_query(store, query, pages())
+    note = "遇到已知记录后停止翻页" if sync.stopped_early else "全量同步"
+    st.info(f"增量同步：请求 {sync.pages} 页，新增 {sync.new} 件、变化 {sync.changed} 件（{note}）。")
+    return build_dataframe(store.records_for_query(query))
+
+
 def _inject_css():
     css_path = os.path.join("assets", "soopat.css")
     if os.path.exists(css_path):
@@ -146,21 +246,32 @@ def _inject_css():
 def sidebar_controls() -> Dict[str, Any]:
     st.sidebar.header("搜索参数")
     
-    max_pages_to_fetch = st.sidebar.number_input("最大获取页数", min_value=1, value=5, step=1, key="max_pages_to_fetch")
-    st.sidebar.info(f"每次搜索最多返回 {max_pages_to_fetch * 10} 条专利记录 (每页10条)。")
+    harvest_all = st.sidebar.checkbox("获取全部命中（自动切分检索式并行获取）", value=False, key="harvest_all")
+    sync_mode = st.sidebar.checkbox("增量同步（本地专利库，只获取新增/变化的专利）", value=False, key="sync_mode")
+    save_dataset = st.sidebar.checkbox("检索结果保存到本地数据集（Parquet）", value=False, key="save_dataset")
+    max_pages_to_fetch = st.sidebar.number_input("最大获取页数", min_value=1, value=5, step=1, key="max_pages_to_fetch",
+                                                 disabled=harvest_all)
+    if harvest_all:
+        st.sidebar.info("按申请日与专利类型把检索式拆成多个子查询并发获取，适合上万件的公司专利组合。")
+    else:
+        st.sidebar.info(f"每次搜索最多返回 {max_pages_to_fetch * 10} 条专利记录 (每页10条)。")
     
-    return {"extra": {"page_size": 10, "page_index": 1}, "max_pages_to_fetch": int(max_pages_to_fetch)}
+    return {"extra": {"page_size": 10, "page_index": 1}, "max_pages_to_fetch": int(max_pages_to_fetch),
+            "harvest_all": harvest_all, "sync_mode": sync_mode, "save_dataset": save_dataset}
 
 
-def filters_ui(df: pd.DataFrame) -> Dict[str, Any]:
+def filters_ui(df: Optional[pd.DataFrame], options: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+    """df 为 None 时只返回筛选条件（本地数据集模式，选项取自 options，筛选下推到数据集）。"""
     st.subheader("筛选条件")
+    if options is None:
+        options = {c: sorted([x for x in df[c].unique() if x]) for c in ("公司名称", "专利类型", "当前法律状态")}
     cols = st.columns(4)
     with cols[0]:
-        company = st.multiselect("公司名称", sorted([x for x in df["公司名称"].unique() if x]))
+        company = st.multiselect("公司名称", options["公司名称"])
     with cols[1]:
-        ptype = st.multiselect("专利类型", sorted([x for x in df["专利类型"].unique() if x]))
+        ptype = st.multiselect("专利类型", options["专利类型"])
     with cols[2]:
-        law = st.multiselect("法律状态", sorted([x for x in df["当前法律状态"].unique() if x]))
+        law = st.multiselect("法律状态", options["当前法律状态"])
     with cols[3]:
         inventor = st.text_input("发明人包含关键词")
 
@@ -188,38 +299,24 @@ def filters_ui(df: pd.DataFrame) -> Dict[str, Any]:
     if chips:
         st.markdown(f'''<div class='chips'>{''.join(chips)}</div>''', unsafe_allow_html=True)
 
-    df_f = df.copy()
-    if company:
-        df_f = df_f[df_f["公司名称"].isin(company)]
-    if ptype:
-        df_f = df_f[df_f["专利类型"].isin(ptype)]
-    if law:
-        df_f = df_f[df_f["当前法律状态"].isin(law)]
-    if inventor:
-        df_f = df_f[df_f["发明人"].str.contains(inventor, na=False)]
-    if start_date:
-        df_f = df_f[(df_f["申请时间"] >= str(start_date))]
-    if end_date:
-        df_f = df_f[(df_f["申请时间"] <= str(end_date))]
+    df_f = apply_filters(df, filters) if df is not None else None
 
     return {"df": df_f, "filters": filters}
 
 
-def _style_table(df: pd.DataFrame):
-    def color_type(val: str) -> str:
-        if val == "发明": return "background-color:#e3f2fd;color:#0b61b7;"
-        if val == "实用新型": return "background-color:#e8f5e9;color:#1b5e20;"
-        if val == "外观设计": return "background-color:#fff3e0;color:#e65100;"
-        return ""
+def _style_table(df: pd.DataFrame, styles: Optional[pd.DataFrame] = None):
+    """按整列样式数组着色；styles 为整个结果集预先算好的样式（随结果集缓存），按 df 的行索引取子集。"""
+    styles = result_styles(df) if styles is None else styles.loc[df.index]
+    return df.style.apply(lambda _: styles, axis=None, subset=list(styles.columns))
 
-    def color_status(val: str) -> str:
-        if not isinstance(val, str): return ""
-        if "有权" in val: return "background-color:#e8f5e9;color:#1b5e20;"
-        if "无效" in val or "失效" in val: return "background-color:#ffebee;color:#b71c1c;"
-        return ""
 
-    styler = df.style.map(color_type, subset=["专利类型"]).map(color_status, subset=["当前法律状态"])
-    return styler
+def _render_result_table(df: pd.DataFrame, styles: Optional[pd.DataFrame] = None):
+    max_rows = min(STYLE_MAX_ROWS, pd.get_option("styler.render.max_elements") // max(1, len(df.columns)))
+    if len(df) > max_rows:
+        st.caption(f"结果超过 {max_rows} 行，已关闭着色以加快显示。")
+        st.dataframe(df, use_container_width=True, hide_index=True, column_config=RESULT_COLUMN_CONFIG)
+    else:
+        st.dataframe(_style_table(df, styles), use_container_width=True, hide_index=True)
 
 def export_buttons(df: pd.DataFrame, filename: str = "专利统计.xlsx", sheet_name: str = "专利统计"):
     st.subheader("导出")
@@ -235,25 +332,163 @@ def export_buttons(df: pd.DataFrame, filename: str = "专利统计.xlsx", sheet_
         use_container_width=True,
     )
 
-def dashboard(df: pd.DataFrame):
+def dashboard(df: Optional[pd.DataFrame], agg: Optional[Dict[str, pd.DataFrame]] = None):
+    """agg 可传入预先算好的分组统计（如本地数据集的 aggregates），此时不需要 df。"""
+    import plotly.express as px  # 仅在渲染仪表盘时导入，加快应用冷启动
+
     st.subheader("仪表盘 / 可视化")
+    if agg is None:
+        if df is None or df.empty:
+            return
+        agg = dashboard_aggregates(df)
+    elif agg["by_type"].empty:
+        return
     c1, c2 = st.columns(2)
     with c1:
-        if not df.empty:
-            gb = df.groupby("专利类型").size().reset_index(name="数量")
-            fig = px.pie(gb, names="专利类型", values="数量", title="按专利类型分布")
-            st.plotly_chart(fig, use_container_width=True)
+        fig = px.pie(agg["by_type"], names="专利类型", values="数量", title="按专利类型分布")
+        st.plotly_chart(fig, use_container_width=True)
     with c2:
-        if not df.empty:
-            gb2 = df.groupby(["公司名称", "专利类型"]).size().reset_index(name="数量")
-            fig2 = px.treemap(gb2, path=["公司名称", "专利类型"], values="数量", title="公司-类型 结构树")
-            st.plotly_chart(fig2, use_container_width=True)
-    if not df.empty:
-        df_year = df.copy()
-        df_year["申请年份"] = df_year["申请时间"].str.slice(0, 4)
-        gb3 = df_year.groupby("申请年份").size().reset_index(name="数量")
-        fig3 = px.bar(gb3, x="申请年份", y="数量", title="按申请年份数量趋势")
-        st.plotly_chart(fig3, use_container_width=True)
+        fig2 = px.treemap(agg["by_company_type"], path=["公司名称", "专利类型"], values="数量", title="公司-类型 结构树")
+        st.plotly_chart(fig2, use_container_width=True)
+    fig3 = px.bar(agg["by_year"], x="申请年份", y="数量", title="按申请年份数量趋势")
+    st.plotly_chart(fig3, use_container_width=True)
+
+def _projection_rollups(patents: pd.DataFrame, fees: List[Dict[str, Any]], pay_ratio: float) -> Dict[str, Any]:
+    """预测全部未来年费后只保留汇总结果（明细可能有数百万行，不随会话缓存）。"""
+    from fee_projection import project_fees, rollup_by_company_year, rollup_by_year
+
+    projection = project_fees(patents, fees, pay_ratio=pay_ratio)
+    due = projection["缴费期限届满日"]
+    next_12m = due < pd.Timestamp.today().normalize() + pd.DateOffset(years=1)
+    return {
+        "by_year": rollup_by_year(projection),
+        "by_company_year": rollup_by_company_year(projection),
+        "total": float(projection["金额"].sum()),
+        "next_12m": float(projection.loc[next_12m, "金额"].sum()),
+        "patents": int(projection["专利号"].nunique()),
+    }
+
+
+def fee_projection_panel(patents: Optional[pd.DataFrame], handle: Optional[ResultHandle] = None,
+                         dataset_filters: Optional[Dict[str, Any]] = None):
+    """年费预测：按专利类型、申请日与已知应缴费（年费查询结果 + 年费监控）推算至保护期届满的全部年费。"""
+    import plotly.express as px
+    from datetime import date
+    from fee_projection import PAY_RATIO
+
+    st.subheader("年费预测（至保护期届满）")
+    pay_ratio = st.number_input("缴纳比例（未查询过年费的专利；已查询的按实际金额推算）", min_value=0.0, max_value=1.0,
+                                value=PAY_RATIO, step=0.05, key="projection_pay_ratio")
+    monitor = session_monitor()
+    fees_handle = st.session_state.get("fee_query_results")
+    fees = list(_session_result("fee_query_results") or []) + monitor.snapshot()
+    fees_stamp = (monitor.version, fees_handle.key if isinstance(fees_handle, ResultHandle) else len(fees))
+    today = date.today().isoformat()
+    if dataset_filters is not None:
+        rollups = _dataset_projection(_patent_dataset().version(), dataset_filters, pay_ratio, fees_stamp, today, fees)
+    elif handle is not None:
+        rollups = handle.derived("projection", lambda df: _projection_rollups(df, fees, pay_ratio),
+                                 stamp=(pay_ratio, fees_stamp, today))
+    else:
+        rollups = _projection_rollups(patents, fees, pay_ratio)
+    if rollups["by_year"].empty:
+        st.info("没有可预测的有效专利。")
+        return
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("预测专利数", rollups["patents"])
+    c2.metric("未来 12 个月年费", f"¥{rollups['next_12m']:,.0f}")
+    c3.metric("至届满合计", f"¥{rollups['total']:,.0f}")
+    fig = px.bar(rollups["by_year"], x="年份", y="金额", hover_data=["笔数"], title="按缴费年份的年费预测")
+    st.plotly_chart(fig, use_container_width=True)
+
+    by_company = rollups["by_company_year"]
+    pivot = by_company.pivot(index="公司名称", columns="年份", values="金额").fillna(0)
+    pivot = pivot.loc[pivot.sum(axis=1).sort_values(ascending=False).index]
+    st.caption("按公司 × 缴费年份（金额，元）")
+    st.dataframe(pivot.head(50), use_container_width=True)
+    st.download_button("导出公司 × 年份预测（CSV）", data=by_company.to_csv(index=False).encode("utf-8-sig"),
+                       file_name="年费预测_公司年份.csv", mime="text/csv", use_container_width=True)
+
+
+def _fee_cube():
+    """本会话的年费成本立方体：年费监控（所有会话共享）与本会话的年费查询结果按版本增量同步，未变化时不读取原始记录。"""
+    from fee_cube import FeeCube
+
+    cube = st.session_state.get("fee_cube")
+    if cube is None:
+        cube = st.session_state.fee_cube = FeeCube()
+    monitor = session_monitor()
+    monitor.refresh()
+    cube.sync("monitor", monitor.version, monitor.snapshot)
+    handle = st.session_state.get("fee_query_results")
+    if isinstance(handle, ResultHandle):
+        cube.sync("query", handle.key, lambda: handle.value)
+    else:
+        cube.remove_source("query")
+    return cube
+
+
+def _keep_valid(key: str, options: List[str]):
+    """选项随数据变化后，去掉会话中已不存在的选中值（否则控件报错）。"""
+    value = st.session_state.get(key)
+    if isinstance(value, list):
+        st.session_state[key] = [v for v in value if v in options]
+    elif isinstance(value, tuple) and not set(value) <= set(options):
+        del st.session_state[key]
+
+
+def fee_cost_panel():
+    """年费成本：公司 × 专利类型 × 缴费月份 × 紧急程度 的预聚合立方体，筛选与分组只在单元格上进行。"""
+    import plotly.express as px
+    from fee_cube import URGENCY_LABELS, slice_cube
+
+    st.subheader("年费成本（年费查询 + 年费监控）")
+    frame = _fee_cube().frame()
+    if frame.empty:
+        st.info("查询年费或添加监控项后将在此汇总年费成本。")
+        return
+
+    companies = list(frame["公司名称"].cat.categories)
+    types = list(frame["专利类型"].cat.categories)
+    present = set(frame["紧急程度"].cat.categories)
+    levels = [label for label in URGENCY_LABELS.values() if label in present]
+    months = list(frame["缴费月份"].cat.categories)
+    for key, options in (("cube_companies", companies), ("cube_types", types), ("cube_levels", levels),
+                         ("cube_months", months)):
+        _keep_valid(key, options)
+
+    c1, c2, c3 = st.columns(3)
+    selected = {
+        "公司名称": c1.multiselect("公司名称", companies, key="cube_companies"),
+        "专利类型": c2.multiselect("专利类型", types, key="cube_types"),
+        "紧急程度": c3.multiselect("紧急程度", levels, key="cube_levels"),
+        "缴费月份": None,
+    }
+    if len(months) > 1:
+        selected["缴费月份"] = st.select_slider("缴费月份", options=months, value=(months[0], months[-1]),
+                                            key="cube_months")
+    color_by = st.radio("按维度分色", ["紧急程度", "专利类型", "公司名称"], horizontal=True, key="cube_color_by")
+
+    total = slice_cube(frame, [], **selected)
+    m1, m2 = st.columns(2)
+    m1.metric("年费合计", f"¥{float(total['金额'].iloc[0]):,.2f}")
+    m2.metric("费用笔数", int(total["笔数"].iloc[0]))
+
+    by_month = slice_cube(frame, ["缴费月份", color_by], **selected)
+    fig = px.bar(by_month, x="缴费月份", y="金额", color=color_by, hover_data=["笔数"], title="按缴费月份的年费成本",
+                 category_orders={"紧急程度": levels, "缴费月份": months})
+    st.plotly_chart(fig, use_container_width=True)
+
+    by_company = slice_cube(frame, ["公司名称", "紧急程度"], **selected).astype({"公司名称": str, "紧急程度": str})
+    if not by_company.empty:
+        pivot = by_company.pivot_table(index="公司名称", columns="紧急程度", values="金额", aggfunc="sum",
+                                       fill_value=0)
+        pivot = pivot[[c for c in levels if c in pivot.columns]]
+        pivot["合计"] = pivot.sum(axis=1)
+        st.caption("按公司 × 紧急程度（金额，元）")
+        st.dataframe(pivot.sort_values("合计", ascending=False).head(50), use_container_width=True)
+
 
 def _hero() -> Dict[str, Any]:
     with st.form("search_form"):
@@ -261,31 +496,93 @@ def _hero() -> Dict[str, Any]:
         run_all = st.form_submit_button("搜索", use_container_width=True, type="primary")
     return {"query": query, "run_all": run_all}
 
-def run_fee_query(df: pd.DataFrame, selected_indices: List[Any], storage_state: dict):
+def _query_one_patent(patent: Dict[str, Any], storage_state: dict, backend: str) -> List[Dict[str, Any]]:
+    app_no_raw = patent['专利号']
+    app_no = re.sub(r'\D', '', app_no_raw)
+    fees = query_due_fees(app_no, headful=False, storage_state=storage_state, backend=backend)
+    return [{
+        '专利号': app_no_raw,
+        '专利名称': patent['专利名称'],
+        '公司名称': patent['公司名称'],
+        '当前法律状态': patent.get('当前法律状态', ''),
+        '费用种类': fee['费用种类'],
+        '缴费期限届满日': fee['缴费期限届满日'],
+        '金额': fee['金额']
+    } for fee in fees]
+
+def _account_registry(storage_state: dict):
+    """默认登录态 + 侧栏添加的其他账号；只有默认账号时返回 None（沿用单账号查询）。"""
+    extra = st.session_state.get("cnipa_extra_accounts") or []
+    if not extra:
+        return None
+    from cnipa_accounts import Account, AccountRegistry
+    registry = AccountRegistry([Account("默认账号", storage_state, concurrency=1)])
+    for a in extra:
+        registry.add(Account(a["name"], a["state"], owners=a["owners"], concurrency=1))
+    return registry
+
+def run_fee_query(df: pd.DataFrame, selected_indices: List[Any], storage_state: dict, backend: str = "browser", resume: bool = False):
+    """查询选中专利的年费；登录失效时暂停，未完成的专利记入 fee_query_pending，重新上传 state.json 后续跑。
+    添加了多个账号时按“公司名称”路由到所属账号，其余专利在各账号间并发分配。"""
+    from cnipa_http_client import probe_session
+    from fee_batch import run_fee_batch
+    from fee_checkpoint import FeeCheckpoint
+
     progress_bar = st.progress(0)
-    fee_results: List[Dict[str, Any]] = []
-    for i, idx in enumerate(selected_indices):
-        patent = df.loc[idx]
-        app_no_raw = patent['专利号']
-        app_no = re.sub(r'\D', '', app_no_raw)
-        try:
-            st.write(f"正在查询 {app_no_raw} (处理后: {app_no})...")
-            fees = query_due_fees(app_no, headful=False, storage_state=storage_state)
-            for fee in fees:
-                fee_results.append({
-                    '专利号': app_no_raw,
-                    '专利名称': patent['专利名称'],
-                    '公司名称': patent['公司名称'],
-                    '当前法律状态': patent.get('当前法律状态', ''),
-                    '费用种类': fee['费用种类'],
-                    '缴费期限届满日': fee['缴费期限届满日'],
-                    '金额': fee['金额']
-                })
-            progress_bar.progress((i + 1) / len(selected_indices))
-        except Exception as e:
-            st.error(f"查询 {app_no_raw} 失败：{e}")
+    fee_results: List[Dict[str, Any]] = list(_session_result('fee_query_results') or []) if resume else []
+    patents = [dict(df.loc[idx].to_dict(), _idx=idx) for idx in selected_indices]
+    finished = {"n": 0}
+
+    status = st.empty()
+    checkpoint = FeeCheckpoint() if st.session_state.get("fee_use_checkpoint", True) else None
+
+    def on_result(patent, rows):
+        finished["n"] += 1
+        fee_results.extend(rows)
+        status.text(f"已完成 {finished['n']}/{len(patents)}：{patent['专利号']}（{len(rows)} 条）")
+        progress_bar.progress(finished["n"] / len(patents))
+
+    def on_error(patent, e):
+        finished["n"] += 1
+        st.error(f"查询 {patent['专利号']} 失败：{e}")
+        progress_bar.progress(finished["n"] / len(patents))
+
+    registry = _account_registry(storage_state)
+    if registry is None:
+        outcome = run_fee_batch(
+            patents, lambda p: _query_one_patent(p, storage_state, backend),
+            probe=lambda: probe_session(storage_state), on_result=on_result, on_error=on_error,
+            checkpoint=checkpoint)
+    else:
+        outcome = run_fee_batch(
+            patents, registry.wrap(lambda p, state: _query_one_patent(p, state, backend)),
+            probe=registry.probe, workers=registry.total_concurrency(),
+            on_result=on_result, on_error=on_error, checkpoint=checkpoint)
+        st.session_state.cnipa_account_status = registry.status()
+    if checkpoint is not None:
+        # 与 batch_cli 一致：每轮查询后清理过期与重复的断点行，避免文件无限增长
+        checkpoint.compact()
+    if outcome.from_checkpoint:
+        st.info(f"{outcome.from_checkpoint} 个专利使用了 {checkpoint.ttl / 3600:g} 小时内的断点结果，未重复查询。")
+    if outcome.expired_accounts and not outcome.session_expired:
+        # 只有部分账号失效：移除失效的附加账号，其专利留待重新添加该账号后继续
+        st.session_state.fee_query_pending = {"indices": [p['_idx'] for p in outcome.pending], "backend": backend}
+        st.session_state.cnipa_extra_accounts = [a for a in st.session_state.get("cnipa_extra_accounts") or []
+                                                 if a["name"] not in outcome.expired_accounts]
+        if "默认账号" in outcome.expired_accounts:
+            st.session_state.cnipa_login_state = None
+        st.warning(f"账号 {'、'.join(outcome.expired_accounts)} 登录状态已失效，归属于这些账号的 {len(outcome.pending)} 个专利未查询。"
+                   "请重新添加对应账号的 state.json 后继续。")
+    elif outcome.session_expired:
+        st.session_state.fee_query_pending = {"indices": [p['_idx'] for p in outcome.pending], "backend": backend}
+        # 清除失效的登录态，界面回到上传 state.json
+        st.session_state.cnipa_login_state = None
+        st.warning(f"CNIPA 登录状态已失效（{outcome.reason}），已暂停，剩余 {len(outcome.pending)} 个专利。"
+                   "请重新上传 state.json，上传后将自动继续。")
+    else:
+        st.session_state.fee_query_pending = None
     # 写入 session，不渲染；让上层统一展示
-    st.session_state.fee_query_results = fee_results
+    _share_result('fee_query_results', fee_results)
     st.session_state.fee_query_patent_info = df.loc[selected_indices].to_dict('records') if len(selected_indices) == 1 else None
     st.session_state.fee_query_just_updated = True
     if not fee_results:
@@ -302,8 +599,11 @@ def fee_query_tab_content():
         st.markdown("</div>", unsafe_allow_html=True)
         return
 
+    pending = st.session_state.get("fee_query_pending")
     if not st.session_state.get("cnipa_login_state"):
         st.warning("您需要上传 CNIPA 登录状态文件才能查询年费。")
+        if pending:
+            st.info(f"年费查询已暂停，还有 {len(pending['indices'])} 个专利待查询，上传新的 state.json 后自动继续。")
         with st.expander("如何获取登录状态文件 (state.json)？"):
             st.markdown("""
             1.  在您的**本地电脑**上（而不是在这个网页上）运行此应用。
@@ -320,6 +620,7 @@ def fee_query_tab_content():
                 state_content = json.loads(uploaded_file.getvalue().decode("utf-8"))
                 if "cookies" in state_content and "origins" in state_content:
                     st.session_state.cnipa_login_state = state_content
+                    st.session_state.fee_query_auto_resume = bool(pending)
                     st.success("登录状态文件上传成功！页面将自动刷新以应用登录状态。")
                     st.rerun()
                 else:
@@ -329,24 +630,45 @@ def fee_query_tab_content():
 
     else: # 已登录
         st.success("CNIPA 登录状态已加载，可以开始查询年费。")
-        df = st.session_state.get("df_search_results")
+        df = _session_result("df_search_results")
         login_state = st.session_state.get("cnipa_login_state")
         
         if df is not None and not df.empty:
             st.write("---")
+            backends = list(cnipa_module.available_backends())
+            backend = "browser"
+            if len(backends) > 1:
+                backend = st.radio(
+                    "查询方式", options=backends,
+                    index=backends.index(cnipa_module.DEFAULT_BACKEND) if cnipa_module.DEFAULT_BACKEND in backends else 0,
+                    format_func=lambda b: {"browser": "浏览器（Playwright）", "http": "HTTP 直连（实验性）"}[b],
+                    horizontal=True, key="fee_backend",
+                )
+                if backend == "http":
+                    st.warning("HTTP 直连为实验性功能：费用接口（CNIPA_FEE_API_URL）的路径与字段尚未对正式站点确认，"
+                               "查询结果请与浏览器方式核对。")
+            if pending:
+                remaining = [i for i in pending["indices"] if i in df.index]
+                auto = st.session_state.pop("fee_query_auto_resume", False)
+                if remaining and (auto or st.button(f"继续查询剩余 {len(remaining)} 个专利", type="primary", use_container_width=True)):
+                    run_fee_query(df, remaining, login_state, pending["backend"], resume=True)
+                elif not remaining:
+                    st.session_state.fee_query_pending = None
+            st.checkbox("复用断点结果（中断后重新查询时跳过已完成的专利）", value=True, key="fee_use_checkpoint")
+            cnipa_accounts_panel()
             if st.button("一键查询全部年费", type="primary", use_container_width=True):
-                run_fee_query(df, df.index.tolist(), login_state)
+                run_fee_query(df, df.index.tolist(), login_state, backend)
             
             st.write("---")
             st.write("或者，选择要查询年费的专利：")
             selected_patents = st.multiselect("专利列表", options=df.index, format_func=lambda x: f"{df.loc[x, '专利名称']} ({df.loc[x, '专利号']})" )
             
             if selected_patents and st.button("查询选中专利年费"):
-                run_fee_query(df, selected_patents, login_state)
+                run_fee_query(df, selected_patents, login_state, backend)
             # 统一展示最近一次查询结果
             if st.session_state.get('fee_query_results') is not None:
                 st.write("---")
-                fee_results = st.session_state.fee_query_results
+                fee_results = _session_result('fee_query_results')
                 if st.session_state.get('fee_query_empty'):
                     st.warning("未查询到任何年费信息")
                 elif fee_results:
@@ -365,6 +687,38 @@ def fee_query_tab_content():
 
     st.markdown("</div>", unsafe_allow_html=True)
 
+def cnipa_accounts_panel():
+    """添加其他客户主体的 CNIPA 账号：归属公司的专利只用该账号查询，其余专利在所有账号间分配。"""
+    extra = st.session_state.setdefault("cnipa_extra_accounts", [])
+    with st.expander(f"多账号查询（已添加 {len(extra)} 个其他账号）"):
+        with st.form("add_cnipa_account", clear_on_submit=True):
+            name = st.text_input("账号名称", placeholder="如：甲公司")
+            owners = st.text_input("归属公司（逗号分隔，公司名称包含其一即用该账号查询）")
+            uploaded = st.file_uploader("该账号的 state.json", type=["json"], key="extra_state_upload")
+            if st.form_submit_button("添加账号") and name and uploaded is not None:
+                try:
+                    state = json.loads(uploaded.getvalue().decode("utf-8"))
+                except ValueError as e:
+                    st.error(f"读取文件失败: {e}")
+                else:
+                    if "cookies" not in state:
+                        st.error("文件格式不正确，请上传由本应用生成的 state.json 文件。")
+                    else:
+                        st.session_state.cnipa_extra_accounts = [a for a in extra if a["name"] != name] + [{
+                            "name": name, "state": state,
+                            "owners": [o.strip() for o in re.split(r"[,，;；]", owners) if o.strip()],
+                        }]
+                        st.rerun()
+        for a in extra:
+            c1, c2 = st.columns([4, 1])
+            c1.write(f"**{a['name']}** — {'、'.join(a['owners']) or '不限归属'}")
+            if c2.button("移除", key=f"rm_account_{a['name']}"):
+                st.session_state.cnipa_extra_accounts = [x for x in extra if x["name"] != a["name"]]
+                st.rerun()
+        if st.session_state.get("cnipa_account_status"):
+            st.caption("最近一次查询各账号情况")
+            st.dataframe(pd.DataFrame(st.session_state.cnipa_account_status), use_container_width=True, hide_index=True)
+
 def local_login_sidebar():
     st.sidebar.header("本地登录工具")
     if st.sidebar.button("生成登录文件 (state.json)"):
@@ -375,6 +729,38 @@ def local_login_sidebar():
             except Exception as e:
                 st.sidebar.error(f"登录失败: {e}")
 
+def diagnostics_sidebar():
+    # 耗时统计是进程级的（所有会话共用），只能由服务端 PATENT_FEE_TIMING 开启，不提供按会话的开关
+    if not timing.is_enabled():
+        return
+    st.sidebar.header("性能诊断")
+    stats = timing.snapshot()
+    if not stats:
+        st.sidebar.caption("暂无数据，执行检索或年费查询后显示（统计包含所有会话）。")
+        return
+    with st.sidebar.expander("各阶段耗时（毫秒，所有会话）", expanded=False):
+        rows = [{
+            "阶段": name,
+            "次数": s["count"],
+            "均值": round(s["mean"] * 1000, 1),
+            "p50": round(s["p50"] * 1000, 1),
+            "p95": round(s["p95"] * 1000, 1),
+            "最大": round(s["max"] * 1000, 1),
+        } for name, s in stats.items()]
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        selected = st.selectbox("查看直方图", list(stats), key="timing_hist_stage")
+        if selected:
+            buckets = stats[selected]["buckets"]
+            st.bar_chart(pd.DataFrame({"≤秒": list(buckets), "次数": list(buckets.values())}).set_index("≤秒"))
+        c1, c2 = st.columns(2)
+        with c1:
+            st.download_button("JSON", data=timing.to_json(), file_name="timing.json", mime="application/json", use_container_width=True)
+        with c2:
+            st.download_button("Prometheus", data=timing.to_prometheus(), file_name="timing.prom", mime="text/plain", use_container_width=True)
+        if TIMING_RESET_ENABLED and st.button("清空统计", use_container_width=True):
+            timing.reset()
+            st.rerun()
+
 def main():
     _inject_css()
     
@@ -388,6 +774,8 @@ def main():
         st.session_state.current_query = ""
     if "fee_query_results" not in st.session_state:
         st.session_state.fee_query_results = []
+    if "fee_query_pending" not in st.session_state:
+        st.session_state.fee_query_pending = None
     if "fee_query_patent_info" not in st.session_state:
         st.session_state.fee_query_patent_info = None
 
@@ -410,48 +798,98 @@ def main():
         page_size = controls["extra"]["page_size"]
         max_pages_to_fetch = controls["max_pages_to_fetch"]
 
-        # --- 搜索全部逻辑 (always runs now) ---
-        st.session_state.df_search_results = None # Clear previous results
-        all_dfs = []
-        total_patents_fetched = 0
-        
+        # --- 搜索全部逻辑：逐页流式渲染 ---
+        _share_result("df_search_results", None) # Clear previous results
+        st.session_state.fee_query_pending = None
+        columns: Dict[str, List[Any]] = {c: [] for c in REQUIRED_COLUMNS}
+        total_count_api = None
+
         progress_text = st.empty()
         progress_bar = st.progress(0)
-
-        for page_num in range(1, max_pages_to_fetch + 1):
-            progress_text.text(f"正在获取第 {page_num}/{max_pages_to_fetch} 页...")
-            df_page, total_count_api = _search_and_normalize(
-                app_key=APP_KEY, app_secret=APP_SECRET, query=query, 
-                extra_params={"page_index": page_num, "page_size": page_size}
-            )
-            
-            if df_page.empty:
-                progress_text.text(f"第 {page_num} 页没有更多结果，停止获取。")
-                break
-            
-            all_dfs.append(df_page)
-            total_patents_fetched += len(df_page)
-            progress_bar.progress(page_num / max_pages_to_fetch)
-        
-        final_df = pd.concat(all_dfs, ignore_index=True) if all_dfs else pd.DataFrame(columns=REQUIRED_COLUMNS)
-        st.session_state.df_search_results = final_df
+        live_count = st.empty()
+        live_table_slot = st.empty()
+        live_table = None
+
+        def show_page(df_page: pd.DataFrame):
+            nonlocal live_table
+            for c in REQUIRED_COLUMNS:
+                columns[c].extend(df_page[c].tolist())
+            if live_table is None:
+                live_table = live_table_slot.dataframe(df_page, use_container_width=True, hide_index=True)
+            else:
+                live_table.add_rows(df_page)
+            live_count.caption(f"已获取 {len(columns['专利号'])} 条记录")
+
+        if controls["sync_mode"]:
+            show_page(_sync_search(query, page_size, max_pages_to_fetch, controls["harvest_all"], progress_text))
+        elif controls["harvest_all"]:
+            from portfolio_harvest import harvest_portfolio
+
+            def on_records(records, res):
+                show_page(build_dataframe(records))
+                if res.total_reported:
+                    progress_bar.progress(min(1.0, len(res.records) / res.total_reported))
+
+            progress_text.text("正在探测命中数...")
+            harvest = harvest_portfolio(query, app_key=APP_KEY, app_secret=APP_SECRET,
+                                        on_records=on_records, on_progress=progress_text.text)
+            total_count_api = harvest.total_reported
+            if harvest.truncated or harvest.failed_pages:
+                st.warning(f"{len(harvest.truncated)} 个子查询超出接口可翻页范围、{harvest.failed_pages} 页获取失败，结果可能不完整。")
+        else:
+            progress_text.text(f"正在获取第 1/{max_pages_to_fetch} 页...")
+            for page_num, df_page, total_count_api in _iter_search_pages(query, page_size, max_pages_to_fetch):
+                # 每到一页就追加到结果列并立即渲染，无需等待全部页完成
+                show_page(df_page)
+                progress_bar.progress(page_num / max_pages_to_fetch)
+                if page_num < max_pages_to_fetch:
+                    progress_text.text(f"正在获取第 {page_num + 1}/{max_pages_to_fetch} 页...")
+
+        # 按列一次性构建最终结果，避免逐页 DataFrame 的 concat 拷贝
+        final_df = pd.DataFrame(columns, columns=REQUIRED_COLUMNS)
+        _share_result("df_search_results", final_df)
+        if controls["save_dataset"] and not final_df.empty:
+            progress_text.text("正在写入本地数据集...")
+            _patent_dataset().write(final_df.to_dict("records"))
         progress_bar.empty()
         progress_text.empty()
+        live_count.empty()
+        live_table_slot.empty()
         st.success(f"搜索完成！共获取到 {len(final_df)} 条专利记录。")
         if total_count_api is not None:
             st.info(f"API 报告总共有 {total_count_api} 条专利。")
 
     # --- 页面渲染 ---
     tabs = st.tabs(["检索与列表", "年费查询", "年费监控", "仪表盘"])
-    df_from_session = st.session_state.df_search_results
+    df_from_session = _session_result("df_search_results")
+
+    dataset = _patent_dataset()
+    use_dataset = False
 
     with tabs[0]:
-        if df_from_session is not None:
+        if dataset.exists():
+            use_dataset = st.radio("数据来源", ["当前检索结果", "本地数据集"], horizontal=True,
+                                   key="data_source") == "本地数据集"
+        if use_dataset:
+            st.markdown("<div class='card'>", unsafe_allow_html=True)
+            version = dataset.version()
+            fx = filters_ui(None, options=_dataset_options(version))
+            st.session_state.dataset_filters = fx["filters"]
+            df_filtered, total = _dataset_scan(version, fx["filters"], DATASET_VIEW_LIMIT)
+            st.success(f"本地数据集中命中 {total} 条记录")
+            if total > len(df_filtered):
+                st.caption(f"仅显示前 {len(df_filtered)} 条，可缩小筛选范围；仪表盘统计基于全部命中记录。")
+            _render_result_table(df_filtered)
+            export_buttons(df_filtered)
+            st.markdown("</div>", unsafe_allow_html=True)
+        elif df_from_session is not None:
             st.markdown("<div class='card'>", unsafe_allow_html=True)
             st.success(f"当前共加载 {len(df_from_session)} 条记录")
             fx = filters_ui(df_from_session)
             df_filtered = fx["df"]
-            st.dataframe(_style_table(df_filtered), use_container_width=True, hide_index=True)
+            handle = st.session_state.get("df_search_results")
+            styles = handle.derived("styles", result_styles) if isinstance(handle, ResultHandle) else None
+            _render_result_table(df_filtered, styles)
             export_buttons(df_filtered)
             st.markdown("</div>", unsafe_allow_html=True)
         else:
@@ -466,12 +904,26 @@ def main():
         st.markdown("</div>", unsafe_allow_html=True)
 
     with tabs[3]:
-        if df_from_session is not None:
+        if use_dataset:
+            st.markdown("<div class='card'>", unsafe_allow_html=True)
+            dataset_filters = st.session_state.get("dataset_filters") or {}
+            dashboard(None, agg=_dataset_aggregates(dataset.version(), dataset_filters))
+            fee_projection_panel(None, dataset_filters=dataset_filters)
+            st.markdown("</div>", unsafe_allow_html=True)
+        elif df_from_session is not None:
             st.markdown("<div class='card'>", unsafe_allow_html=True)
             dashboard(df_from_session)
+            handle = st.session_state.get("df_search_results")
+            fee_projection_panel(df_from_session, handle=handle if isinstance(handle, ResultHandle) else None)
             st.markdown("</div>", unsafe_allow_html=True)
         else:
             st.info("检索数据后将显示仪表盘。")
+        st.markdown("<div class='card'>", unsafe_allow_html=True)
+        fee_cost_panel()
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    # 放在最后渲染，以包含本次运行产生的耗时
+    diagnostics_sidebar()
 
 if __name__ == "__main__":
     main()
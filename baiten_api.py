@@ -1,7 +1,16 @@
 import hashlib
+import os
 import requests
 from typing import Dict, Any, Optional, Tuple
 
+from timing import span
+
+# 默认密钥；可通过环境变量覆盖（供命令行/批处理任务使用）
+DEFAULT_APP_KEY = os.getenv("BAITEN_APP_KEY", "n3krd7sx4vks2fip")
+DEFAULT_APP_SECRET = os.getenv("BAITEN_APP_SECRET", "5df54358-2885-4cde-9254-e7916cecbe69")
+# 检索接口地址；压测时可指向本地 mock_servers.baiten
+DEFAULT_SEARCH_URL = os.getenv("BAITEN_SEARCH_URL", "http://open.baiten.cn/router/openService/search")
+
 
 def _md5_hex(s: str, enc: str = "utf-8", upper: bool = False) -> str:
     h = hashlib.md5(s.encode(enc)).hexdigest()
@@ -25,7 +34,7 @@ def search_baiten_post(
     app_secret: str,
     query: str,
     *,
-    url: str = "http://open.baiten.cn/router/openService/search",
+    url: str = DEFAULT_SEARCH_URL,
     page_index: int = 1,
     page_size: int = 10,
     sort_field: str = "ad_sort",
@@ -88,7 +97,8 @@ def search_baiten_post(
         data["client_sign"] = client_sign
 
         try:
-            resp = requests.post(url, data=data, headers=headers, timeout=timeout)
+            with span("baiten.http"):
+                resp = requests.post(url, data=data, headers=headers, timeout=timeout)
         except Exception as e:
             attempts.append(
                 {
@@ -0,0 +1,529 @@
+# -*- coding: utf-8 -*-
+"""
+命令行批量检索与年费查询（无 Streamlit 依赖，可用于 cron 定时任务）
+
+用法：
+    python batch_cli.py targets.txt --out patents.csv --fees-out fees.csv
+    python batch_cli.py targets.txt --mode fees --fees-out fees.parquet --monitor
+
+targets.txt 每行一个公司名称/关键词或申请号，空行与 # 开头的行会被忽略：
+  - 申请号（如 CN202222927164.1 / 2022229271641）直接查询年费；
+  - 其他内容作为检索关键词，检索结果中的每个专利再查询年费（--mode all）；
+    --all-pages 获取关键词的全部命中（见 portfolio_harvest.py），不受 --max-pages 与深翻页限制。
+    --sync 把结果写入本地专利库（patent_store.py），同一关键词再次运行时只翻到已知记录为止。
+    --dataset 把检索结果合并写入本地 Parquet 数据集（patent_dataset.py），供界面“本地数据集”筛选与仪表盘使用。
+
+断点：每完成一个专利写入 fee_query_checkpoint.jsonl，中断后重跑同一命令只查询剩余专利
+（--checkpoint-ttl 内的结果直接复用，--no-checkpoint 关闭）。
+
+登录态：开始前与运行中定期探测 state.json 是否仍有效；失效时停止派发新查询。
+默认立即退出（返回码 3），--relogin-wait N 则最多等待 N 秒，待 state.json 被重新生成后
+从未完成的专利继续（已完成的不会重复查询）。
+
+多账号：--accounts cnipa_accounts.json（或存在 CNIPA_ACCOUNTS_FILE）时按“公司名称”路由到所属账号，
+其余专利分给最空闲的账号，每个账号 --fee-workers 个并发并按注册表中的 rate_per_min 限流；
+单个账号失效只暂停归属于它的专利。
+
+返回码：0 全部成功；1 部分失败；2 参数错误；3 登录失效、仍有专利未查询。
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from baiten_api import search_baiten_post, DEFAULT_APP_KEY, DEFAULT_APP_SECRET
+from data_utils import normalize_baiten_payload, REQUIRED_COLUMNS
+import timing
+
+FEE_COLUMNS = ["专利号", "专利名称", "公司名称", "当前法律状态", "费用种类", "缴费期限届满日", "金额"]
+
+# 申请号：可带 CN 前缀与校验位（点号或 X），12~13 位数字
+APP_NO_RE = re.compile(r"^(?:CN)?\d{12,13}(?:\.?[\dX])?$", re.IGNORECASE)
+
+
+def read_targets(path: Path) -> List[str]:
+    """读取目标文件，去除空行、注释与重复项（保持原有顺序）。"""
+    seen, targets = set(), []
+    for line in path.read_text(encoding="utf-8-sig").splitlines():
+        t = line.strip()
+        if not t or t.startswith("#") or t in seen:
+            continue
+        seen.add(t)
+        targets.append(t)
+    return targets
+
+
+def is_application_number(text: str) -> bool:
+    return bool(APP_NO_RE.match(text.replace(" ", "")))
+
+
+def iter_search_records(query: str, *, app_key: str, app_secret: str,
+                        max_pages: int, page_size: int = 10) -> Iterator[List[Dict[str, Any]]]:
+    """逐页检索，每页 yield 一批标准化记录；遇到空页或达到 API 总数即停止。"""
+    for page_index in range(1, max_pages + 1):
+        resp = search_baiten_post(
+            app_key=app_key,
+            app_secret=app_secret,
+            query=query,
+            page_index=page_index,
+            page_size=page_size,
+            sort_field="ad_sort",
+            sort="desc",
+            level="TWO",
+            source=63,
+        )
+        if not resp.get("ok"):
+            raise RuntimeError(f"检索 {query!r} 第 {page_index} 页失败: {json.dumps(resp, ensure_ascii=False)[:300]}")
+        records, total = normalize_baiten_payload(resp["response"])
+        if not records:
+            return
+        yield records
+        if total is not None and page_index * page_size >= total:
+            return
+
+
+class RowWriter:
+    """流式写出 CSV / Parquet：每批结果到达即落盘，不在内存中累积全部结果。"""
+
+    def __init__(self, path: Path, columns: List[str]):
+        self.path = path
+        self.columns = columns
+        self.rows_written = 0
+        self._fh = None
+        self._csv = None
+        self._pq_writer = None
+        self._pa = None
+        if path.suffix.lower() == ".parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise RuntimeError(f"写出 Parquet 需要安装 pyarrow: {e}")
+            self._pa = pa
+            schema = pa.schema([(c, pa.string()) for c in columns])
+            self._pq_writer = pq.ParquetWriter(str(path), schema)
+        else:
+            self._fh = open(path, "w", encoding="utf-8-sig", newline="")
+            self._csv = csv.DictWriter(self._fh, fieldnames=columns, extrasaction="ignore")
+            self._csv.writeheader()
+
+    def write(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        if self._pq_writer is not None:
+            data = {c: [None if r.get(c) is None else str(r.get(c)) for r in rows] for c in self.columns}
+            self._pq_writer.write_table(self._pa.table(data))
+        else:
+            self._csv.writerows(rows)
+            self._fh.flush()
+        self.rows_written += len(rows)
+
+    def close(self):
+        if self._pq_writer is not None:
+            self._pq_writer.close()
+        if self._fh is not None:
+            self._fh.close()
+
+
+def _sync_target(target: str, args, store) -> List[Dict[str, Any]]:
+    """增量同步：已同步过的检索式翻到已知且未变的页即停止，结果取自本地专利库。"""
+    from patent_store import SyncResult, sync_query
+
+    first = store.last_sync(target) is None
+    if (first or args.full_sync) and args.all_pages:
+        from portfolio_harvest import HARVEST_WORKERS, harvest_portfolio
+        res = harvest_portfolio(target, app_key=args.app_key, app_secret=args.app_secret,
+                                workers=args.harvest_workers or HARVEST_WORKERS)
+        stats = store.upsert(res.records, query=target)
+        sync = SyncResult(query=target, pages=res.requests, new=stats.new, changed=stats.changed,
+                          unchanged=stats.unchanged, full=True)
+        store.record_sync(sync)
+    else:
+        # 首次同步受 --max-pages 限制；之后靠提前停止控制请求数
+        max_pages = args.max_pages if first and not args.full_sync else sys.maxsize
+        sync = sync_query(store, target, iter_search_records(target, app_key=args.app_key, app_secret=args.app_secret,
+                                                              max_pages=max_pages),
+                          full=True if args.full_sync else None)
+    print(f"[同步] {target}: {sync.pages} 次请求，新增 {sync.new}，变化 {sync.changed}"
+          + ("（遇到已知记录提前停止）" if sync.stopped_early else "（全量）" if sync.full else ""))
+    return [{c: r.get(c, "") for c in REQUIRED_COLUMNS} for r in store.records_for_query(target)]
+
+
+def _search_target(target: str, args, store=None) -> List[Dict[str, Any]]:
+    if store is not None:
+        return _sync_target(target, args, store)
+    if args.all_pages:
+        from portfolio_harvest import HARVEST_WORKERS, harvest_portfolio
+        res = harvest_portfolio(target, app_key=args.app_key, app_secret=args.app_secret,
+                                workers=args.harvest_workers or HARVEST_WORKERS)
+        if res.truncated or res.failed_pages:
+            print(f"[检索] {target}: {len(res.truncated)} 个子查询超出可翻页范围，{res.failed_pages} 页失败，结果可能不全",
+                  file=sys.stderr)
+        return [{c: r.get(c, "") for c in REQUIRED_COLUMNS} for r in res.records]
+    out: List[Dict[str, Any]] = []
+    for records in iter_search_records(target, app_key=args.app_key, app_secret=args.app_secret,
+                                       max_pages=args.max_pages):
+        # 与 build_dataframe 相同的列投影，但不依赖 pandas
+        out.extend({c: r.get(c, "") for c in REQUIRED_COLUMNS} for r in records)
+    return out
+
+
+def _query_fees(patent: Dict[str, Any], storage_state: Optional[dict], backend: str) -> List[Dict[str, Any]]:
+    from cnipa_fee_query import query_due_fees
+
+    app_no = re.sub(r"\D", "", patent["专利号"])
+    return _fee_rows(patent, query_due_fees(app_no, headful=False, storage_state=storage_state, backend=backend))
+
+
+_thread_local = threading.local()
+
+
+def _query_fees_with_thread_browser(patent: Dict[str, Any], storage_state: Optional[dict],
+                                    workers: List[Any]) -> List[Dict[str, Any]]:
+    """单账号线程模式 + browser 后端：每个线程一个常驻浏览器，停留在查询表单上逐个提交。"""
+    worker = getattr(_thread_local, "browser_worker", None)
+    if worker is None:
+        from fee_pool import BrowserWorker, MAX_RSS_MB
+        worker = _thread_local.browser_worker = BrowserWorker(storage_state, False, MAX_RSS_MB)
+        workers.append(worker)
+    return _fee_rows(patent, worker.query(re.sub(r"\D", "", patent["专利号"])))
+
+
+def _query_fees_with_account_browser(patent: Dict[str, Any], storage_state: dict, worker: Any) -> List[Dict[str, Any]]:
+    """多账号 + browser 后端：worker 为从账号资源池借出的常驻浏览器（AccountRegistry.wrap(..., worker=...)）。"""
+    return _fee_rows(patent, worker.query(re.sub(r"\D", "", patent["专利号"])))
+
+
+def _query_fees_in_worker(patent: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """进程池模式：在工作进程中用其常驻浏览器查询（登录态与后端由 make_fee_pool 传入）。"""
+    from fee_pool import worker_query
+    return _fee_rows(patent, worker_query(re.sub(r"\D", "", patent["专利号"])))
+
+
+def _fee_rows(patent: Dict[str, Any], fees: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    app_no_raw = patent["专利号"]
+    return [{
+        "专利号": app_no_raw,
+        "专利名称": patent.get("专利名称", ""),
+        "公司名称": patent.get("公司名称", ""),
+        "当前法律状态": patent.get("当前法律状态", ""),
+        "费用种类": fee["费用种类"],
+        "缴费期限届满日": fee["缴费期限届满日"],
+        "金额": fee["金额"],
+    } for fee in fees]
+
+
+def run_searches(targets: List[str], args, writer: Optional[RowWriter]) -> Tuple[List[Dict[str, Any]], int]:
+    """并发检索所有关键词，返回 (去重后的专利列表, 失败数)。"""
+    patents: Dict[str, Dict[str, Any]] = {}
+    failures = 0
+    store = None
+    if args.sync:
+        from patent_store import PatentStore
+        store = PatentStore(Path(args.store) if args.store else None)
+        print(f"[同步] 本地专利库 {store.path}（{len(store)} 件）")
+    with ThreadPoolExecutor(max_workers=args.search_workers) as pool:
+        futures = {pool.submit(_search_target, t, args, store): t for t in targets}
+        for fut in as_completed(futures):
+            target = futures[fut]
+            try:
+                rows = fut.result()
+            except Exception as e:
+                failures += 1
+                print(f"[检索] {target} 失败: {e}", file=sys.stderr)
+                continue
+            new_rows = [r for r in rows if r["专利号"] and r["专利号"] not in patents]
+            for r in new_rows:
+                patents[r["专利号"]] = r
+            if writer is not None:
+                writer.write(new_rows)
+            print(f"[检索] {target}: {len(rows)} 条（新增 {len(new_rows)}）")
+    if store is not None:
+        store.close()
+    if args.dataset is not None and patents:
+        from patent_dataset import PatentDataset
+        dataset = PatentDataset(Path(args.dataset) if args.dataset else None)
+        print(f"[数据集] 写入 {dataset.write(patents.values())} 条到 {dataset.path}")
+    return list(patents.values()), failures
+
+
+def _state_path(args) -> Path:
+    from cnipa_common import STATE_FILE
+    return Path(args.state) if args.state else STATE_FILE
+
+
+def _accounts_path(args) -> Optional[Path]:
+    """多账号注册表：--accounts 或已存在的 CNIPA_ACCOUNTS_FILE；都没有时返回 None（单账号）。"""
+    if args.accounts:
+        return Path(args.accounts)
+    if args.state:
+        return None
+    from cnipa_accounts import ACCOUNTS_FILE
+    return ACCOUNTS_FILE if ACCOUNTS_FILE.exists() else None
+
+
+def _wait_for_new_state(watched: Dict[Path, float], timeout: float) -> bool:
+    """轮询等待任一登录状态文件被重新生成（mtime 变化），超时返回 False。"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for path, since_mtime in watched.items():
+            try:
+                if path.stat().st_mtime > since_mtime:
+                    return True
+            except FileNotFoundError:
+                pass
+        time.sleep(min(5.0, max(0.1, deadline - time.monotonic())))
+    return False
+
+
+def _run_multi_account(pending: List[Dict[str, Any]], registry, args, **batch_kwargs):
+    """多账号：按归属路由到对应账号，其余专利分给最空闲的账号；并发数为各账号并发之和。"""
+    from fee_batch import run_fee_batch
+
+    if args.backend == "browser":
+        # 每个账号最多 concurrency 个常驻浏览器，随并发名额借出/归还；总数不超过各账号并发之和
+        from fee_pool import BrowserWorker, MAX_RSS_MB
+        query = registry.wrap(_query_fees_with_account_browser,
+                              worker=lambda acct: BrowserWorker(acct.storage_state, False, MAX_RSS_MB))
+    else:
+        query = registry.wrap(lambda p, st: _query_fees(p, st, args.backend))
+    try:
+        return run_fee_batch(pending, query, probe=registry.probe, workers=registry.total_concurrency(),
+                             probe_every=args.probe_every, **batch_kwargs)
+    finally:
+        registry.close_workers(lambda w: w.close())
+
+
+def _run_single_account(pending: List[Dict[str, Any]], storage_state: dict, args, **batch_kwargs):
+    from cnipa_http_client import probe_session
+    from fee_batch import run_fee_batch
+
+    probe = lambda: probe_session(storage_state)
+    if args.processes:
+        from fee_pool import make_fee_pool
+        with make_fee_pool(storage_state, args.backend, workers=args.processes if args.processes > 0 else None,
+                           workers_per_core=args.workers_per_core, max_rss_mb=args.worker_max_rss_mb,
+                           max_tasks_per_child=args.worker_max_tasks) as pool:
+            print(f"[年费] 进程池模式：{pool.workers} 个工作进程")
+            return run_fee_batch(
+                pending, _query_fees_in_worker, probe=probe, workers=pool.workers, executor=pool,
+                probe_every=args.probe_every, **batch_kwargs)
+    elif args.backend == "browser":
+        browser_workers: List[Any] = []
+        try:
+            return run_fee_batch(
+                pending, lambda p: _query_fees_with_thread_browser(p, storage_state, browser_workers),
+                probe=probe, workers=args.fee_workers,
+                probe_every=args.probe_every, **batch_kwargs)
+        finally:
+            for w in browser_workers:
+                w.close()
+    else:
+        return run_fee_batch(
+            pending, lambda p: _query_fees(p, storage_state, args.backend),
+            probe=probe, workers=args.fee_workers,
+            probe_every=args.probe_every, **batch_kwargs)
+
+
+def run_fee_queries(patents: List[Dict[str, Any]], args, writer: Optional[RowWriter]) -> Tuple[int, int]:
+    """并发查询年费，结果到达即写出并（可选）写入监控列表，返回 (失败数, 因登录失效未查询数)。"""
+    monitor = None
+    if args.monitor:
+        from fee_monitor_core import FeeMonitor
+        monitor = FeeMonitor()
+
+    checkpoint = None
+    if not args.no_checkpoint:
+        from fee_checkpoint import FeeCheckpoint
+        checkpoint = FeeCheckpoint(Path(args.checkpoint) if args.checkpoint else None, ttl_hours=args.checkpoint_ttl)
+        print(f"[年费] 断点文件 {checkpoint.path}（{len(checkpoint)} 条）")
+
+    state_path = _state_path(args)
+    accounts_path = _accounts_path(args)
+    if accounts_path is not None and args.processes:
+        print("[年费] 多账号模式暂不支持 --processes，改用线程模式。", file=sys.stderr)
+    total = len(patents)
+    counter = {"done": 0}
+
+    def on_result(patent, rows):
+        counter["done"] += 1
+        if writer is not None:
+            writer.write(rows)
+        added = 0
+        if monitor is not None:
+            added, _ = monitor.add_monitored_fees([dict(r) for r in rows])
+        print(f"[年费] ({counter['done']}/{total}) {patent['专利号']}: {len(rows)} 条"
+              + (f"，新增监控 {added}" if monitor is not None else ""))
+
+    def on_error(patent, e):
+        counter["done"] += 1
+        print(f"[年费] ({counter['done']}/{total}) {patent['专利号']} 失败: {str(e)[:200]}", file=sys.stderr)
+
+    failures = 0
+    pending = patents
+    while pending:
+        if accounts_path is not None:
+            from cnipa_accounts import AccountRegistry
+            try:
+                registry = AccountRegistry.load(accounts_path, concurrency=args.fee_workers)
+                watched = {a.state_path: a.state_path.stat().st_mtime for a in registry}
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[年费] 无法读取账号注册表 {accounts_path}: {e}", file=sys.stderr)
+                return failures, len(pending)
+            print(f"[年费] 多账号模式：{len(registry)} 个账号，共 {registry.total_concurrency()} 个并发")
+            outcome = _run_multi_account(pending, registry, args, on_result=on_result, on_error=on_error,
+                                         checkpoint=checkpoint)
+            for row in registry.status():
+                print(f"[年费] 账号 {row['账号']}：{row['状态']}，完成 {row['完成']}，失败 {row['失败']}，"
+                      f"限流 {row['限流次数']} 次 / 等待 {row['限流等待(s)']}s"
+                      + (f"（{row['原因']}）" if row["原因"] else ""))
+            # 只等待失效账号的 state 文件被更新
+            watched = {a.state_path: watched[a.state_path] for a in registry if a.expired} or watched
+        else:
+            try:
+                watched = {state_path: state_path.stat().st_mtime}
+                storage_state = json.loads(state_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                print(f"[年费] 无法读取登录状态 {state_path}: {e}", file=sys.stderr)
+                return failures, len(pending)
+            outcome = _run_single_account(pending, storage_state, args, on_result=on_result, on_error=on_error,
+                                          checkpoint=checkpoint)
+        if outcome.from_checkpoint:
+            print(f"[年费] {outcome.from_checkpoint} 个专利使用断点结果")
+        failures += len(outcome.failed)
+        pending = outcome.pending
+        if not pending:
+            break
+        reason = outcome.reason or "账号 " + "、".join(outcome.expired_accounts) + " 登录已失效"
+        print(f"[年费] 登录状态已失效（{reason}），剩余 {len(pending)} 个专利未查询。", file=sys.stderr)
+        if args.relogin_wait <= 0:
+            break
+        print(f"[年费] 请重新登录并更新 {'、'.join(str(p) for p in watched)}，最多等待 {args.relogin_wait:.0f}s…",
+              file=sys.stderr)
+        if not _wait_for_new_state(watched, args.relogin_wait):
+            print("[年费] 等待超时。", file=sys.stderr)
+            break
+        print("[年费] 检测到新的登录状态，继续查询。")
+    if checkpoint is not None:
+        checkpoint.compact()
+    if args.backend == "browser" and (not args.processes or accounts_path is not None):
+        from cnipa_fee_query import get_block_stats
+        bs = get_block_stats()
+        if bs["queries"]:
+            print(f"[年费] 资源拦截：{bs['queries']} 次查询共 {bs['requests']} 个请求，拦截 {bs['blocked']} 个 "
+                  f"{bs['blocked_by_type']}，平均每次加载 {bs['loaded_bytes'] / bs['queries'] / 1024:.0f} KB")
+    return failures, len(pending)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="批量专利检索与年费查询（无界面）")
+    ap.add_argument("targets", help="目标文件：每行一个公司名称/关键词或申请号")
+    ap.add_argument("--mode", choices=["search", "fees", "all"], default="all",
+                    help="search 仅检索；fees 仅查询年费；all 检索后查询年费（默认）")
+    ap.add_argument("--out", help="检索结果输出文件（.csv 或 .parquet）")
+    ap.add_argument("--fees-out", help="年费结果输出文件（.csv 或 .parquet）")
+    ap.add_argument("--max-pages", type=int, default=5, help="每个关键词最多获取页数（每页 10 条）")
+    ap.add_argument("--search-workers", type=int, default=4, help="检索并发数")
+    ap.add_argument("--sync", action="store_true",
+                    help="增量同步：结果写入本地专利库，已同步过的关键词只获取新增/变化的专利")
+    ap.add_argument("--full-sync", action="store_true", help="配合 --sync：本次取完全部页（发现较早专利的状态变化）")
+    ap.add_argument("--store", metavar="PATH", help="本地专利库文件；默认 PATENT_STORE_FILE / patent_store.sqlite3")
+    ap.add_argument("--dataset", nargs="?", const="", default=None, metavar="DIR",
+                    help="检索结果合并写入本地 Parquet 数据集；默认目录 PATENT_DATASET_DIR / patent_dataset")
+    ap.add_argument("--all-pages", action="store_true",
+                    help="获取每个关键词的全部命中（按申请日/类型切分检索式并发翻页，忽略 --max-pages）")
+    ap.add_argument("--harvest-workers", type=int, default=None, metavar="N",
+                    help="--all-pages 时每个关键词的翻页并发数（默认 BAITEN_HARVEST_WORKERS / 8）")
+    ap.add_argument("--fee-workers", type=int, default=2, help="年费查询并发数（browser 后端每个并发一个浏览器）")
+    ap.add_argument("--backend", choices=["browser", "http"], default=os.getenv("CNIPA_FEE_BACKEND", "browser"),
+                    help="年费查询后端：browser（Playwright）或 http（实验性，复用登录 cookie 直连接口，需设置 CNIPA_FEE_API_URL）")
+    ap.add_argument("--processes", type=int, default=0, metavar="N",
+                    help="多进程查询：N 个工作进程（-1 为 CPU 核数 × --workers-per-core）；0 为线程模式（默认）")
+    ap.add_argument("--workers-per-core", type=float, default=None,
+                    help="--processes -1 时每核进程数，默认 CNIPA_WORKERS_PER_CORE / 0.5")
+    ap.add_argument("--worker-max-rss-mb", type=float, default=None,
+                    help="单个工作进程（含浏览器）内存上限，超过后重启其浏览器；默认 CNIPA_WORKER_MAX_RSS_MB / 1500")
+    ap.add_argument("--worker-max-tasks", type=int, default=None, help="每个工作进程处理多少个专利后整体回收")
+    ap.add_argument("--state", help="CNIPA 登录状态文件；默认使用 CNIPA_STATE_FILE / state.json")
+    ap.add_argument("--accounts", metavar="PATH",
+                    help="多账号注册表（见 cnipa_accounts.py）；默认在 CNIPA_ACCOUNTS_FILE 存在且未指定 --state 时使用，"
+                         "此时 --fee-workers 为每个账号的并发数")
+    ap.add_argument("--probe-every", type=int, default=25, help="每查询多少个专利探测一次登录态")
+    ap.add_argument("--relogin-wait", type=float, default=0.0, metavar="SECONDS",
+                    help="登录失效时等待 state.json 更新的秒数；0 为立即退出（默认）")
+    ap.add_argument("--checkpoint", metavar="PATH", help="断点文件；默认 FEE_CHECKPOINT_FILE / fee_query_checkpoint.jsonl")
+    ap.add_argument("--checkpoint-ttl", type=float, default=None, metavar="HOURS",
+                    help="断点结果有效期（小时），默认 FEE_CHECKPOINT_TTL_HOURS / 24")
+    ap.add_argument("--no-checkpoint", action="store_true", help="不读写断点，全部重新查询")
+    ap.add_argument("--monitor", action="store_true", help="将查询到的年费写入年费监控列表")
+    ap.add_argument("--timing", metavar="PATH", help="开启耗时统计并在结束时写出（.json 或 .prom）")
+    ap.add_argument("--app-key", default=DEFAULT_APP_KEY)
+    ap.add_argument("--app-secret", default=DEFAULT_APP_SECRET)
+    return ap
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    targets_path = Path(args.targets)
+    if not targets_path.exists():
+        print(f"文件不存在: {targets_path}", file=sys.stderr)
+        return 2
+    if args.max_pages < 1 or args.search_workers < 1 or args.fee_workers < 1 or args.probe_every < 1:
+        print("--max-pages / --search-workers / --fee-workers / --probe-every 必须为正整数", file=sys.stderr)
+        return 2
+    args.sync = args.sync or args.full_sync
+    if args.mode in ("fees", "all") and args.backend == "http":
+        from cnipa_http_client import HTTP_BACKEND_DISABLED, http_backend_enabled
+        if not http_backend_enabled():
+            print(HTTP_BACKEND_DISABLED, file=sys.stderr)
+            return 2
+        print("[年费] 注意：http 后端为实验性，费用接口尚未对正式站点确认。", file=sys.stderr)
+
+    targets = read_targets(targets_path)
+    app_nos = [t for t in targets if is_application_number(t)]
+    queries = [t for t in targets if not is_application_number(t)]
+    print(f"共 {len(targets)} 个目标：关键词 {len(queries)} 个，申请号 {len(app_nos)} 个")
+
+    if args.timing:
+        timing.enable()
+    t0 = time.time()
+    failures = 0
+    unfinished = 0
+    search_writer = RowWriter(Path(args.out), REQUIRED_COLUMNS) if args.out else None
+    fee_writer = RowWriter(Path(args.fees_out), FEE_COLUMNS) if args.fees_out else None
+    try:
+        patents: List[Dict[str, Any]] = []
+        if args.mode in ("search", "all") and queries:
+            patents, failures = run_searches(queries, args, search_writer)
+        if args.mode in ("fees", "all"):
+            known = {p["专利号"] for p in patents}
+            patents.extend({"专利号": a} for a in app_nos if a not in known)
+            if patents:
+                fee_failures, unfinished = run_fee_queries(patents, args, fee_writer)
+                failures += fee_failures
+    finally:
+        for w in (search_writer, fee_writer):
+            if w is not None:
+                w.close()
+                print(f"已写出 {w.rows_written} 行 -> {w.path}")
+        if args.timing:
+            timing.dump(args.timing)
+            print(f"耗时统计已写出 -> {args.timing}")
+
+    print(f"完成，用时 {time.time() - t0:.1f}s，失败 {failures} 个"
+          + (f"，登录失效未查询 {unfinished} 个" if unfinished else ""))
+    if unfinished:
+        return 3
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
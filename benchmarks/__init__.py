@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""性能基准脚本集合，均以 `python -m benchmarks.<name>` 方式在仓库根目录运行。"""
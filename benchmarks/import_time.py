@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+导入耗时基准（基于 python -X importtime）
+用法：
+    python -m benchmarks.import_time            # 检查所有模块是否超出预算
+    python -m benchmarks.import_time --json     # 输出机器可读结果
+返回码：0 全部在预算内；1 有模块超出预算。
+
+每个模块在全新的解释器中导入，重复多次取最小值，避免磁盘缓存抖动。
+预算针对无界面批处理用到的纯 Python 层，确保 headless worker 毫秒级启动，
+同时断言这些模块不会顺带导入 streamlit / pandas / playwright。
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 模块 -> 导入耗时预算（毫秒，累计，含依赖）
+BUDGETS_MS: Dict[str, float] = {
+    "fee_monitor_core": 30.0,
+    "data_utils": 30.0,
+    "cnipa_fee_query": 80.0,  # asyncio 约占 40ms
+    "batch_cli": 250.0,  # 含 requests
+}
+
+# 这些模块不得出现在上述轻量模块的导入链中
+FORBIDDEN = ("streamlit", "pandas", "playwright", "plotly")
+
+
+def measure(module: str) -> Tuple[float, List[str]]:
+    """在子进程中导入模块，返回 (累计耗时毫秒, 导入链中出现的重型模块)。"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(ROOT), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{proc.stderr[-2000:]}")
+    total_us = None
+    heavy = set()
+    for line in proc.stderr.splitlines():
+        # 格式: "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].strip()
+        top = name.split(".")[0]
+        if top in FORBIDDEN:
+            heavy.add(top)
+        if name == module:
+            total_us = int(parts[1].strip())
+    if total_us is None:
+        raise RuntimeError(f"未在 importtime 输出中找到 {module}")
+    return total_us / 1000.0, sorted(heavy)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="检查模块导入耗时是否在预算内")
+    ap.add_argument("--repeat", type=int, default=5, help="每个模块重复测量次数（取最小值）")
+    ap.add_argument("--json", action="store_true", help="输出 JSON")
+    args = ap.parse_args(argv)
+
+    results = []
+    failed = False
+    for module, budget in BUDGETS_MS.items():
+        samples = [measure(module) for _ in range(max(1, args.repeat))]
+        best = min(s[0] for s in samples)
+        heavy = samples[0][1]
+        ok = best <= budget and not heavy
+        failed |= not ok
+        results.append({"module": module, "ms": round(best, 2), "budget_ms": budget, "heavy_imports": heavy, "ok": ok})
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for r in results:
+            flag = "OK " if r["ok"] else "超出"
+            extra = f"  重型依赖: {', '.join(r['heavy_imports'])}" if r["heavy_imports"] else ""
+            print(f"[{flag}] {r['module']:<20} {r['ms']:>8.1f} ms / 预算 {r['budget_ms']:.0f} ms{extra}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
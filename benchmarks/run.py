@@ -0,0 +1,550 @@
+# -*- coding: utf-8 -*-
+"""
+全流程基准测试
+用法：
+    python -m benchmarks.run                       # 全部规模，结果写入 benchmarks/results/latest.json
+    python -m benchmarks.run --quick               # 仅小规模，适合提交前自检
+    python -m benchmarks.run --only monitor,data   # 只跑指定区域
+    python -m benchmarks.run --update-baseline     # 将本次结果写为基线 benchmarks/baseline.json
+返回码：0 无回归；1 存在超出容差的回归。
+
+区域：
+  data      normalize_baiten_payload + build_dataframe（1k/10k/100k 条合成文档）
+  analysis  apply_filters（filters_ui 同款筛选）与 dashboard_aggregates 分组统计；
+            fee_projection 全部未来年费的展开与按年份 / 公司×年份汇总；
+            fee_cube 年费成本立方体的全量构建、1% 记录变化后的增量同步、切片汇总，以及不用立方体逐行重算的对比
+  monitor   FeeMonitor 加载 / 新增 / 删除 / 紧急程度（1k–100k 条）
+  render    检索结果表格交给 st.dataframe 序列化的耗时（10k/50k 行）：旧版逐格回调着色、整列样式数组着色、
+            不着色（超过 PATENT_STYLE_MAX_ROWS 时的列配置渲染）
+  cnipa     费用行提取：Python 参考实现 parse_fee_tables（静态页面适配器）；Playwright 中
+            浏览器内提取 _extract_fee_rows 与旧方式（序列化全部表格 + Python 解析）对比，两者结果须一致；
+            对本地模拟站点完整查询一次，对比开启/关闭资源拦截的耗时与加载字节数；
+            多个专利逐个开页面查询 vs CnipaFeeSession 单页面连续查询的单专利耗时
+            （本机未安装 Chromium 时浏览器用例记为 skipped）
+
+基线与机器相关，更换机器或依赖版本后应重新 --update-baseline。
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.synthetic import make_baiten_payload, make_monitor_entries, make_fee_page_html
+
+HERE = Path(__file__).resolve().parent
+FIXTURES = HERE / "fixtures"
+DEFAULT_OUT = HERE / "results" / "latest.json"
+DEFAULT_BASELINE = HERE / "baseline.json"
+
+AREAS = ("data", "analysis", "monitor", "render", "cnipa")
+
+
+def bench(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """运行 fn repeat 次（每次前执行 setup，不计时），返回中位数/最小值（秒）。"""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "repeat": repeat}
+
+
+# ------- data -------
+def bench_data(sizes: List[int]) -> Dict[str, Dict[str, Any]]:
+    from data_utils import normalize_baiten_payload, build_dataframe
+
+    out = {}
+    for n in sizes:
+        payload = make_baiten_payload(n)
+        repeat = 5 if n <= 10_000 else 2
+        records = normalize_baiten_payload(payload)[0]
+        out[f"data.normalize[{n}]"] = {**bench(lambda: normalize_baiten_payload(payload), repeat), "size": n}
+        out[f"data.build_dataframe[{n}]"] = {**bench(lambda: build_dataframe(records), repeat), "size": n}
+    return out
+
+
+# ------- analysis -------
+def bench_analysis(sizes: List[int]) -> Dict[str, Dict[str, Any]]:
+    from data_utils import normalize_baiten_payload, build_dataframe, apply_filters, dashboard_aggregates
+    from fee_projection import project_fees, rollup_by_company_year, rollup_by_year
+
+    out = {}
+    for n in sizes:
+        df = build_dataframe(normalize_baiten_payload(make_baiten_payload(n))[0])
+        companies = sorted(df["公司名称"].unique())[:20]
+        filters = {
+            "公司名称": companies,
+            "专利类型": ["发明", "实用新型"],
+            "法律状态": ["有权", "专利权维持"],
+            "发明人关键词": "张",
+            "开始": "2012-01-01",
+            "结束": "2022-12-31",
+        }
+        repeat = 5 if n <= 10_000 else 3
+        out[f"analysis.filters[{n}]"] = {**bench(lambda: apply_filters(df, filters), repeat), "size": n}
+        out[f"analysis.filter_options[{n}]"] = {**bench(
+            lambda: [sorted(x for x in df[c].unique() if x) for c in ("公司名称", "专利类型", "当前法律状态")], repeat), "size": n}
+        out[f"analysis.dashboard[{n}]"] = {**bench(lambda: dashboard_aggregates(df), repeat), "size": n}
+        projection = project_fees(df)
+        out[f"analysis.fee_projection[{n}]"] = {**bench(lambda: project_fees(df), repeat), "size": n,
+                                                "rows": len(projection)}
+        out[f"analysis.fee_rollup[{n}]"] = {**bench(
+            lambda: (rollup_by_year(projection), rollup_by_company_year(projection)), repeat), "size": n}
+        out.update(_bench_fee_cube(n, repeat))
+    return out
+
+
+def _bench_fee_cube(n: int, repeat: int) -> Dict[str, Dict[str, Any]]:
+    import pandas as pd
+    from fee_cube import FeeCube, slice_cube
+    from fee_monitor import urgency_frame
+
+    fees = make_monitor_entries(n)
+    changed = fees[n // 100:] + make_monitor_entries(n // 100, start=n)
+    state: Dict[str, Any] = {}
+
+    def built():
+        state["cube"] = FeeCube()
+        state["cube"].sync("monitor", 1, lambda: fees)
+
+    built()
+    frame = state["cube"].frame()
+    company = list(frame["公司名称"].cat.categories[:5])
+    raw = pd.DataFrame(fees)
+
+    def rescan():
+        """不使用立方体：每次筛选都从原始记录解析金额、计算紧急程度后分组。"""
+        df = raw[raw["公司名称"].isin(company)]
+        level = urgency_frame(df["缴费期限届满日"], df["当前法律状态"])["level"]
+        amount = pd.to_numeric(df["金额"].str.replace(",", ""), errors="coerce")
+        return amount.groupby([df["缴费期限届满日"].str[:7], level]).agg(["sum", "size"])
+
+    return {
+        f"analysis.fee_cube_build[{n}]": {**bench(built, repeat), "size": n, "cells": len(frame)},
+        f"analysis.fee_cube_sync_1pct[{n}]": {**bench(lambda: state["cube"].sync("monitor", 2, lambda: changed),
+                                                        repeat, setup=built), "size": n},
+        f"analysis.fee_cube_slice[{n}]": {**bench(
+            lambda: slice_cube(frame, ["缴费月份", "紧急程度"], 公司名称=company), repeat), "size": n},
+        f"analysis.fee_rescan[{n}]": {**bench(rescan, repeat), "size": n},
+    }
+
+
+# ------- monitor -------
+def bench_monitor(sizes: List[int], ops: int = 10) -> Dict[str, Dict[str, Any]]:
+    from fee_monitor_core import FeeMonitor
+
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = Path(tmp) / f"monitor_{n}.json"
+            entries = make_monitor_entries(n)
+            extra = make_monitor_entries(ops, start=n)
+
+            def reset_file():
+                path.write_text(json.dumps(entries, ensure_ascii=False), encoding="utf-8")
+
+            reset_file()
+            repeat = 3 if n <= 10_000 else 1
+            out[f"monitor.load[{n}]"] = {**bench(lambda: FeeMonitor(data_file=str(path)), repeat), "size": n}
+
+            state: Dict[str, Any] = {}
+
+            def fresh_monitor():
+                reset_file()
+                state["m"] = FeeMonitor(data_file=str(path))
+
+            def add_ops():
+                for e in extra:
+                    state["m"].add_monitored_fee(dict(e))
+
+            def remove_ops():
+                for _ in range(ops):
+                    state["m"].remove_monitored_fee(0)
+
+            r = bench(add_ops, repeat, setup=fresh_monitor)
+            out[f"monitor.add_per_op[{n}]"] = {"median_s": r["median_s"] / ops, "min_s": r["min_s"] / ops, "repeat": repeat, "size": n}
+            r = bench(remove_ops, repeat, setup=fresh_monitor)
+            out[f"monitor.remove_per_op[{n}]"] = {"median_s": r["median_s"] / ops, "min_s": r["min_s"] / ops, "repeat": repeat, "size": n}
+
+            fresh_monitor()
+            out[f"monitor.urgency[{n}]"] = {**bench(state["m"].get_monitored_fees_with_urgency, repeat), "size": n}
+    return out
+
+
+# ------- cnipa -------
+class _TableHTMLParser(HTMLParser):
+    """把 HTML 解析成 parse_fee_tables 需要的结构：每个 table 的行/单元格文本与 body 文本。"""
+
+    def __init__(self):
+        super().__init__()
+        self.tables: List[List[List[str]]] = []
+        self.text_parts: List[str] = []
+        self._stack: List[List[List[str]]] = []
+        self._cell: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._stack.append([])
+        elif tag == "tr" and self._stack:
+            self._stack[-1].append([])
+        elif tag in ("td", "th") and self._stack:
+            self._cell = []
+        elif tag in ("div", "tr", "br", "p"):
+            self.text_parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "table" and self._stack:
+            self.tables.append(self._stack.pop())
+        elif tag in ("td", "th") and self._cell is not None and self._stack and self._stack[-1]:
+            self._stack[-1][-1].append("".join(self._cell).strip())
+            self._cell = None
+            self.text_parts.append("\t")
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+        self.text_parts.append(data)
+
+
+class StaticPage:
+    """只实现旧版提取用到的两个 Page 方法（表格序列化 + body 文本），用于在无浏览器时测量 Python 侧解析开销。"""
+
+    def __init__(self, html: str):
+        p = _TableHTMLParser()
+        p.feed(html)
+        self._tables = p.tables
+        self._text = "".join(p.text_parts)
+
+    async def eval_on_selector_all(self, selector: str, expression: str):
+        return self._tables if selector == "table" else []
+
+    async def inner_text(self, selector: str) -> str:
+        return self._text
+
+
+# ------- render -------
+def _legacy_style_table(df):
+    """旧版 app._style_table：Styler.map + 逐格 Python 回调。"""
+    def color_type(val: str) -> str:
+        if val == "发明": return "background-color:#e3f2fd;color:#0b61b7;"
+        if val == "实用新型": return "background-color:#e8f5e9;color:#1b5e20;"
+        if val == "外观设计": return "background-color:#fff3e0;color:#e65100;"
+        return ""
+
+    def color_status(val: str) -> str:
+        if not isinstance(val, str): return ""
+        if "有权" in val: return "background-color:#e8f5e9;color:#1b5e20;"
+        if "无效" in val or "失效" in val: return "background-color:#ffebee;color:#b71c1c;"
+        return ""
+
+    return df.style.map(color_type, subset=["专利类型"]).map(color_status, subset=["当前法律状态"])
+
+
+def bench_render(sizes: List[int]) -> Dict[str, Dict[str, Any]]:
+    import pandas as pd
+    from streamlit.elements.arrow import marshall
+    from streamlit.proto.Arrow_pb2 import Arrow as ArrowProto
+
+    from data_utils import build_dataframe, normalize_baiten_payload, result_styles
+
+    def to_proto(data):
+        marshall(ArrowProto(), data, "bench")
+
+    out = {}
+    for n in sizes:
+        df = build_dataframe(normalize_baiten_payload(make_baiten_payload(n))[0])
+        repeat = 3 if n <= 10_000 else 1
+        out[f"render.plain[{n}]"] = {**bench(lambda: to_proto(df), repeat), "size": n}
+        styles = result_styles(df)
+        out[f"render.style_arrays[{n}]"] = {**bench(lambda: result_styles(df), repeat), "size": n}
+        if df.size > pd.get_option("styler.render.max_elements"):
+            # Streamlit 拒绝渲染超过 styler.render.max_elements 个单元格的 Styler，界面在此规模改用列配置渲染
+            reason = f"{df.size} 个单元格超过 styler.render.max_elements"
+            out[f"render.styled_legacy[{n}]"] = out[f"render.styled_arrays[{n}]"] = {"skipped": reason}
+            continue
+        legacy = _legacy_style_table(df)
+        legacy._compute()
+        current = df.style.apply(lambda _: styles, axis=None, subset=list(styles.columns))
+        current._compute()
+        if legacy.ctx != current.ctx:
+            raise AssertionError(f"render[{n}]: 整列样式与逐格回调的结果不一致")
+        out[f"render.styled_legacy[{n}]"] = {**bench(lambda: to_proto(_legacy_style_table(df)), repeat), "size": n}
+        out[f"render.styled_arrays[{n}]"] = {**bench(
+            lambda: to_proto(df.style.apply(lambda _: styles, axis=None, subset=list(styles.columns))), repeat), "size": n}
+    return out
+
+
+def _cnipa_pages() -> Dict[str, str]:
+    return {
+        "fixture": (FIXTURES / "cnipa_fee_result.html").read_text(encoding="utf-8"),
+        "fixture_text": (FIXTURES / "cnipa_fee_result_text.html").read_text(encoding="utf-8"),
+        "large": make_fee_page_html(n_rows=500, n_layout_tables=50),
+        "xlarge": make_fee_page_html(n_rows=2000, n_layout_tables=300),
+    }
+
+
+# 旧版 _extract_fee_rows：把页面上所有表格的全部单元格传回 Python 再解析
+_ALL_TABLES_JS = """(nodes) => nodes.map(t =>
+    Array.from(t.querySelectorAll('tr')).map(tr =>
+        Array.from(tr.querySelectorAll('th,td')).map(td => td.innerText.trim())))"""
+
+
+async def _legacy_extract(page):
+    from cnipa_fee_query import parse_fee_tables
+    tables = await page.eval_on_selector_all("table", _ALL_TABLES_JS)
+    rows = parse_fee_tables(tables, "")
+    return rows if rows else parse_fee_tables([], await page.inner_text("body"))
+
+
+def bench_cnipa() -> Dict[str, Dict[str, Any]]:
+    out = {}
+    pages = _cnipa_pages()
+    for name, html in pages.items():
+        page = StaticPage(html)
+        rows = asyncio.run(_legacy_extract(page))
+        if not rows:
+            raise AssertionError(f"{name}: 未解析出任何费用行")
+        out[f"cnipa.extract_python[{name}]"] = {
+            **bench(lambda: asyncio.run(_legacy_extract(page)), 20), "rows": len(rows)}
+    out.update(_bench_cnipa_browser(pages))
+    out.update(_bench_cnipa_blocking())
+    out.update(_bench_cnipa_session())
+    return out
+
+
+def _bench_cnipa_browser(pages: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    from cnipa_fee_query import _extract_fee_rows
+
+    async def run():
+        from playwright.async_api import async_playwright
+        res = {}
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            page = await browser.new_page()
+            for name, html in pages.items():
+                await page.set_content(html)
+                rows = await _extract_fee_rows(page)
+                legacy = await _legacy_extract(page)
+                if rows != legacy:
+                    raise AssertionError(f"{name}: 浏览器内提取与旧版结果不一致")
+                for case, fn in (("extract_browser", _extract_fee_rows), ("extract_browser_legacy", _legacy_extract)):
+                    samples = []
+                    for _ in range(10):
+                        t0 = time.perf_counter()
+                        await fn(page)
+                        samples.append(time.perf_counter() - t0)
+                    res[f"cnipa.{case}[{name}]"] = {
+                        "median_s": statistics.median(samples), "min_s": min(samples), "repeat": len(samples), "rows": len(rows)}
+            await browser.close()
+        return res
+
+    try:
+        return asyncio.run(run())
+    except AssertionError:
+        raise
+    except Exception as e:
+        reason = str(e).splitlines()[0][:200] if str(e) else type(e).__name__
+        return {f"cnipa.{case}[{name}]": {"skipped": reason}
+                for case in ("extract_browser", "extract_browser_legacy") for name in pages}
+
+
+def _bench_cnipa_blocking(repeat: int = 3) -> Dict[str, Dict[str, Any]]:
+    """模拟站点上的完整查询：关闭/开启资源拦截各跑 repeat 次，两种模式解析结果必须一致。"""
+    from urllib.parse import urlparse
+    from cnipa_fee_query import ResourcePolicy, _new_browser_context, _query_on_page
+    from mock_servers import cnipa
+    from mock_servers.common import running
+
+    app_no = "2022229271641"
+
+    async def run(base: str):
+        roots = [f"{base}/od/public/index"]
+        policies = {
+            "unblocked": ResourcePolicy(block_types=frozenset(), block_third_party=False),
+            "blocked": ResourcePolicy(first_party=(urlparse(base).hostname,)),
+        }
+        res, rows_by_mode = {}, {}
+        from playwright.async_api import async_playwright
+        async with async_playwright() as p:
+            for mode, policy in policies.items():
+                samples, stats, steps = [], None, {}
+                for _ in range(repeat):
+                    browser, ctx, stats = await _new_browser_context(p, False, cnipa.mock_storage_state(base), policy)
+                    t0 = time.perf_counter()
+                    steps = {}
+                    rows_by_mode[mode] = await _query_on_page(await ctx.new_page(), app_no, roots, steps)
+                    samples.append(time.perf_counter() - t0)
+                    await browser.close()
+                res[f"cnipa.query_mock[{mode}]"] = {
+                    "median_s": statistics.median(samples), "min_s": min(samples), "repeat": repeat,
+                    "rows": len(rows_by_mode[mode]), **stats.as_dict(),
+                    "steps_ms": {k: round(v * 1000, 1) for k, v in steps.items()}}
+        if rows_by_mode["blocked"] != rows_by_mode["unblocked"] or not rows_by_mode["blocked"]:
+            raise AssertionError("开启资源拦截后解析结果不一致")
+        blocked, unblocked = res["cnipa.query_mock[blocked]"], res["cnipa.query_mock[unblocked]"]
+        blocked["bytes_saved"] = unblocked["loaded_bytes"] - blocked["loaded_bytes"]
+        blocked["time_saved_s"] = unblocked["median_s"] - blocked["median_s"]
+        return res
+
+    try:
+        with running(cnipa.make_server(config=cnipa.CnipaConfig(page_latency_ms=50))) as base:
+            return asyncio.run(run(base))
+    except AssertionError:
+        raise
+    except Exception as e:
+        reason = str(e).splitlines()[0][:200] if str(e) else type(e).__name__
+        return {f"cnipa.query_mock[{m}]": {"skipped": reason} for m in ("unblocked", "blocked")}
+
+
+def _bench_cnipa_session(n: int = 10) -> Dict[str, Dict[str, Any]]:
+    """n 个专利：每个专利一个新页面走完整流程 vs 单页面 CnipaFeeSession，结果必须一致。"""
+    from cnipa_fee_query import CnipaFeeSession, _new_browser_context, _query_on_page
+    from mock_servers import cnipa
+    from mock_servers.common import running
+
+    app_nos = [f"20222{i:08d}" for i in range(n)]
+
+    async def run(base: str):
+        roots = [f"{base}/od/public/index"]
+        from playwright.async_api import async_playwright
+        async with async_playwright() as p:
+            browser, ctx, _ = await _new_browser_context(p, False, cnipa.mock_storage_state(base))
+            t0 = time.perf_counter()
+            per_page = []
+            for a in app_nos:
+                page = await ctx.new_page()
+                per_page.append(await _query_on_page(page, a, roots))
+                await page.close()
+            t_page = (time.perf_counter() - t0) / n
+            t0 = time.perf_counter()
+            async with CnipaFeeSession(ctx, roots) as sess:
+                t_open = time.perf_counter() - t0
+                session = [await sess.query(a) for a in app_nos]
+            t_sess = (time.perf_counter() - t0) / n
+            await browser.close()
+        if session != per_page:
+            raise AssertionError("单页面查询结果与逐页查询不一致")
+        return {
+            "cnipa.multi_query[page_per_patent]": {"median_s": t_page, "repeat": n},
+            "cnipa.multi_query[session]": {"median_s": t_sess, "repeat": n, "open_s": t_open},
+        }
+
+    try:
+        with running(cnipa.make_server(config=cnipa.CnipaConfig(page_latency_ms=50, latency_ms=20))) as base:
+            return asyncio.run(run(base))
+    except AssertionError:
+        raise
+    except Exception as e:
+        reason = str(e).splitlines()[0][:200] if str(e) else type(e).__name__
+        return {f"cnipa.multi_query[{m}]": {"skipped": reason} for m in ("page_per_patent", "session")}
+
+
+# ------- 基线比较 -------
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, floor_s: float) -> List[Dict[str, Any]]:
+    """返回每个共有用例的对比；median 超过 baseline*(1+tolerance) 且差值超过 floor_s 记为回归。"""
+    rows = []
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if not base or "median_s" not in cur or "median_s" not in base:
+            continue
+        ratio = cur["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        regressed = ratio > 1 + tolerance and (cur["median_s"] - base["median_s"]) > floor_s
+        rows.append({"case": name, "baseline_s": base["median_s"], "current_s": cur["median_s"],
+                     "ratio": round(ratio, 3), "regressed": regressed})
+    return rows
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="专利检索/年费监控全流程基准测试")
+    ap.add_argument("--quick", action="store_true", help="只跑小规模（1k/10k）")
+    ap.add_argument("--only", help=f"逗号分隔的区域：{','.join(AREAS)}")
+    ap.add_argument("--out", default=str(DEFAULT_OUT), help="结果输出 JSON")
+    ap.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="基线 JSON")
+    ap.add_argument("--update-baseline", action="store_true", help="将本次结果写为基线")
+    ap.add_argument("--tolerance", type=float, default=0.5, help="允许的相对变慢比例（默认 0.5 即 1.5 倍）")
+    ap.add_argument("--floor-ms", type=float, default=5.0, help="低于该绝对差值（毫秒）的变化不算回归")
+    args = ap.parse_args(argv)
+
+    areas = [a.strip() for a in args.only.split(",")] if args.only else list(AREAS)
+    unknown = set(areas) - set(AREAS)
+    if unknown:
+        print(f"未知区域: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    big = [1_000, 10_000] if args.quick else [1_000, 10_000, 100_000]
+
+    results: Dict[str, Dict[str, Any]] = {}
+    runners = {
+        "data": lambda: bench_data(big),
+        "analysis": lambda: bench_analysis(big[1:]),
+        "monitor": lambda: bench_monitor(big),
+        "render": lambda: bench_render([10_000] if args.quick else [10_000, 50_000]),
+        "cnipa": bench_cnipa,
+    }
+    for area in areas:
+        t0 = time.perf_counter()
+        results.update(runners[area]())
+        print(f"[{area}] 完成，用时 {time.perf_counter() - t0:.1f}s")
+
+    for name, r in results.items():
+        if "skipped" in r:
+            print(f"  {name:<42} skipped: {r['skipped']}")
+        else:
+            extra = ""
+            if "bytes_saved" in r:
+                extra = f"  (拦截 {r['blocked']} 个请求，节省 {r['bytes_saved'] / 1024:.0f} KB / {r['time_saved_s'] * 1000:.0f} ms)"
+            print(f"  {name:<42} {r['median_s'] * 1000:>10.2f} ms{extra}")
+            if "steps_ms" in r:
+                print("      " + "  ".join(f"{k}={v:g}ms" for k, v in r["steps_ms"].items()))
+
+    import pandas as pd
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"结果已写入 {out}")
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        merged = {}
+        if baseline_path.exists():
+            merged = json.loads(baseline_path.read_text(encoding="utf-8")).get("results", {})
+        merged.update({k: v for k, v in results.items() if "median_s" in v})
+        baseline_path.write_text(json.dumps({"meta": report["meta"], "results": merged}, ensure_ascii=False, indent=2),
+                                 encoding="utf-8")
+        print(f"基线已更新 {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print("未找到基线，跳过回归比较（可用 --update-baseline 生成）")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8")).get("results", {})
+    rows = compare(results, baseline, args.tolerance, args.floor_ms / 1000.0)
+    regressions = [r for r in rows if r["regressed"]]
+    for r in rows:
+        mark = "回归" if r["regressed"] else "  "
+        print(f"{mark} {r['case']:<42} x{r['ratio']:.2f}")
+    print(f"对比 {len(rows)} 个用例，回归 {len(regressions)} 个（容差 {args.tolerance:.0%}）")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试用的合成数据（固定随机种子，结果可复现）
+  - make_baiten_payload(n)：百腾检索接口返回体（documents / field_values / total）
+  - make_monitor_entries(n)：年费监控条目
+  - make_fee_page_html(n_rows, n_layout_tables)：CNIPA 应缴费查询结果页
+"""
+
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+COMPANIES = [f"安徽测试{i:03d}科技有限公司" for i in range(200)]
+TYPES = ["cn_in", "cn_um", "cn_dm"]
+TYPE_LABELS = {"cn_in": "发明", "cn_um": "实用新型", "cn_dm": "外观设计"}
+STATUSES = ["有权", "审中", "无权", "专利权维持", "专利权终止无权"]
+SURNAMES = "张王李赵刘陈杨黄周吴"
+
+
+def _app_no(rng: random.Random, year: int, ptype: str) -> str:
+    kind = {"cn_in": "1", "cn_um": "2", "cn_dm": "3"}[ptype]
+    return f"CN{year}{kind}{rng.randint(0, 9999999):07d}.{rng.randint(0, 9)}"
+
+
+def make_baiten_documents(n: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n):
+        ptype = rng.choice(TYPES)
+        ad = date(2010, 1, 1) + timedelta(days=rng.randint(0, 5400))
+        granted = rng.random() < 0.7
+        docs.append({
+            "field_values": {
+                "pa": [rng.choice(COMPANIES)],
+                "ti": f"一种测试装置及其方法{i}",
+                "type": [ptype, "cn_gp"] if granted else [ptype],
+                "an": _app_no(rng, ad.year, ptype),
+                "ad": ad.strftime("%Y%m%d"),
+                "pd": (ad + timedelta(days=rng.randint(180, 900))).strftime("%Y.%m.%d") if granted else "",
+                "in": [rng.choice(SURNAMES) + "某" + str(k) for k in range(rng.randint(1, 4))],
+                "lsn1": rng.choice(STATUSES),
+            }
+        })
+    return docs
+
+
+def make_baiten_payload(n: int, seed: int = 42) -> Dict[str, Any]:
+    return {"code": 200, "total": n, "documents": make_baiten_documents(n, seed)}
+
+
+def make_monitor_entries(n: int, seed: int = 7, start: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed + start)
+    today = date.today()
+    out = []
+    for i in range(start, start + n):
+        ptype = rng.choice(TYPES)
+        year = rng.randint(2, 12)
+        out.append({
+            "专利号": _app_no(rng, 2010 + i % 14, ptype) + f"-{i}",
+            "专利名称": f"监控专利{i}",
+            "公司名称": rng.choice(COMPANIES),
+            "当前法律状态": rng.choice(STATUSES),
+            "费用种类": f"{TYPE_LABELS[ptype]}专利第{year}年年费",
+            "缴费期限届满日": (today + timedelta(days=rng.randint(-60, 400))).strftime("%Y-%m-%d"),
+            "金额": f"{rng.choice([90, 135, 180, 270, 600, 900, 1200]):.2f}",
+            "添加时间": "2025-01-01 00:00:00",
+        })
+    return out
+
+
+def make_fee_page_html(n_rows: int = 3, n_layout_tables: int = 0, seed: int = 3) -> str:
+    """模拟应缴费查询结果页：若干布局用表格 + 一个费用表（表头：序号/费用种类/缴费期限届满日/金额）。"""
+    rng = random.Random(seed)
+    layout = []
+    for t in range(n_layout_tables):
+        cells = "".join(f"<tr><td>布局{t}-{r}</td><td>说明文字 {r}</td><td>链接</td></tr>" for r in range(20))
+        layout.append(f"<table class='layout'>{cells}</table>")
+    rows = []
+    for i in range(n_rows):
+        year = 3 + i
+        kind = "实用新型专利" if i % 2 else "发明专利"
+        due = date(2025, 12, 3) + timedelta(days=365 * i)
+        rows.append(
+            f"<tr><td>{i + 1}</td><td>{kind}第{year}年年费</td>"
+            f"<td>{due:%Y-%m-%d}</td><td>{rng.choice([135, 270, 900]):.2f}</td></tr>"
+        )
+        if i % 5 == 4:
+            rows.append(f"<tr><td>{i + 1}</td><td>{kind}第{year}年年费滞纳金</td><td>{due:%Y-%m-%d}</td><td>45.00</td></tr>")
+    fee_table = (
+        "<table class='el-table' id='cp_result_table'>"
+        "<tr><th>序号</th><th>费用种类</th><th>缴费期限届满日</th><th>金额</th></tr>"
+        + "".join(rows) + "</table>"
+    )
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>应缴费查询</title></head><body>"
+        "<div class='menu'><a>缴费服务</a><a>费用查询</a><a>应缴费查询</a></div>"
+        + "".join(layout)
+        + "<div class='result'>" + fee_table + "</div><div class='footer'>退出</div></body></html>"
+    )
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+多个 CNIPA 账号的登录状态管理（不依赖 Streamlit / Playwright）
+每个客户主体一个 CNIPA 账号，各自一个 state.json。注册表文件（CNIPA_ACCOUNTS_FILE，默认 cnipa_accounts.json）：
+    {"accounts": [
+        {"name": "甲公司", "state": "states/jia.json", "owners": ["甲科技有限公司"], "rate_per_min": 30, "concurrency": 2},
+        {"name": "乙公司", "state": "states/yi.json", "owners": ["乙电子股份有限公司", "乙研究院"]}
+    ]}
+state 为相对注册表文件所在目录的路径；没有注册表文件时只有一个 default 账号（CNIPA_STATE_FILE / state.json）。
+
+  - 路由：专利的“公司名称”包含某账号 owners 中的名称时，只用该账号查询；否则分配给当前最空闲的健康账号。
+  - 限流：每个账号最多 concurrency 个在途查询，相邻两次查询间隔不小于 60 / rate_per_min 秒
+    （未配置时取 CNIPA_ACCOUNT_RATE_PER_MIN / CNIPA_ACCOUNT_CONCURRENCY）；
+    接口返回 429（RateLimitedError）时该账号按 Retry-After 冷却，查询换账号或稍后重试。
+  - 健康：probe() 逐个探测账号登录态；某账号查询抛出 SessionExpiredError 时标记失效，
+    未绑定账号的专利改用其他账号，绑定到失效账号的专利抛出 AccountExpiredError（进入 BatchOutcome.pending）。
+  - 常驻资源：wrap(fn, worker=make) 时每个账号维护一个资源池（如常驻浏览器），查询在占用并发名额的同时借出一个，
+    用完归还；每个账号的资源数不超过其 concurrency，整体不超过 total_concurrency()。批量结束后调用 close_workers。
+
+用法（配合 fee_batch.run_fee_batch）：
+    registry = AccountRegistry.load()
+    outcome = run_fee_batch(patents, registry.wrap(lambda p, state: query(p, state)),
+                            probe=registry.probe, workers=registry.total_concurrency())
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from cnipa_common import BASE, STATE_FILE, RateLimitedError, SessionExpiredError
+
+ACCOUNTS_FILE = Path(os.getenv("CNIPA_ACCOUNTS_FILE", str(BASE / "cnipa_accounts.json"))).expanduser()
+DEFAULT_RATE_PER_MIN = float(os.getenv("CNIPA_ACCOUNT_RATE_PER_MIN", "0"))  # 0 表示不限
+DEFAULT_CONCURRENCY = int(os.getenv("CNIPA_ACCOUNT_CONCURRENCY", "2"))
+MAX_RATE_LIMIT_RETRIES = 5
+
+T = TypeVar("T")
+
+
+class AccountExpiredError(SessionExpiredError):
+    """专利绑定的账号登录已失效（其他账号仍可用，批量查询不整体暂停）。"""
+
+    def __init__(self, message: str, account: str):
+        super().__init__(message)
+        self.account = account
+
+
+@dataclass
+class Account:
+    name: str
+    storage_state: dict
+    owners: List[str] = field(default_factory=list)
+    rate_per_min: float = DEFAULT_RATE_PER_MIN
+    concurrency: int = DEFAULT_CONCURRENCY
+    state_path: Optional[Path] = None
+    # 运行时状态
+    expired: bool = False
+    reason: str = ""
+    in_flight: int = 0
+    completed: int = 0
+    failures: int = 0
+    rate_limited: int = 0
+    throttled_s: float = 0.0
+    next_slot: float = 0.0       # time.monotonic()，早于此时刻不再发起查询
+    last_probe: Optional[Any] = None
+    workers: List[Any] = field(default_factory=list, repr=False)   # 本账号已创建的常驻资源
+    idle: List[Any] = field(default_factory=list, repr=False)      # 其中当前空闲、可借出的
+
+    @property
+    def min_interval(self) -> float:
+        return 60.0 / self.rate_per_min if self.rate_per_min > 0 else 0.0
+
+    def owns(self, company: str) -> bool:
+        return bool(company) and any(o and o in company for o in self.owners)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "账号": self.name,
+            "状态": "失效" if self.expired else "正常",
+            "原因": self.reason,
+            "在途": self.in_flight,
+            "完成": self.completed,
+            "失败": self.failures,
+            "限流次数": self.rate_limited,
+            "限流等待(s)": round(self.throttled_s, 1),
+            "归属": "、".join(self.owners),
+        }
+
+
+class AccountRegistry:
+    """线程安全；一个批量查询使用一个实例（运行时计数随实例累计）。
+    probe_state(storage_state) -> SessionHealth 默认为 cnipa_http_client.probe_session。"""
+
+    def __init__(self, accounts: Optional[List[Account]] = None,
+                 probe_state: Optional[Callable[[dict], Any]] = None):
+        self._accounts: Dict[str, Account] = {}
+        self._probe_state = probe_state
+        self._cond = threading.Condition()
+        for a in accounts or []:
+            self.add(a)
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None, default_state: Optional[dict] = None,
+             concurrency: Optional[int] = None) -> "AccountRegistry":
+        """读取注册表文件；文件不存在时只注册 default 账号（default_state 或 STATE_FILE）。
+        concurrency 为未单独配置并发数的账号的默认值。"""
+        path = Path(path) if path else ACCOUNTS_FILE
+        concurrency = concurrency or DEFAULT_CONCURRENCY
+        if not path.exists():
+            if default_state is None and STATE_FILE.exists():
+                default_state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+            return cls([Account("default", default_state, concurrency=concurrency, state_path=STATE_FILE)]
+                       if default_state else [])
+        conf = json.loads(path.read_text(encoding="utf-8"))
+        accounts = []
+        for item in conf.get("accounts", []):
+            sp = Path(item["state"]).expanduser()
+            if not sp.is_absolute():
+                sp = path.parent / sp
+            accounts.append(Account(
+                name=item["name"],
+                storage_state=json.loads(sp.read_text(encoding="utf-8")),
+                owners=list(item.get("owners", [])),
+                rate_per_min=float(item.get("rate_per_min", DEFAULT_RATE_PER_MIN)),
+                concurrency=int(item.get("concurrency", concurrency)),
+                state_path=sp,
+            ))
+        return cls(accounts)
+
+    def add(self, account: Account):
+        with self._cond:
+            if account.name in self._accounts:
+                raise ValueError(f"账号重复：{account.name}")
+            self._accounts[account.name] = account
+            self._cond.notify_all()
+
+    def remove(self, name: str):
+        with self._cond:
+            self._accounts.pop(name, None)
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._accounts)
+
+    def __iter__(self):
+        return iter(list(self._accounts.values()))
+
+    def get(self, name: str) -> Optional[Account]:
+        return self._accounts.get(name)
+
+    def healthy(self) -> List[Account]:
+        return [a for a in self._accounts.values() if not a.expired]
+
+    def total_concurrency(self) -> int:
+        return max(1, sum(a.concurrency for a in self.healthy()))
+
+    def owner_of(self, patent: Dict[str, Any]) -> Optional[Account]:
+        company = str(patent.get("公司名称") or "")
+        for a in self._accounts.values():
+            if a.owns(company):
+                return a
+        return None
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [a.status() for a in self._accounts.values()]
+
+    # ---- 健康 ----
+    def mark_expired(self, name: str, reason: str = "登录状态已失效"):
+        with self._cond:
+            a = self._accounts.get(name)
+            if a is not None and not a.expired:
+                a.expired, a.reason = True, reason
+            self._cond.notify_all()
+
+    def probe(self):
+        """探测所有未失效账号；全部失效时返回 expired=True（run_fee_batch 据此整体暂停）。"""
+        from cnipa_http_client import SessionHealth, probe_session
+
+        probe_state = self._probe_state or probe_session
+        for a in self.healthy():
+            health = a.last_probe = probe_state(a.storage_state)
+            if health.expired:
+                self.mark_expired(a.name, health.reason)
+        alive = self.healthy()
+        if alive:
+            return SessionHealth(ok=True, expired=False, reason="")
+        reasons = "；".join(f"{a.name}: {a.reason}" for a in self._accounts.values()) or "没有可用的 CNIPA 账号"
+        return SessionHealth(ok=False, expired=True, reason=reasons)
+
+    # ---- 分配与限流 ----
+    def acquire(self, patent: Dict[str, Any], exclude=()) -> Account:
+        """为专利选一个账号并占用一个并发名额，必要时等待到该账号的下一个可用时刻；用完须调用 release。"""
+        with self._cond:
+            while True:
+                owner = self.owner_of(patent)
+                if owner is not None:
+                    if owner.expired:
+                        raise AccountExpiredError(f"账号 {owner.name} 登录状态已失效（{owner.reason}）", owner.name)
+                    candidates = [owner]
+                else:
+                    candidates = [a for a in self.healthy() if a.name not in exclude]
+                    if not candidates:
+                        raise SessionExpiredError("所有 CNIPA 账号登录状态均已失效")
+                free = [a for a in candidates if a.in_flight < a.concurrency]
+                if free:
+                    now = time.monotonic()
+                    acct = min(free, key=lambda a: (max(a.next_slot, now), a.in_flight))
+                    start = max(acct.next_slot, now)
+                    acct.next_slot = start + acct.min_interval
+                    acct.in_flight += 1
+                    break
+                self._cond.wait()
+        wait = start - time.monotonic()
+        if wait > 0:
+            acct.throttled_s += wait
+            time.sleep(wait)
+        return acct
+
+    def release(self, acct: Account, ok: Optional[bool] = True):
+        """ok=None 表示本次不计入完成/失败（被限流后重试）。"""
+        with self._cond:
+            acct.in_flight -= 1
+            if ok:
+                acct.completed += 1
+            elif ok is not None:
+                acct.failures += 1
+            self._cond.notify_all()
+
+    def cool_down(self, acct: Account, seconds: float):
+        with self._cond:
+            acct.rate_limited += 1
+            acct.next_slot = max(acct.next_slot, time.monotonic() + seconds)
+
+    # ---- 常驻资源池 ----
+    def _checkout(self, acct: Account, make: Callable[[Account], Any]) -> Any:
+        """借出账号的一个空闲资源，没有时新建；调用方已占用并发名额，故资源数不超过 concurrency。"""
+        with self._cond:
+            if acct.idle:
+                return acct.idle.pop()
+        worker = make(acct)
+        with self._cond:
+            acct.workers.append(worker)
+        return worker
+
+    def _checkin(self, acct: Account, worker: Any):
+        with self._cond:
+            acct.idle.append(worker)
+
+    def close_workers(self, close: Callable[[Any], None]) -> int:
+        """关闭所有账号的常驻资源，返回关闭的个数。"""
+        with self._cond:
+            workers = [w for a in self._accounts.values() for w in a.workers]
+            for a in self._accounts.values():
+                a.workers, a.idle = [], []
+        for w in workers:
+            close(w)
+        return len(workers)
+
+    def run(self, patent: Dict[str, Any], fn: Callable[..., T],
+            worker: Optional[Callable[[Account], Any]] = None) -> T:
+        """用分配到的账号登录态执行 fn(patent, storage_state)，处理限流重试与账号失效后的改派。
+        给出 worker 时从该账号的资源池借出一个资源，调用 fn(patent, storage_state, resource)。"""
+        tried = set()
+        limited = 0
+        while True:
+            acct = self.acquire(patent, exclude=tried)
+            try:
+                if worker is None:
+                    result = fn(patent, acct.storage_state)
+                else:
+                    resource = self._checkout(acct, worker)
+                    try:
+                        result = fn(patent, acct.storage_state, resource)
+                    finally:
+                        # 先归还资源再释放名额，拿到名额的线程一定能借到空闲资源
+                        self._checkin(acct, resource)
+            except RateLimitedError as e:
+                self.release(acct, ok=None)
+                self.cool_down(acct, e.retry_after)
+                limited += 1
+                if limited > MAX_RATE_LIMIT_RETRIES:
+                    raise
+                continue
+            except SessionExpiredError as e:
+                self.release(acct, ok=False)
+                self.mark_expired(acct.name, str(e))
+                if self.owner_of(patent) is not None:
+                    raise AccountExpiredError(f"账号 {acct.name} 登录状态已失效（{e}）", acct.name) from e
+                tried.add(acct.name)
+                continue
+            except Exception:
+                self.release(acct, ok=False)
+                raise
+            self.release(acct)
+            return result
+
+    def wrap(self, fn: Callable[..., T],
+             worker: Optional[Callable[[Account], Any]] = None) -> Callable[[Dict[str, Any]], T]:
+        return lambda patent: self.run(patent, fn, worker)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+CNIPA 年费查询的公共配置与解析函数（不依赖 Playwright）
+浏览器后端 cnipa_fee_query.py 与 HTTP 后端 cnipa_http_client.py 共用。
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+# 允许通过环境变量指向本地模拟站点（mock_servers.cnipa）
+CNIPA_BASE_URL = os.getenv("CNIPA_BASE_URL", "https://interactive.cponline.cnipa.gov.cn").rstrip("/")
+
+BASE = Path(__file__).parent
+# 允许通过环境变量覆盖 state.json 路径（绝对或相对）
+_custom_state = os.getenv("CNIPA_STATE_FILE")
+if _custom_state:
+    sf = Path(_custom_state).expanduser()
+    if not sf.is_absolute():
+        sf = (Path.cwd() / sf).resolve()
+    STATE_FILE = sf
+else:
+    STATE_FILE = BASE / "state.json"
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36")
+
+class SessionExpiredError(RuntimeError):
+    """CNIPA 登录状态失效（需重新生成 state.json）。"""
+
+
+class RateLimitedError(RuntimeError):
+    """CNIPA 接口限流（HTTP 429）；retry_after 为建议等待秒数。"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def looks_logged_out(text: str) -> bool:
+    """页面文本是否为未登录状态（与 _query_due_fees_async 原有判定一致）。"""
+    return "登录" in text and "退出" not in text
+
+
+# 匹配：费用种类（以"年费/滞纳金"结尾） + 日期 + 金额
+FEE_TEXT_RE = re.compile(
+    r'(?P<type>[\u4e00-\u9fa5A-Za-z0-9（）()第\-·]+?(?:年费(?:滞纳金)?))\s+'
+    r'(?P<date>\d{4}-\d{2}-\d{2})\s+'
+    r'(?P<amt>\d+(?:\.\d{1,2})?)'
+)
+
+
+def is_annual_fee(fee_type: str) -> bool:
+    """只保留包含"年费/滞纳金"的行，避免把序号/占位行带进来"""
+    return bool(fee_type) and ("年费" in fee_type or "滞纳金" in fee_type)
+
+
+def dedupe_fee_rows(rows: Iterable[Dict[str, str]]) -> List[Dict[str, str]]:
+    uniq, seen = [], set()
+    for it in rows:
+        k = (it["费用种类"], it.get("缴费期限届满日", ""), it["金额"])
+        if k not in seen:
+            seen.add(k); uniq.append(it)
+    return uniq
+
+
+def parse_fee_text(text: str) -> List[Dict[str, str]]:
+    """全文正则扫描，匹配形如「实用新型专利第3年年费 2026-09-02 90.00」的三元组。"""
+    text = text.replace("\xa0", " ").replace("\u3000", " ")
+    found = [{
+        "费用种类": m.group("type").strip(),
+        "缴费期限届满日": m.group("date"),
+        "金额": m.group("amt"),
+    } for m in FEE_TEXT_RE.finditer(text)]
+    return dedupe_fee_rows(found)
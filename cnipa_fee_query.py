@@ -3,8 +3,11 @@
 CNIPA 年费查询后端模块（Playwright）
 对外函数：
   - ensure_login_interactive()
-  - query_due_fees(app_no: str, headful: bool = True) -> list[dict]
+  - query_due_fees(app_no: str, headful: bool = True, backend: str = "browser") -> list[dict]
   - has_login_state() -> bool
+  - get_block_stats() -> dict   资源拦截累计统计（见 ResourcePolicy）
+  - query_due_fees_many(app_nos, headful=False, storage_state=None) -> 逐个产出 (app_no, rows | Exception)
+  - CnipaFeeSession            单页面多专利查询（异步），每个专利只提交一次表单
 """
 
 # ---- Windows: 事件循环策略（Playwright 需要子进程支持）----
@@ -15,28 +18,140 @@ if sys.platform.startswith("win"):
     except Exception:
         pass
 
-import os, time, re
+import os, time, re, threading
+import importlib.util
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, FrozenSet, TYPE_CHECKING
+from urllib.parse import urlparse
 from getpass import getpass
-from playwright.async_api import async_playwright, TimeoutError as PWTimeout, Page, Locator
+
+from timing import timed, record
+
+# Playwright 较重，仅在真正查询时才导入；这里只检查是否已安装，保持原有的 ImportError 语义
+if importlib.util.find_spec("playwright") is None:
+    raise ImportError("No module named 'playwright'")
+if TYPE_CHECKING:
+    from playwright.async_api import Page, Locator
 
 # ------- 基础配置 -------
+from cnipa_common import (CNIPA_BASE_URL, BASE, STATE_FILE, USER_AGENT, FEE_TEXT_RE, SessionExpiredError,
+                          looks_logged_out, is_annual_fee, dedupe_fee_rows, parse_fee_text)
+
+FEE_BACKENDS = ("browser", "http")
+DEFAULT_BACKEND = os.getenv("CNIPA_FEE_BACKEND", "browser")
+
+
+def available_backends() -> Tuple[str, ...]:
+    """可用的查询后端：http 为实验性，只有显式设置了 CNIPA_FEE_API_URL 才提供（见 cnipa_http_client）。"""
+    from cnipa_http_client import http_backend_enabled
+    return FEE_BACKENDS if http_backend_enabled() else ("browser",)
+
+# 单次查询的总时限（秒）；各步骤共用，不再各自等待固定时长
+QUERY_DEADLINE_S = float(os.getenv("CNIPA_QUERY_DEADLINE_S", "45"))
+# 费用接口响应的 URL 特征（逗号分隔）：命中即视为数据已返回
+FEE_RESPONSE_HINTS = tuple(h.strip() for h in os.getenv("CNIPA_FEE_RESPONSE_HINTS", "/fee,Fee,/cost").split(",") if h.strip())
+
 ROOTS = [
-    "https://interactive.cponline.cnipa.gov.cn/od/public/index",
-    "https://interactive.cponline.cnipa.gov.cn/od/public",
-    "https://interactive.cponline.cnipa.gov.cn/od",
+    f"{CNIPA_BASE_URL}/od/public/index",
+    f"{CNIPA_BASE_URL}/od/public",
+    f"{CNIPA_BASE_URL}/od",
 ]
-BASE = Path(__file__).parent
-# 允许通过环境变量覆盖 state.json 路径（绝对或相对）
-_custom_state = os.getenv("CNIPA_STATE_FILE")
-if _custom_state:
-    sf = Path(_custom_state).expanduser()
-    if not sf.is_absolute():
-        sf = (Path.cwd() / sf).resolve()
-    STATE_FILE = sf
-else:
-    STATE_FILE = BASE / "state.json"
+
+# ------- 资源拦截 -------
+# 查询只依赖 DOM 与接口数据：图片/字体/媒体和第三方域名（统计、广告）不影响结果，拦截后首页加载更快、
+# networkidle 更早到达、单个浏览器内存更小。CNIPA_BLOCK_RESOURCES=none 可关闭类型拦截；
+# 样式表可通过 CNIPA_BLOCK_RESOURCES=image,font,media,stylesheet 一并拦截（需自行验证页面可用）。
+_BLOCK_TYPES_ENV = os.getenv("CNIPA_BLOCK_RESOURCES", "image,font,media")
+
+@dataclass(frozen=True)
+class ResourcePolicy:
+    block_types: FrozenSet[str] = frozenset({"image", "font", "media"})
+    block_third_party: bool = True
+    first_party: Tuple[str, ...] = ()  # 视为第一方的主机名（含子域名）
+
+    @classmethod
+    def from_env(cls) -> "ResourcePolicy":
+        raw = _BLOCK_TYPES_ENV.strip().lower()
+        types = frozenset() if raw in ("", "none", "0") else frozenset(t.strip() for t in raw.split(",") if t.strip())
+        host = urlparse(CNIPA_BASE_URL).hostname or ""
+        return cls(block_types=types,
+                   block_third_party=os.getenv("CNIPA_BLOCK_THIRD_PARTY", "1") not in ("0", "false", "False"),
+                   first_party=tuple(h for h in (host, "cnipa.gov.cn") if h))
+
+    @property
+    def active(self) -> bool:
+        return bool(self.block_types) or self.block_third_party
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.block_types:
+            return True
+        if self.block_third_party and self.first_party:
+            host = urlparse(url).hostname
+            # data:/blob: 没有主机名，不拦截
+            if host and not any(host == fp or host.endswith("." + fp) for fp in self.first_party):
+                return True
+        return False
+
+@dataclass
+class BlockStats:
+    requests: int = 0
+    blocked: int = 0
+    blocked_by_type: Dict[str, int] = field(default_factory=dict)
+    loaded_bytes: int = 0   # 未拦截响应的 Content-Length 之和
+
+    def as_dict(self) -> Dict:
+        return {"requests": self.requests, "blocked": self.blocked,
+                "blocked_by_type": dict(self.blocked_by_type), "loaded_bytes": self.loaded_bytes}
+
+DEFAULT_POLICY = ResourcePolicy.from_env()
+_block_totals = BlockStats()
+_block_totals_lock = threading.Lock()
+_block_queries = 0
+
+async def install_resource_blocking(ctx, policy: Optional[ResourcePolicy] = None) -> BlockStats:
+    """在上下文上安装拦截规则并统计请求数/拦截数/加载字节数（policy 未启用时只统计）。"""
+    policy = DEFAULT_POLICY if policy is None else policy
+    stats = BlockStats()
+
+    def on_response(resp):
+        try:
+            stats.loaded_bytes += int(resp.headers.get("content-length") or 0)
+        except ValueError:
+            pass
+
+    ctx.on("response", on_response)
+
+    async def handler(route):
+        req = route.request
+        stats.requests += 1
+        if policy.should_block(req.resource_type, req.url):
+            stats.blocked += 1
+            stats.blocked_by_type[req.resource_type] = stats.blocked_by_type.get(req.resource_type, 0) + 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    if policy.active:
+        await ctx.route("**/*", handler)
+    else:
+        ctx.on("request", lambda req: setattr(stats, "requests", stats.requests + 1))
+    return stats
+
+def _add_block_totals(stats: BlockStats, queries: int = 1):
+    global _block_queries
+    with _block_totals_lock:
+        _block_queries += queries
+        _block_totals.requests += stats.requests
+        _block_totals.blocked += stats.blocked
+        _block_totals.loaded_bytes += stats.loaded_bytes
+        for k, v in stats.blocked_by_type.items():
+            _block_totals.blocked_by_type[k] = _block_totals.blocked_by_type.get(k, 0) + v
+
+def get_block_stats() -> Dict:
+    """本进程内浏览器查询的资源拦截累计统计。"""
+    with _block_totals_lock:
+        return {"queries": _block_queries, **_block_totals.as_dict()}
 
 # ------- 选择器 -------
 MENU_PAY = ['text=缴费服务','a:has-text("缴费服务")','button:has-text("缴费服务")','text=/缴费\\s*服务/']
@@ -74,50 +189,93 @@ async def _try_click(scope, sels, timeout=1200) -> bool:
             pass
     return False
 
-async def _open_roots(page: Page):
-    for url in ROOTS:
+class _Deadline:
+    """单次查询的总截止时间；各步骤的等待都从剩余时间中扣除，不再各自叠加固定超时。"""
+
+    def __init__(self, total_s: float):
+        self.end = time.monotonic() + total_s
+
+    def ms(self, cap_ms: Optional[float] = None) -> float:
+        left = (self.end - time.monotonic()) * 1000.0
+        if left <= 0:
+            raise QueryTimeoutError("年费查询超过总时限 (CNIPA_QUERY_DEADLINE_S)")
+        return min(left, cap_ms) if cap_ms else left
+
+class QueryTimeoutError(RuntimeError):
+    pass
+
+def _any_of(scope, sels):
+    """把多个候选选择器合成一个 locator，用一次 wait_for 等待其中任意一个出现。"""
+    loc = scope.locator(sels[0])
+    for s in sels[1:]:
+        loc = loc.or_(scope.locator(s))
+    return loc.first
+
+async def _wait_visible(scope, sels, timeout_ms: float) -> bool:
+    from playwright.async_api import TimeoutError as PWTimeout
+    try:
+        await _any_of(scope, sels).wait_for(state="visible", timeout=timeout_ms)
+        return True
+    except PWTimeout:
+        return False
+
+async def _click_when_visible(page: "Page", sels, dl: _Deadline, cap_ms: float) -> bool:
+    """等待菜单项出现后点击（主文档优先，找不到再尝试各 frame）。"""
+    if await _wait_visible(page, sels, dl.ms(cap_ms)):
+        return await _try_click(page, sels)
+    for fr in page.frames[1:]:
+        if await _try_click(fr, sels):
+            return True
+    return False
+
+@timed("cnipa.open_roots")
+async def _open_roots(page: "Page", roots: Optional[List[str]] = None, dl: Optional[_Deadline] = None):
+    """打开入口页；以页面渲染出“退出/登录”字样为就绪信号，而不是等待 networkidle。"""
+    from playwright.async_api import TimeoutError as PWTimeout
+    dl = dl or _Deadline(QUERY_DEADLINE_S)
+    for url in roots or ROOTS:
         try:
-            await page.goto(url, wait_until="domcontentloaded")
+            resp = await page.goto(url, wait_until="domcontentloaded", timeout=dl.ms())
+            if resp is not None and resp.status >= 400:
+                continue
             try:
-                await page.wait_for_load_state("networkidle", timeout=15000)
+                await page.wait_for_function(
+                    "() => document.body && /退出|登录/.test(document.body.innerText)", timeout=dl.ms(15000))
             except PWTimeout:
                 pass
             html = await page.content()
             if "<html" in html.lower():
                 return True
+        except QueryTimeoutError:
+            raise
         except Exception:
             continue
     return False
 
-async def _goto_fee_query(page: Page) -> bool:
-    ok = await _try_click(page, MENU_PAY)
-    if not ok:
-        for fr in page.frames:
-            if await _try_click(fr, MENU_PAY):
-                ok = True; break
-    if not ok: return False
-    await page.wait_for_timeout(600)
-
-    ok2 = await _try_click(page, MENU_FEE)
-    if not ok2:
-        for fr in page.frames:
-            if await _try_click(fr, MENU_FEE):
-                ok2 = True; break
-    if not ok2: return False
-
-    # 可选"应缴费查询"
-    try:
-        if await page.locator('text=应缴费查询').first.is_visible(timeout=1200):
-            if not await _try_click(page, TAB_DUE):
-                for fr in page.frames:
-                    if await _try_click(fr, TAB_DUE):
-                        break
-    except Exception:
-        pass
+@timed("cnipa.goto_fee_query")
+async def _goto_fee_query(page: "Page", dl: Optional[_Deadline] = None) -> bool:
+    dl = dl or _Deadline(QUERY_DEADLINE_S)
+    if not await _click_when_visible(page, MENU_PAY, dl, 10000):
+        return False
+    # 等“费用查询”菜单展开即点击，代替固定的 600ms 等待
+    if not await _click_when_visible(page, MENU_FEE, dl, 10000):
+        return False
+
+    # 可选"应缴费查询"：表单输入框已出现时说明默认就在该页签，不必再等
+    if await _wait_visible(page, TAB_DUE + INPUTS[:3], dl.ms(5000)):
+        try:
+            if await _any_of(page, TAB_DUE).is_visible():
+                await _try_click(page, TAB_DUE)
+        except Exception:
+            pass
     return True
 
-async def _wait_find_input_and_button(page: Page, total_ms: int = 20000) -> Tuple[Locator, Optional[Locator]]:
+@timed("cnipa.wait_find_input_and_button")
+async def _wait_find_input_and_button(page: "Page", total_ms: int = 20000) -> Tuple["Locator", Optional["Locator"]]:
     deadline = time.time() + total_ms/1000.0
+    # 主文档：先用一小段预算等任一输入框候选可见（事件驱动，出现即返回）；
+    # 输入框在 iframe 中时主文档等不到，剩余时间留给下面逐个 frame 轮询
+    await _wait_visible(page, INPUTS, min(total_ms / 4, 5000))
     while time.time() < deadline:
         scopes = [page] + list(page.frames)
         for scope in scopes:
@@ -126,7 +284,7 @@ async def _wait_find_input_and_button(page: Page, total_ms: int = 20000) -> Tupl
             for s in INPUTS:
                 try:
                     cand = scope.locator(s).first
-                    if await cand.is_visible(timeout=250):
+                    if await cand.is_visible():
                         inp = cand; break
                 except Exception:
                     continue
@@ -139,7 +297,7 @@ async def _wait_find_input_and_button(page: Page, total_ms: int = 20000) -> Tupl
                     'xpath=ancestor::*[self::form or contains(@class,"form") or contains(@class,"search")][1]'
                     '//button[contains(.,"查询")]'
                 ).first
-                if await near_btn.is_visible(timeout=250):
+                if await near_btn.is_visible():
                     btn = near_btn
             except Exception:
                 pass
@@ -147,102 +305,200 @@ async def _wait_find_input_and_button(page: Page, total_ms: int = 20000) -> Tupl
                 for s in QUERY_BTNS:
                     try:
                         candb = scope.locator(s).first
-                        if await candb.is_visible(timeout=250):
+                        if await candb.is_visible():
                             btn = candb; break
                     except Exception:
                         continue
             return inp, btn
-        await page.wait_for_timeout(350)
-    raise TimeoutError("等待输入框/查询按钮超时（~20s）")
+        # 输入框可能在 frame 中：等 frame 内 DOM 变化
+        await page.wait_for_timeout(100)
+    raise TimeoutError(f"等待输入框/查询按钮超时（~{total_ms / 1000:.0f}s）")
+
+# 结果区域就绪判定（在页面内执行）：
+#   mark=true  给当前的结果表/“暂无数据”节点打标记并返回签名；
+#   mark=false 出现未打标记的结果节点，或结果签名（行数 + 文本哈希）变化时返回 true。
+# 签名用文本内容的哈希而非长度：前端原地重绘表格时，相邻两个同类型专利的费用行数与文本长度常常相同。
+RESULT_STATE_JS = """
+(arg) => {
+  const visible = e => e.getClientRects().length > 0;
+  const hash = s => { let h = 5381; for (let i = 0; i < s.length; i++) h = ((h << 5) + h + s.charCodeAt(i)) | 0; return h >>> 0; };
+  const nodes = Array.from(document.querySelectorAll('#cp_result_table, .el-table, .ant-table, table'))
+    .filter(t => t.id === 'cp_result_table' || (t.innerText || '').includes('费用种类'));
+  const snap = document.evaluate("//body//*[not(self::script)][contains(text(),'暂无数据')]", document, null,
+                                 XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  for (let i = 0; i < snap.snapshotLength; i++) nodes.push(snap.snapshotItem(i));
+  const shown = nodes.filter(visible);
+  const sig = shown.map(e => e.tagName + ':' + (e.rows ? e.rows.length : e.querySelectorAll('tr').length)
+                             + ':' + hash(e.innerText || '')).join('|');
+  if (arg.mark) { shown.forEach(e => e.setAttribute('data-pf-seen', '1')); return sig; }
+  if (shown.some(e => !e.hasAttribute('data-pf-seen'))) return true;
+  return shown.length > 0 && sig !== arg.sig;
+}
+"""
+
+def _is_fee_response(resp) -> bool:
+    return resp.request.resource_type in ("xhr", "fetch") and any(h in resp.url for h in FEE_RESPONSE_HINTS)
+
+async def _submit_and_wait_result(page: "Page", inp: "Locator", btn: Optional["Locator"], app_no: str,
+                                  dl: _Deadline, steps: Dict[str, float]):
+    """提交申请号并等待结果区域变化（或费用接口响应后页面完成渲染）。"""
+    from playwright.async_api import TimeoutError as PWTimeout
+    t0 = time.perf_counter()
+    before = await page.evaluate(RESULT_STATE_JS, {"mark": True})
+    response_at: Dict[str, float] = {}
 
-async def _extract_fee_rows(page) -> list[dict]:
+    def on_response(resp):
+        if "t" not in response_at and _is_fee_response(resp):
+            response_at["t"] = time.perf_counter()
+
+    page.on("response", on_response)
+    try:
+        await inp.fill(app_no)
+        if btn is not None:
+            await btn.click(timeout=dl.ms(5000))
+        else:
+            await inp.press("Enter")
+        steps["submit"] = time.perf_counter() - t0
+
+        changed = asyncio.ensure_future(
+            page.wait_for_function(RESULT_STATE_JS, arg={"mark": False, "sig": before}, timeout=dl.ms()))
+        responded = asyncio.ensure_future(
+            page.wait_for_event("response", predicate=_is_fee_response, timeout=dl.ms()))
+        try:
+            done, _ = await asyncio.wait({changed, responded}, return_when=asyncio.FIRST_COMPLETED)
+            if changed not in done and responded.exception() is None:
+                # 接口先到：结果可能在原节点上原地更新（签名不变），最多再等 1s，否则等两帧渲染
+                try:
+                    await asyncio.wait_for(asyncio.shield(changed), timeout=min(1.0, dl.ms() / 1000.0))
+                except (asyncio.TimeoutError, PWTimeout):
+                    await page.evaluate("() => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)))")
+            # 两个信号都超时：与原流程一致，仍尝试解析当前页面（可能只是没有结果表）
+        finally:
+            for task in (changed, responded):
+                if not task.done():
+                    task.cancel()
+                else:
+                    task.exception()  # 取出异常，避免 "exception was never retrieved"
+    finally:
+        page.remove_listener("response", on_response)
+    t_done = time.perf_counter()
+    if "t" in response_at:
+        steps["fee_api"] = response_at["t"] - t0 - steps["submit"]
+        steps["render"] = t_done - response_at["t"]
+    steps["wait_result"] = t_done - t0 - steps["submit"]
+
+def _map_by_header(rows) -> List[Dict[str, str]]:
+    # 找包含【金额】且包含【缴费期限/届满】的那一行当表头
+    hdr_idx = None
+    for i in range(min(3, len(rows))):
+        joined = " ".join(rows[i])
+        if "金额" in joined and ("缴费期限" in joined or "届满" in joined):
+            hdr_idx = i; break
+    if hdr_idx is None:
+        return []
+
+    header = rows[hdr_idx]
+    def find_col(keys):
+        for j, h in enumerate(header):
+            if any(k in h for k in keys): return j
+        return None
+
+    c_type = find_col(["费用","种类"])
+    c_date = find_col(["缴费期限","届满"])
+    c_amt  = find_col(["金额"])
+    if c_type is None or c_amt is None:
+        return []
+
+    out = []
+    for r in rows[hdr_idx+1:]:
+        if len(r) <= max(c_type, c_date or 0, c_amt): 
+            continue
+        t = r[c_type].strip()
+        d = r[c_date].strip() if c_date is not None else ""
+        a = r[c_amt].strip()
+        if not is_annual_fee(t):
+            continue
+        out.append({"费用种类": t, "缴费期限届满日": d, "金额": a})
+    return out
+
+def parse_fee_tables(tables: List[List[List[str]]], text: str) -> List[Dict[str, str]]:
     """
-    先尝试按标准表格解析；若表头/行不规整，则退回到全文正则扫描：
-    匹配形如「实用新型专利第3年年费 2026-09-02 90.00」的三元组。
+    Python 参考实现（与 EXTRACT_FEE_ROWS_JS 规则相同）：tables 为各表格的行/单元格文本，text 为兜底全文。
+    浏览器内提取以它为准做一致性校验（benchmarks.run），也可用于离线解析保存下来的页面。
     """
-    import re
-
-    # --- 尝试 1：按表头解析 ---
-    tables = await page.eval_on_selector_all(
-        "table",
-        """(nodes) => nodes.map(t =>
-            Array.from(t.querySelectorAll('tr')).map(tr =>
-                Array.from(tr.querySelectorAll('th,td')).map(td => td.innerText.trim())
-            )
-        )"""
-    )
     items = []
-
-    def map_by_header(rows):
-        # 找包含【金额】且包含【缴费期限/届满】的那一行当表头
-        hdr_idx = None
-        for i in range(min(3, len(rows))):
-            joined = " ".join(rows[i])
-            if "金额" in joined and ("缴费期限" in joined or "届满" in joined):
-                hdr_idx = i; break
-        if hdr_idx is None:
-            return []
-
-        header = rows[hdr_idx]
-        def find_col(keys):
-            for j, h in enumerate(header):
-                if any(k in h for k in keys): return j
-            return None
-
-        c_type = find_col(["费用","种类"])
-        c_date = find_col(["缴费期限","届满"])
-        c_amt  = find_col(["金额"])
-        if c_type is None or c_amt is None:
-            return []
-
-        out = []
-        for r in rows[hdr_idx+1:]:
-            if len(r) <= max(c_type, c_date or 0, c_amt): 
-                continue
-            t = r[c_type].strip()
-            d = r[c_date].strip() if c_date is not None else ""
-            a = r[c_amt].strip()
-            # 只保留包含"年费/滞纳金"的行，避免把序号/占位行带进来
-            if not t or (("年费" not in t) and ("滞纳金" not in t)):
-                continue
-            out.append({"费用种类": t, "缴费期限届满日": d, "金额": a})
-        return out
-
     for rows in tables:
-        items.extend(map_by_header(rows))
-
-    # 若表格解析成功就去重返回
+        items.extend(_map_by_header(rows))
     if items:
-        uniq, seen = [], set()
-        for it in items:
-            k = (it["费用种类"], it.get("缴费期限届满日",""), it["金额"])
-            if k not in seen:
-                seen.add(k); uniq.append(it)
-        return uniq
-
-    # --- 尝试 2：全文正则扫描（针对你出现的"首行粘一起"情况） ---
-    text = (await page.inner_text("body")).replace("\xa0"," ").replace("\u3000"," ")
-    # 匹配：费用种类（以"年费/滞纳金"结尾） + 日期 + 金额
-    pat = re.compile(
-        r'(?P<type>[\u4e00-\u9fa5A-Za-z0-9（）()第\-·]+?(?:年费(?:滞纳金)?))\s+'
-        r'(?P<date>\d{4}-\d{2}-\d{2})\s+'
-        r'(?P<amt>\d+(?:\.\d{1,2})?)'
-    )
-    found = []
-    for m in pat.finditer(text):
-        found.append({
-            "费用种类": m.group("type").strip(),
-            "缴费期限届满日": m.group("date"),
-            "金额": m.group("amt"),
-        })
-
-    # 去重并返回
-    uniq, seen = [], set()
-    for it in found:
-        k = (it["费用种类"], it["缴费期限届满日"], it["金额"])
-        if k not in seen:
-            seen.add(k); uniq.append(it)
-    return uniq
+        return dedupe_fee_rows(items)
+    return parse_fee_text(text)
+
+# 在页面内完成定位、过滤与去重，只把命中的费用行传回 Python：
+#   - 候选：组件库表格容器（.el-table/.ant-table，表头与表体是两个 <table>，按容器合并行）与其余 <table>（只取直属行）；
+#   - 表头取前 3 行中同时含“金额”与“缴费期限/届满”的一行，只读取费用种类/期限/金额三列；
+#   - 没有命中任何费用行时，对全文（scoped 时为结果容器文本）做与 FEE_TEXT_RE 相同的正则扫描；
+#   - scoped=true 只看结果容器（#cp_result_table、组件库表格、含“费用种类”的表格），页面上没有结果容器时返回 null。
+EXTRACT_FEE_ROWS_JS = r"""
+(arg) => {
+  const ANNUAL = /年费|滞纳金/;
+  const out = [], seen = new Set();
+  const push = (t, d, a) => {
+    t = (t || '').trim(); d = (d || '').trim(); a = (a || '').trim();
+    if (!ANNUAL.test(t)) return;
+    const k = t + '\u0001' + d + '\u0001' + a;
+    if (!seen.has(k)) { seen.add(k); out.push({'费用种类': t, '缴费期限届满日': d, '金额': a}); }
+  };
+  const comps = Array.from(document.querySelectorAll('.el-table, .ant-table'))
+    .filter((c, _, all) => !all.some(o => o !== c && o.contains(c)));
+  const groups = comps.map(c => ({node: c, rows: c.querySelectorAll('tr')}));
+  document.querySelectorAll('table').forEach(t => {
+    if (comps.some(c => c.contains(t))) return;
+    if (arg.scoped && t.id !== 'cp_result_table' && !(t.textContent || '').includes('费用种类')) return;
+    groups.push({node: t, rows: t.rows});
+  });
+  const scope = arg.scoped ? groups.filter(g => g.node.getClientRects().length > 0) : groups;
+  if (arg.scoped && !scope.length) return null;
+
+  for (const g of scope) {
+    const trs = g.rows;
+    let hdr = -1, cols = null;
+    for (let i = 0; i < Math.min(3, trs.length); i++) {
+      const cells = Array.from(trs[i].querySelectorAll('th,td')).map(c => c.innerText.trim());
+      const joined = cells.join(' ');
+      if (joined.includes('金额') && (joined.includes('缴费期限') || joined.includes('届满'))) { hdr = i; cols = cells; break; }
+    }
+    if (hdr < 0) continue;
+    const find = keys => cols.findIndex(h => keys.some(k => h.includes(k)));
+    const cT = find(['费用', '种类']), cD = find(['缴费期限', '届满']), cA = find(['金额']);
+    if (cT < 0 || cA < 0) continue;
+    const need = Math.max(cT, cD, cA);
+    for (let i = hdr + 1; i < trs.length; i++) {
+      const cells = trs[i].querySelectorAll('th,td');
+      if (cells.length <= need) continue;
+      const t = cells[cT].innerText;
+      if (!ANNUAL.test(t)) continue;
+      push(t, cD >= 0 ? cells[cD].innerText : '', cells[cA].innerText);
+    }
+  }
+  if (out.length) return out;
+
+  const text = (arg.scoped ? scope.map(g => g.node.innerText).join('\n') : document.body.innerText)
+    .replace(/[\u00a0\u3000]/g, ' ');
+  for (const m of text.matchAll(new RegExp(arg.pattern, 'gu'))) push(m.groups.type, m.groups.date, m.groups.amt);
+  return out;
+}
+"""
+# FEE_TEXT_RE 转为 JS 语法（命名分组 (?P<x>...) -> (?<x>...)），保证两端正则一致
+_JS_FEE_TEXT_RE = FEE_TEXT_RE.pattern.replace("(?P<", "(?<")
+
+@timed("cnipa.extract_fee_rows")
+async def _extract_fee_rows(page, scoped: bool = False) -> Optional[List[Dict[str, str]]]:
+    """
+    在页面内按表头定位费用表并只回传年费/滞纳金行（已去重）；表格不规整时退回全文正则扫描，
+    匹配形如「实用新型专利第3年年费 2026-09-02 90.00」的三元组。
+    scoped=True 时只解析结果容器，页面上没有结果容器返回 None。
+    """
+    return await page.evaluate(EXTRACT_FEE_ROWS_JS, {"pattern": _JS_FEE_TEXT_RE, "scoped": scoped})
 
 
 # ------- 对外函数（供 streamlit_app 调用）-------
@@ -265,9 +521,9 @@ async def _ensure_login_async():
 def ensure_login_interactive():
     asyncio.run(_ensure_login_async())
 
-async def _query_due_fees_async(app_no: str, headful: bool, storage_state: Optional[dict] = None) -> List[Dict]:
-    from playwright.async_api import async_playwright
-    
+async def _new_browser_context(p, headful: bool, storage_state: Optional[dict] = None,
+                               policy: Optional[ResourcePolicy] = None):
+    """启动浏览器并创建带登录态与资源拦截的上下文，返回 (browser, ctx, stats)。"""
     # 如果没有传入 state，则尝试从 state.json 文件加载
     if storage_state is None:
         if not STATE_FILE.exists():
@@ -276,70 +532,207 @@ async def _query_due_fees_async(app_no: str, headful: bool, storage_state: Optio
     else:
         state_to_use = storage_state
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=not headful)
-        ctx = await browser.new_context(
-            locale="zh-CN",
-            user_agent=("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                        "(KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"),
-            viewport={"width": 1366, "height": 900},
-            storage_state=state_to_use
-        )
-        page = await ctx.new_page()
-        page.set_default_timeout(45000)
-
-        # 入口与登录态检查
-        if not await _open_roots(page):
-            await browser.close()
-            raise RuntimeError("无法打开入口页")
-        
-        body_text = await page.inner_text("body")
-        if "登录" in body_text and "退出" not in body_text:
-            await browser.close()
-            raise RuntimeError(body_text[:2000])
+    browser = await p.chromium.launch(headless=not headful)
+    ctx = await browser.new_context(
+        locale="zh-CN",
+        user_agent=USER_AGENT,
+        viewport={"width": 1366, "height": 900},
+        storage_state=state_to_use
+    )
+    stats = await install_resource_blocking(ctx, policy)
+    return browser, ctx, stats
 
+@timed("cnipa.page_query")
+async def _query_on_page(page: "Page", app_no: str, roots: Optional[List[str]] = None,
+                         steps: Optional[Dict[str, float]] = None) -> List[Dict]:
+    """
+    在已带登录态的页面上完成一次查询（不负责关闭页面/浏览器）；roots 默认取 ROOTS。
+    整个查询共用一个截止时间（CNIPA_QUERY_DEADLINE_S）；各步骤耗时写入 steps，并记录为 cnipa.step.* 统计。
+    """
+    dl = _Deadline(QUERY_DEADLINE_S)
+    steps = {} if steps is None else steps
+    page.set_default_timeout(dl.ms())
+    t = time.perf_counter()
+
+    def lap(name):
+        nonlocal t
+        now = time.perf_counter()
+        steps[name] = now - t
+        t = now
+
+    # 入口与登录态检查
+    if not await _open_roots(page, roots, dl):
+        raise RuntimeError("无法打开入口页")
+    lap("open_roots")
+
+    body_text = await page.inner_text("body")
+    if looks_logged_out(body_text):
+        raise SessionExpiredError("CNIPA 登录状态已失效，请重新生成 state.json。")
+
+    # 导航到费用查询
+    if not await _goto_fee_query(page, dl):
+        raise RuntimeError("未找到【缴费服务/费用查询】入口。")
+    lap("goto_fee_query")
+
+    # 定位输入框+按钮
+    inp, btn = await _wait_find_input_and_button(page, total_ms=int(dl.ms(20000)))
+    lap("find_form")
+
+    # 提交查询并等待结果区域变化
+    await _submit_and_wait_result(page, inp, btn, app_no, dl, steps)
+    t = time.perf_counter()
+
+    rows = await _extract_fee_rows(page)
+    lap("extract")
+    for name, sec in steps.items():
+        record(f"cnipa.step.{name}", sec)
+    return rows
+
+class CnipaFeeSession:
+    """
+    单页面多专利查询：页面停留在应缴费查询表单，每个申请号只做“清空输入→提交→等待结果区域变化→解析结果容器”。
+        async with CnipaFeeSession(ctx) as sess:
+            rows = await sess.query("2022229271641")
+    某次查询出错后下一次会重新打开页面；登录失效抛出 SessionExpiredError。
+    """
 
-        # 导航到费用查询
-        if not await _goto_fee_query(page):
-            await browser.close()
+    def __init__(self, ctx, roots: Optional[List[str]] = None):
+        self.ctx = ctx
+        self.roots = roots
+        self.page = None
+        self._inp = self._btn = None
+        self.queries = 0
+        self.reopens = 0
+        self.open_steps: Dict[str, float] = {}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @timed("cnipa.session_open")
+    async def open(self):
+        await self.close()
+        dl = _Deadline(QUERY_DEADLINE_S)
+        self.page = await self.ctx.new_page()
+        self.page.set_default_timeout(dl.ms())
+        steps, t = self.open_steps, time.perf_counter()
+        if not await _open_roots(self.page, self.roots, dl):
+            raise RuntimeError("无法打开入口页")
+        if looks_logged_out(await self.page.inner_text("body")):
+            raise SessionExpiredError("CNIPA 登录状态已失效，请重新生成 state.json。")
+        steps["open_roots"] = time.perf_counter() - t; t = time.perf_counter()
+        if not await _goto_fee_query(self.page, dl):
             raise RuntimeError("未找到【缴费服务/费用查询】入口。")
+        steps["goto_fee_query"] = time.perf_counter() - t; t = time.perf_counter()
+        self._inp, self._btn = await _wait_find_input_and_button(self.page, total_ms=int(dl.ms(20000)))
+        steps["find_form"] = time.perf_counter() - t
 
-        # 定位输入框+按钮
-        inp, btn = await _wait_find_input_and_button(page, total_ms=20000)
-
-        # 提交查询
-        await inp.click()
-        await inp.fill(app_no)
-        try:
-            await inp.press("Enter")
-            await page.wait_for_load_state("networkidle", timeout=3000)
-        except Exception:
-            pass
-        if btn:
+    async def close(self):
+        if self.page is not None:
             try:
-                await btn.click()
+                await self.page.close()
             except Exception:
                 pass
+        self.page = self._inp = self._btn = None
+
+    @timed("cnipa.session_query")
+    async def query(self, app_no: str, steps: Optional[Dict[str, float]] = None) -> List[Dict]:
+        if self.page is None or self.page.is_closed():
+            if self.queries:
+                self.reopens += 1
+            await self.open()
+        steps = {} if steps is None else steps
+        dl = _Deadline(QUERY_DEADLINE_S)
+        try:
+            await self._inp.fill("")
+            await _submit_and_wait_result(self.page, self._inp, self._btn, app_no, dl, steps)
+            t = time.perf_counter()
+            rows = await _extract_fee_rows(self.page, scoped=True)
+            if rows is None:
+                # 没有结果容器：可能被踢回登录页，或页面结构与预期不同，退回整页解析
+                if looks_logged_out(await self.page.inner_text("body")):
+                    raise SessionExpiredError("CNIPA 登录状态已失效，请重新生成 state.json。")
+                rows = await _extract_fee_rows(self.page)
+            steps["extract"] = time.perf_counter() - t
+        except Exception:
+            await self.close()  # 页面状态未知，下次重新打开
+            raise
+        self.queries += 1
+        for name, sec in steps.items():
+            record(f"cnipa.step.{name}", sec)
+        return rows
+
+async def _query_many_async(app_nos: List[str], headful: bool, storage_state: Optional[dict], out: "asyncio.Queue"):
+    from playwright.async_api import async_playwright
 
-        # 等待结果或暂无数据
+    async with async_playwright() as p:
+        browser, ctx, stats = await _new_browser_context(p, headful, storage_state)
+        sess = CnipaFeeSession(ctx)
         try:
-            await page.wait_for_selector("table, .el-table, .ant-table, #cp_result_table", state="visible", timeout=20000)
-        except PWTimeout:
-            try:
-                await page.get_by_text("暂无数据").first.wait_for(timeout=5000)
-            except PWTimeout:
-                pass
+            for app_no in app_nos:
+                try:
+                    await out.put((app_no, await sess.query(app_no)))
+                except SessionExpiredError as e:
+                    await out.put((app_no, e))
+                    break
+                except Exception as e:
+                    await out.put((app_no, e))
+            await sess.close()
+        finally:
+            await browser.close()
+            _add_block_totals(stats, sess.queries)
+            await out.put(None)
 
-        rows = await _extract_fee_rows(page)
-        if not rows:  # 兜底再等一下
-            await page.wait_for_timeout(2000)
-            rows = await _extract_fee_rows(page)
+def query_due_fees_many(app_nos: List[str], headful: bool = False, storage_state: Optional[dict] = None):
+    """
+    同一浏览器页面依次查询多个申请号，逐个产出 (app_no, rows) 或 (app_no, Exception)。
+    登录失效时产出该申请号的 SessionExpiredError 后停止，其余申请号不再产出。
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        queue: asyncio.Queue = asyncio.Queue()
+        task = loop.create_task(_query_many_async(list(app_nos), headful, storage_state, queue))
+        while True:
+            item = loop.run_until_complete(queue.get())
+            if item is None:
+                break
+            yield item
+        loop.run_until_complete(task)
+    finally:
+        if not task.done():  # 调用方提前停止迭代
+            task.cancel()
+            loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+        loop.close()
+
+@timed("cnipa.query_due_fees")
+async def _query_due_fees_async(app_no: str, headful: bool, storage_state: Optional[dict] = None) -> List[Dict]:
+    from playwright.async_api import async_playwright
 
-        await browser.close()
-        return rows
+    async with async_playwright() as p:
+        browser, ctx, stats = await _new_browser_context(p, headful, storage_state)
+        try:
+            page = await ctx.new_page()
+            return await _query_on_page(page, app_no)
+        finally:
+            await browser.close()
+            _add_block_totals(stats)
+
+def query_due_fees(app_no: str, headful: bool = True, storage_state: Optional[dict] = None,
+                   backend: Optional[str] = None) -> List[Dict]:
+    """返回 [{'费用种类':..., '缴费期限届满日':..., '金额':...}, ...]
 
-def query_due_fees(app_no: str, headful: bool = True, storage_state: Optional[dict] = None) -> List[Dict]:
-    """返回 [{'费用种类':..., '缴费期限届满日':..., '金额':...}, ...]"""
+    backend: "browser"（Playwright，默认）或 "http"（复用登录 cookie 直接请求费用接口，见 cnipa_http_client）；
+    未指定时取环境变量 CNIPA_FEE_BACKEND。
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend == "http":
+        from cnipa_http_client import query_due_fees_http
+        return query_due_fees_http(app_no, storage_state=storage_state)
+    if backend != "browser":
+        raise ValueError(f"未知的查询后端: {backend}")
     return asyncio.run(_query_due_fees_async(app_no, headful=headful, storage_state=storage_state))
 
 def has_login_state() -> bool:
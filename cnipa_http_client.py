@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+CNIPA 年费查询 HTTP 后端（无浏览器）
+复用 state.json 中的登录 cookie，通过连接池化的 requests.Session 直接调用费用查询接口，
+输出与浏览器后端相同的 [{'费用种类':..., '缴费期限届满日':..., '金额':...}]。
+登录态仍由 cnipa_fee_query.ensure_login_interactive()（Playwright）建立或刷新。
+
+实验性：费用接口的路径与请求字段（{"appNo": ...}）尚未对正式站点抓包确认，目前只有 mock_servers.cnipa 实现。
+因此没有默认地址：只有显式设置 CNIPA_FEE_API_URL 后才启用该后端（http_backend_enabled()），
+界面与 batch_cli 在未设置时不提供 http 选项。
+
+对外函数：
+  - query_due_fees_http(app_no, storage_state=None) -> list[dict]
+  - get_client(storage_state=None) -> CnipaHttpClient
+  - probe_session(storage_state=None) -> SessionHealth
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cnipa_common import (CNIPA_BASE_URL, STATE_FILE, USER_AGENT, RateLimitedError, SessionExpiredError,
+                          looks_logged_out, is_annual_fee, dedupe_fee_rows, parse_fee_text)
+from timing import span
+
+HTTP_BACKEND_DISABLED = "HTTP 后端未启用：费用接口尚未对正式站点确认，需显式设置 CNIPA_FEE_API_URL（实验性）"
+POOL_SIZE = int(os.getenv("CNIPA_HTTP_POOL_SIZE", "16"))
+
+# 接口字段名的常见写法（与 normalize_baiten_item 的多键回退同理）
+_TYPE_KEYS = ("feeName", "feeTypeName", "fee_name", "costName", "费用种类")
+_DATE_KEYS = ("deadline", "dueDate", "payDeadline", "endDate", "缴费期限届满日")
+_AMOUNT_KEYS = ("amount", "fee", "money", "payAmount", "金额")
+_LIST_KEYS = ("data", "rows", "list", "records", "result")
+# 统一认证登录页的密码输入框（服务端渲染的登录表单才算确定的未登录信号）
+_LOGIN_FORM_RE = re.compile(r"<input[^>]+type=[\"']?password", re.I)
+
+
+def configured_fee_api_url() -> str:
+    """显式配置的费用接口地址；未配置时为空字符串（运行时读取，便于测试与子进程覆盖）。"""
+    return os.getenv("CNIPA_FEE_API_URL", "").strip()
+
+
+def http_backend_enabled() -> bool:
+    return bool(configured_fee_api_url())
+
+
+def _first(d: Dict[str, Any], keys) -> str:
+    for k in keys:
+        v = d.get(k)
+        if v not in (None, ""):
+            return str(v).strip()
+    return ""
+
+
+def _extract_list(payload: Any) -> List[Dict[str, Any]]:
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for k in _LIST_KEYS:
+            v = payload.get(k)
+            if isinstance(v, list):
+                return v
+            if isinstance(v, dict):
+                inner = _extract_list(v)
+                if inner:
+                    return inner
+    return []
+
+
+def parse_fee_payload(payload: Any) -> List[Dict[str, str]]:
+    """把费用接口 JSON 转为统一的三元组列表，只保留年费/滞纳金行并去重。"""
+    out = []
+    for row in _extract_list(payload):
+        if not isinstance(row, dict):
+            continue
+        t = _first(row, _TYPE_KEYS)
+        if not is_annual_fee(t):
+            continue
+        d = _first(row, _DATE_KEYS)[:10]
+        out.append({"费用种类": t, "缴费期限届满日": d, "金额": _first(row, _AMOUNT_KEYS)})
+    return dedupe_fee_rows(out)
+
+
+def load_storage_state(storage_state: Optional[dict] = None) -> dict:
+    if storage_state is not None:
+        return storage_state
+    if not STATE_FILE.exists():
+        raise RuntimeError("未找到登录状态文件 (state.json)。")
+    return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+
+
+def state_fingerprint(storage_state: dict) -> str:
+    cookies = sorted((c.get("domain", ""), c.get("path", "/"), c.get("name", ""), c.get("value", ""))
+                     for c in storage_state.get("cookies", []))
+    return hashlib.sha1(json.dumps(cookies).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SessionHealth:
+    ok: bool
+    expired: bool          # True 表示确定已失效（需重新登录）；网络类失败为 False
+    reason: str
+    latency_s: float = 0.0
+    checked_at: float = 0.0
+
+    def __post_init__(self):
+        if not self.checked_at:
+            self.checked_at = time.time()
+
+
+def cookies_expired(storage_state: dict, now: Optional[float] = None) -> bool:
+    """不发请求的快速判断：所有带过期时间的 SESSION cookie 都已过期。"""
+    now = now or time.time()
+    expires = [c.get("expires", -1) for c in storage_state.get("cookies", []) if c.get("name") == "SESSION"]
+    timed_ = [e for e in expires if e and e > 0]
+    return bool(timed_) and len(timed_) == len(expires) and all(e < now for e in timed_)
+
+
+class CnipaHttpClient:
+    """持有一个带连接池的 Session；线程间可共享。"""
+
+    def __init__(self, storage_state: dict, *, fee_api_url: Optional[str] = None, base_url: str = CNIPA_BASE_URL,
+                 timeout: float = 15.0, pool_size: int = POOL_SIZE):
+        self.fee_api_url = fee_api_url or configured_fee_api_url()
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        # 429 不在连接层等待重试：交给调用方（cnipa_accounts 按账号冷却或改派）
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET", "POST"}), respect_retry_after_header=False)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept": "application/json, text/plain, */*",
+            "Accept-Language": "zh-CN,zh;q=0.9",
+            "Origin": CNIPA_BASE_URL,
+            "Referer": f"{CNIPA_BASE_URL}/od/public/index",
+        })
+        for c in storage_state.get("cookies", []):
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain", "").lstrip("."),
+                                     path=c.get("path", "/"))
+
+    def query_due_fees(self, app_no: str) -> List[Dict[str, str]]:
+        if not self.fee_api_url:
+            raise RuntimeError(HTTP_BACKEND_DISABLED)
+        with span("cnipa_http.fee_api"):
+            resp = self.session.post(self.fee_api_url, json={"appNo": app_no}, timeout=self.timeout,
+                                     allow_redirects=False)
+        if resp.status_code in (401, 403) or (300 <= resp.status_code < 400 and "sso" in resp.headers.get("Location", "")):
+            raise SessionExpiredError(f"CNIPA 登录状态已失效（HTTP {resp.status_code}），请重新生成 state.json。")
+        if resp.status_code == 429:
+            try:
+                retry_after = float(resp.headers.get("Retry-After") or 1.0)
+            except ValueError:
+                retry_after = 1.0
+            raise RateLimitedError("费用接口限流（HTTP 429）", retry_after)
+        if resp.status_code != 200:
+            raise RuntimeError(f"费用接口返回 HTTP {resp.status_code}: {resp.text[:200]}")
+        ctype = resp.headers.get("Content-Type", "")
+        if "json" in ctype:
+            return parse_fee_payload(resp.json())
+        # 部分接口直接返回 HTML 片段：与浏览器后端一样退回全文正则
+        if looks_logged_out(resp.text):
+            raise SessionExpiredError("CNIPA 登录状态已失效，请重新生成 state.json。")
+        return parse_fee_text(resp.text)
+
+    def probe(self) -> "SessionHealth":
+        """打开入口页判断登录态：被重定向到统一认证、返回 401/403 或登录表单才视为失效。
+        入口页可能只是由 JavaScript 渲染的 SPA 外壳，静态 HTML 中“登录/退出”字样不可靠：
+        仅凭文字判断为未登录时返回 expired=False（未知），由首个实际查询（渲染后的页面或接口响应）判定。"""
+        t0 = time.perf_counter()
+        try:
+            with span("cnipa_http.probe"):
+                resp = self.session.get(f"{self.base_url}/od/public/index", timeout=self.timeout)
+        except requests.RequestException as e:
+            # 网络问题不等于登录失效，交给调用方决定是否重试
+            return SessionHealth(ok=False, expired=False, reason=f"网络错误: {e}", latency_s=time.perf_counter() - t0)
+        latency = time.perf_counter() - t0
+        final_url = resp.url or ""
+        if resp.status_code in (401, 403) or "sso." in final_url or "/login" in final_url:
+            return SessionHealth(ok=False, expired=True, reason=f"已跳转到登录页 ({resp.status_code})", latency_s=latency)
+        if resp.status_code != 200:
+            return SessionHealth(ok=False, expired=False, reason=f"HTTP {resp.status_code}", latency_s=latency)
+        if _LOGIN_FORM_RE.search(resp.text):
+            return SessionHealth(ok=False, expired=True, reason="入口页返回了登录表单", latency_s=latency)
+        if looks_logged_out(resp.text):
+            return SessionHealth(ok=False, expired=False, reason="无法从入口页判断登录态，由首个查询判定", latency_s=latency)
+        return SessionHealth(ok=True, expired=False, reason="", latency_s=latency)
+
+    def close(self):
+        self.session.close()
+
+
+_clients: Dict[str, CnipaHttpClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(storage_state: Optional[dict] = None) -> CnipaHttpClient:
+    """按登录 cookie 复用客户端（同一登录态共享一个连接池）。"""
+    state = load_storage_state(storage_state)
+    key = state_fingerprint(state)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = CnipaHttpClient(state)
+        return client
+
+
+def probe_session(storage_state: Optional[dict] = None) -> SessionHealth:
+    """检查登录态是否仍有效；先看 cookie 过期时间，再请求一次入口页。"""
+    try:
+        state = load_storage_state(storage_state)
+    except Exception as e:
+        return SessionHealth(ok=False, expired=True, reason=str(e))
+    if not state.get("cookies"):
+        return SessionHealth(ok=False, expired=True, reason="登录状态中没有 cookie")
+    if cookies_expired(state):
+        return SessionHealth(ok=False, expired=True, reason="SESSION cookie 已过期")
+    return get_client(state).probe()
+
+
+def query_due_fees_http(app_no: str, storage_state: Optional[dict] = None) -> List[Dict[str, str]]:
+    """返回 [{'费用种类':..., '缴费期限届满日':..., '金额':...}, ...]"""
+    return get_client(storage_state).query_due_fees(app_no)
@@ -1,7 +1,11 @@
-from typing import List, Dict, Any, Optional, Tuple
-import pandas as pd
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 from datetime import datetime
 
+from timing import timed
+
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 REQUIRED_COLUMNS = [
     "公司名称",
@@ -82,6 +86,7 @@ def normalize_baiten_item(item: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+@timed("data.normalize_baiten_payload")
 def normalize_baiten_payload(payload: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Optional[int]]:
     """Extract and normalize list of items from Baiten API payload.
     Also extracts the total number of records if available.
@@ -133,10 +138,76 @@ def normalize_baiten_payload(payload: Dict[str, Any]) -> Tuple[List[Dict[str, An
     return normalized_items, total_count
 
 
-def build_dataframe(records: List[Dict[str, Any]]) -> pd.DataFrame:
+@timed("data.build_dataframe")
+def build_dataframe(records: List[Dict[str, Any]]) -> "pd.DataFrame":
+    import pandas as pd
+
     df = pd.DataFrame(records)
     for col in REQUIRED_COLUMNS:
         if col not in df.columns:
             df[col] = ""
     df = df[REQUIRED_COLUMNS]
     return df
+
+
+def apply_filters(df: "pd.DataFrame", filters: Dict[str, Any]) -> "pd.DataFrame":
+    """按筛选条件过滤检索结果（与 filters_ui 生成的 filters 字典同结构）。
+
+    filters 键：公司名称/专利类型/法律状态（列表）、发明人关键词、开始/结束（YYYY-MM-DD）。
+    多个条件先合并成一个布尔掩码，只在最后做一次行选择。
+    """
+    mask = None
+
+    def _and(m):
+        nonlocal mask
+        mask = m if mask is None else (mask & m)
+
+    if filters.get("公司名称"):
+        _and(df["公司名称"].isin(filters["公司名称"]))
+    if filters.get("专利类型"):
+        _and(df["专利类型"].isin(filters["专利类型"]))
+    if filters.get("法律状态"):
+        _and(df["当前法律状态"].isin(filters["法律状态"]))
+    if filters.get("发明人关键词"):
+        _and(df["发明人"].str.contains(filters["发明人关键词"], na=False, regex=False))
+    if filters.get("开始"):
+        _and(df["申请时间"] >= filters["开始"])
+    if filters.get("结束"):
+        _and(df["申请时间"] <= filters["结束"])
+    return df.copy() if mask is None else df[mask]
+
+
+@timed("data.dashboard_aggregates")
+def dashboard_aggregates(df: "pd.DataFrame") -> Dict[str, "pd.DataFrame"]:
+    """仪表盘所需的分组统计：按类型、公司×类型、申请年份计数。"""
+    return {
+        "by_type": df.groupby("专利类型").size().reset_index(name="数量"),
+        "by_company_type": df.groupby(["公司名称", "专利类型"]).size().reset_index(name="数量"),
+        "by_year": df.groupby(df["申请时间"].str.slice(0, 4).rename("申请年份")).size().reset_index(name="数量"),
+    }
+
+
+# 检索结果表格着色（专利类型 / 当前法律状态）
+TYPE_STYLES = {
+    "发明": "background-color:#e3f2fd;color:#0b61b7;",
+    "实用新型": "background-color:#e8f5e9;color:#1b5e20;",
+    "外观设计": "background-color:#fff3e0;color:#e65100;",
+}
+STATUS_VALID_STYLE = "background-color:#e8f5e9;color:#1b5e20;"
+STATUS_INVALID_STYLE = "background-color:#ffebee;color:#b71c1c;"
+
+
+@timed("data.result_styles")
+def result_styles(df: "pd.DataFrame") -> "pd.DataFrame":
+    """专利类型、当前法律状态两列的 CSS 样式数组（整列映射，不逐格回调），与 df 同索引。
+    法律状态含“有权”为绿色，含“无效”/“失效”为红色，其余（含非字符串）无样式。"""
+    import numpy as np
+    import pandas as pd
+
+    status = df["当前法律状态"]
+    valid = status.str.contains("有权", regex=False, na=False)
+    invalid = status.str.contains("无效", regex=False, na=False) | status.str.contains("失效", regex=False, na=False)
+    return pd.DataFrame({
+        "专利类型": df["专利类型"].map(TYPE_STYLES).fillna("").to_numpy(dtype=object),
+        "当前法律状态": np.select([valid.to_numpy(), invalid.to_numpy()], [STATUS_VALID_STYLE, STATUS_INVALID_STYLE], ""),
+    }, index=df.index)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+批量年费查询的运行器（无 Streamlit 依赖，app.py 与 batch_cli.py 共用）
+- 开始前用 cnipa_http_client.probe_session 探测登录态，确定失效（expired=True）则不启动任何查询；
+  探测结果不确定（ok=False、expired=False，如入口页为 SPA 外壳）时照常开始，由首个查询判定；
+- 运行中每 probe_every 个专利（成功与失败都计入）或 probe_interval 秒再探测一次；
+  连续 probe_after_failures 个专利查询失败时立即探测（浏览器后端的登录失效常表现为超时、找不到输入框等普通错误），
+  探测确认失效时，这些连续失败的专利从 failed 移入 pending，续跑时重新查询；
+- 任一查询抛出 SessionExpiredError 或探测失效时停止派发新任务，已在执行的任务照常收尾，
+  未完成的专利放入 BatchOutcome.pending，换上新的 state.json 后用 pending 再次调用即可续跑，
+  已完成的专利不会重复查询。
+- 传入 checkpoint（fee_checkpoint.FeeCheckpoint）时，每完成一个专利即写入断点文件，
+  TTL 内已有断点的专利直接使用断点结果（同样经 on_result 回调），不再查询。
+- 多账号（cnipa_accounts.AccountRegistry）时，单个账号失效抛出 AccountExpiredError：
+  该专利进入 pending，其余专利继续查询，失效账号记入 BatchOutcome.expired_accounts。
+- 传入 executor（如 fee_pool.make_fee_pool 创建的进程池）时在其中执行查询，否则使用 workers 个线程。
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from cnipa_common import SessionExpiredError
+
+Patent = Dict[str, Any]
+
+
+@dataclass
+class BatchOutcome:
+    results: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)  # 专利号 -> 年费行
+    failed: Dict[str, str] = field(default_factory=dict)                  # 专利号 -> 错误信息
+    pending: List[Patent] = field(default_factory=list)                   # 因登录失效未完成
+    session_expired: bool = False
+    reason: str = ""
+    probes: int = 0
+    from_checkpoint: int = 0
+    expired_accounts: List[str] = field(default_factory=list)
+
+    @property
+    def completed(self) -> int:
+        return len(self.results) + len(self.failed)
+
+
+def run_fee_batch(patents: Iterable[Patent], query: Callable[[Patent], List[Dict[str, Any]]], *,
+                  probe: Optional[Callable[[], Any]] = None, workers: int = 1,
+                  probe_every: int = 25, probe_interval: float = 120.0, probe_after_failures: int = 3,
+                  on_result: Optional[Callable[[Patent, List[Dict[str, Any]]], None]] = None,
+                  on_error: Optional[Callable[[Patent, Exception], None]] = None,
+                  checkpoint=None, executor: Optional[Executor] = None,
+                  key: Callable[[Patent], str] = lambda p: p["专利号"]) -> BatchOutcome:
+    """
+    逐个（workers>1 时并发）查询年费。
+    query(patent) -> 年费行；probe() -> 带 ok / expired / reason 属性的对象（如 SessionHealth）。
+    on_result / on_error 在调用线程中执行，可直接更新界面或写文件。
+    executor 由调用方管理生命周期（这里不会关闭）；在途任务数仍以 workers 为上限。
+    """
+    out = BatchOutcome()
+    todo = []
+    for patent in patents:
+        cached = checkpoint.get(key(patent)) if checkpoint is not None else None
+        if cached is None:
+            todo.append(patent)
+            continue
+        out.from_checkpoint += 1
+        out.results[key(patent)] = cached
+        if on_result is not None:
+            on_result(patent, cached)
+    if not todo:
+        return out
+
+    def session_dead() -> bool:
+        if probe is None:
+            return False
+        out.probes += 1
+        health = probe()
+        if getattr(health, "expired", False):
+            out.session_expired = True
+            out.reason = getattr(health, "reason", "") or "登录状态已失效"
+            return True
+        return False
+
+    if session_dead():
+        out.pending = todo
+        return out
+
+    def requeue(suspects: List[Patent]):
+        # 登录失效后的失败多半由失效引起：改记为未完成，续跑时重新查询
+        for p in suspects:
+            out.failed.pop(key(p), None)
+            out.pending.append(p)
+        suspects.clear()
+
+    nxt = 0
+    since_probe = 0
+    suspects: List[Patent] = []  # 自上次成功以来连续失败的专利
+    last_probe = time.monotonic()
+    in_flight: Dict[Any, Patent] = {}
+    with (nullcontext(executor) if executor is not None else ThreadPoolExecutor(max_workers=max(1, workers))) as pool:
+        while in_flight or (nxt < len(todo) and not out.session_expired):
+            # 只保持 workers 个在途任务，停止时不会留下大量已排队的查询
+            while not out.session_expired and nxt < len(todo) and len(in_flight) < max(1, workers):
+                in_flight[pool.submit(query, todo[nxt])] = todo[nxt]
+                nxt += 1
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                patent = in_flight.pop(fut)
+                since_probe += 1
+                try:
+                    rows = fut.result()
+                except SessionExpiredError as e:
+                    account = getattr(e, "account", None)
+                    if account:
+                        if account not in out.expired_accounts:
+                            out.expired_accounts.append(account)
+                        out.pending.append(patent)
+                        continue
+                    out.session_expired = True
+                    out.reason = out.reason or str(e)
+                    out.pending.append(patent)
+                    requeue(suspects)
+                    continue
+                except Exception as e:
+                    out.failed[key(patent)] = str(e)
+                    suspects.append(patent)
+                    if on_error is not None:
+                        on_error(patent, e)
+                    continue
+                out.results[key(patent)] = rows
+                suspects.clear()
+                if checkpoint is not None:
+                    checkpoint.record(key(patent), rows)
+                if on_result is not None:
+                    on_result(patent, rows)
+
+            if out.session_expired:
+                requeue(suspects)
+            elif probe is not None and (
+                    (probe_after_failures and len(suspects) >= probe_after_failures)
+                    or nxt < len(todo) and (since_probe >= probe_every
+                                            or time.monotonic() - last_probe >= probe_interval)):
+                since_probe = 0
+                last_probe = time.monotonic()
+                if session_dead():
+                    requeue(suspects)
+                elif len(suspects) >= probe_after_failures:
+                    # 登录态正常：这些失败与登录无关，重新开始计数
+                    suspects.clear()
+
+    out.pending.extend(todo[nxt:])
+    return out
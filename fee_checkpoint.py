@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+年费查询断点文件（JSONL，每完成一个专利追加一行）
+  {"key": "CN202222927164.1", "ts": 1760000000.0, "rows": [{...年费行...}]}
+进程崩溃、Streamlit 重跑或登录失效后再次查询同一批专利时，TTL 内已完成的专利直接取断点结果。
+查询失败的专利不写入断点，下次会重新查询。
+追加与压缩都在同一个进程间文件锁（<断点文件>.lock）内进行：压缩时先重读磁盘上的全部行，
+再原子替换文件，其他进程（另一个 Streamlit 会话或 batch_cli）已追加的结果不会丢失。
+
+路径与有效期可通过环境变量 FEE_CHECKPOINT_FILE / FEE_CHECKPOINT_TTL_HOURS 覆盖。
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from file_lock import exclusive_file_lock
+
+BASE = Path(__file__).parent
+CHECKPOINT_FILE = Path(os.getenv("FEE_CHECKPOINT_FILE", str(BASE / "fee_query_checkpoint.jsonl"))).expanduser()
+CHECKPOINT_TTL_HOURS = float(os.getenv("FEE_CHECKPOINT_TTL_HOURS", "24"))
+
+
+class FeeCheckpoint:
+    def __init__(self, path: Optional[Path] = None, ttl_hours: Optional[float] = None):
+        self.path = Path(path) if path else CHECKPOINT_FILE
+        self.ttl = (CHECKPOINT_TTL_HOURS if ttl_hours is None else ttl_hours) * 3600.0
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._entries = self._read()
+
+    def _file_lock(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        return exclusive_file_lock(str(self.path) + ".lock")
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        entries: Dict[str, Dict[str, Any]] = {}
+        if not self.path.exists():
+            return entries
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 进程在写入一半时被杀会留下残行，跳过即可
+                    continue
+                if isinstance(entry, dict) and "key" in entry:
+                    entries[entry["key"]] = entry
+        return entries
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        """TTL 内的断点结果；不存在或已过期返回 None。"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if (now or time.time()) - entry.get("ts", 0) > self.ttl:
+            return None
+        return entry.get("rows", [])
+
+    def record(self, key: str, rows: List[Dict[str, Any]]):
+        entry = {"key": key, "ts": time.time(), "rows": rows}
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        with self._lock, self._file_lock():
+            self._entries[key] = entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """重读文件，丢弃过期与重复的行并原子替换文件，返回保留的条数。"""
+        now = now or time.time()
+        with self._lock, self._file_lock():
+            entries = self._read()
+            entries.update((k, e) for k, e in self._entries.items()
+                           if k not in entries or e.get("ts", 0) > entries[k].get("ts", 0))
+            self._entries = {k: e for k, e in entries.items() if now - e.get("ts", 0) <= self.ttl}
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for e in self._entries.values():
+                    f.write(json.dumps(e, ensure_ascii=False, default=str) + "\n")
+            os.replace(tmp, self.path)
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock, self._file_lock():
+            self._entries.clear()
+            if self.path.exists():
+                self.path.unlink()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+年费成本聚合立方体（纯 Python，frame()/slice() 时才用 pandas）
+把年费查询结果与年费监控项汇总成 公司名称 × 专利类型 × 缴费月份 × 紧急程度 → (金额, 笔数) 的单元格，
+仪表盘的筛选、切片只在单元格上分组（单元格数远小于费用行数），不再扫描原始费用记录。
+
+增量维护：
+  - sync(source, stamp, load)     来源（如 "monitor"、"query"）的版本 stamp 未变时直接返回，不调用 load；
+                                  否则按 (专利号, 费用种类) 与上次的记录比对，只对新增、删除、内容变化的行加减单元格
+  - 同一笔费用同时出现在多个来源（已查询且已监控）时只计一次，最后一个来源移除后才从立方体中扣除
+  - 金额在记录首次进入时解析为数值，之后不再解析；无法解析的金额计入笔数、金额按 0（见 stats()["unparsed"]）
+  - 紧急程度随日期变化：跨天后按已解析的到期日与法律状态重新归类（同一 (到期日, 法律状态) 只计算一次）
+专利类型取自费用种类（“实用新型专利第4年年费”），取不到时按申请号第 5 位推断（1/8 发明，2/9 实用新型，3 外观设计）。
+"""
+
+import re
+import threading
+from datetime import datetime, date
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from fee_monitor_core import URGENCY_ORDER, get_urgency_level
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CUBE_DIMS = ("公司名称", "专利类型", "缴费月份", "紧急程度")
+URGENCY_LABELS = {"invalid": "已失效", "overdue": "已逾期", "critical": "紧急(≤1天)", "urgent": "急迫(≤7天)",
+                  "warning": "注意(≤30天)", "caution": "提醒(≤90天)", "normal": "正常", "unknown": "未知"}
+UNKNOWN = "未知"
+
+_KIND_TYPE_RE = re.compile(r"^(发明|实用新型|外观设计)")
+_APP_NO_RE = re.compile(r"(?:19|20)\d{2}([1-9])\d{7}")
+_APP_NO_TYPES = {"1": "发明", "8": "发明", "2": "实用新型", "9": "实用新型", "3": "外观设计"}
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+Record = Dict[str, Any]
+Cell = Tuple[str, str, str, str]
+
+
+def parse_amount(value: Any) -> Optional[float]:
+    """“1,200.00” / “¥135” -> 数值；空值或无法解析时返回 None。"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    s = str(value or "").replace(",", "").replace("¥", "").replace("￥", "").replace("元", "").strip()
+    try:
+        return float(s) if s else None
+    except ValueError:
+        return None
+
+
+def patent_type_of(fee: Record) -> str:
+    m = _KIND_TYPE_RE.match(str(fee.get("费用种类") or "").strip())
+    if m:
+        return m.group(1)
+    m = _APP_NO_RE.search(re.sub(r"\D", "", str(fee.get("专利号") or "")))
+    return _APP_NO_TYPES.get(m.group(1), UNKNOWN) if m else UNKNOWN
+
+
+class _Row:
+    __slots__ = ("fingerprint", "company", "ptype", "due", "status", "month", "amount", "level", "sources")
+
+    def __init__(self, fee: Record, fingerprint: Tuple):
+        self.fingerprint = fingerprint
+        self.company = str(fee.get("公司名称") or "") or UNKNOWN
+        self.ptype = patent_type_of(fee)
+        self.due = str(fee.get("缴费期限届满日") or "").strip()
+        self.status = str(fee.get("当前法律状态") or "")
+        self.month = self.due[:7] if _MONTH_RE.match(self.due) else UNKNOWN
+        self.amount = parse_amount(fee.get("金额"))
+        self.level = "unknown"
+        self.sources: set = set()
+
+    @property
+    def cell(self) -> Cell:
+        return self.company, self.ptype, self.month, self.level
+
+
+def _fingerprint(fee: Record) -> Tuple:
+    return (fee.get("公司名称"), fee.get("缴费期限届满日"), fee.get("金额"), fee.get("当前法律状态"))
+
+
+class FeeCube:
+    """单元格 {(公司名称, 专利类型, 缴费月份, 紧急程度级别): [金额, 笔数]}；version 在单元格变化后递增，可用作缓存键。
+    实例可在线程间共享（所有操作在 self.lock 内进行）。"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.version = 0
+        self._cells: Dict[Cell, List[float]] = {}
+        self._rows: Dict[Tuple[Any, Any], _Row] = {}
+        self._sources: Dict[str, Dict[Tuple[Any, Any], Tuple]] = {}
+        self._stamps: Dict[str, Hashable] = {}
+        self._day: Optional[date] = None
+        self._now = datetime.now()
+        self._parsed = 0
+        self._frame_cache = None
+
+    # ---- 单元格加减 ----
+    def _apply(self, row: _Row, sign: int):
+        cell = row.cell
+        acc = self._cells.get(cell)
+        if acc is None:
+            acc = self._cells[cell] = [0.0, 0]
+        acc[0] += sign * (row.amount or 0.0)
+        acc[1] += sign
+        if acc[1] <= 0:
+            del self._cells[cell]
+
+    def _take(self, source: str, key: Tuple[Any, Any], fee: Record, fingerprint: Tuple,
+              memo: Dict[Tuple[str, str], str]):
+        row = self._rows.get(key)
+        if row is not None and row.fingerprint == fingerprint:
+            row.sources.add(source)
+            return
+        new = _Row(fee, fingerprint)
+        self._parsed += 1
+        new.level = self._level(new.due, new.status, memo)
+        if row is not None:
+            # 内容有变化（如另一来源的记录更新了金额或状态）：以最新记录为准
+            self._apply(row, -1)
+            new.sources = row.sources
+        new.sources.add(source)
+        self._rows[key] = new
+        self._apply(new, +1)
+
+    def _drop(self, source: str, key: Tuple[Any, Any]):
+        row = self._rows.get(key)
+        if row is None:
+            return
+        row.sources.discard(source)
+        if not row.sources:
+            self._apply(row, -1)
+            del self._rows[key]
+
+    def _level(self, due: str, status: str, memo: Dict[Tuple[str, str], str]) -> str:
+        key = (due, status)
+        level = memo.get(key)
+        if level is None:
+            level = memo[key] = get_urgency_level(due, status, self._now)["level"]
+        return level
+
+    def _roll_day(self) -> bool:
+        """日期变化后按已解析的到期日重新归类紧急程度，重建单元格（不重新解析原始记录）。"""
+        today = date.today()
+        if self._day == today:
+            return False
+        self._day = today
+        self._now = datetime.now()
+        if not self._rows:
+            return False
+        memo: Dict[Tuple[str, str], str] = {}
+        self._cells = {}
+        for row in self._rows.values():
+            row.level = self._level(row.due, row.status, memo)
+            self._apply(row, +1)
+        self.version += 1
+        return True
+
+    # ---- 对外接口 ----
+    def sync(self, source: str, stamp: Hashable, load: Callable[[], Iterable[Record]]) -> bool:
+        """把来源 source 的当前费用记录同步进立方体；stamp 与上次相同时跳过，返回单元格是否有变化。"""
+        with self.lock:
+            changed = self._roll_day()
+            if source in self._stamps and self._stamps[source] == stamp:
+                return changed
+            current: Dict[Tuple[Any, Any], Record] = {}
+            for fee in load() or []:
+                current[(fee.get("专利号"), fee.get("费用种类"))] = fee
+            previous = self._sources.get(source, {})
+            seen: Dict[Tuple[Any, Any], Tuple] = {}
+            memo: Dict[Tuple[str, str], str] = {}
+            for key in previous.keys() - current.keys():
+                self._drop(source, key)
+                changed = True
+            for key, fee in current.items():
+                fingerprint = seen[key] = _fingerprint(fee)
+                if previous.get(key) != fingerprint:
+                    self._take(source, key, fee, fingerprint, memo)
+                    changed = True
+            self._sources[source] = seen
+            self._stamps[source] = stamp
+            if changed:
+                self.version += 1
+            return changed
+
+    def remove_source(self, source: str) -> bool:
+        """移除某个来源的全部记录（如会话清空了年费查询结果）。"""
+        with self.lock:
+            return self.sync(source, None, lambda: []) if source in self._sources else False
+
+    def cells(self) -> Dict[Cell, Tuple[float, int]]:
+        with self.lock:
+            self._roll_day()
+            return {k: (round(v[0], 2), int(v[1])) for k, v in self._cells.items()}
+
+    def frame(self) -> "pd.DataFrame":
+        """单元格表：公司名称、专利类型、缴费月份、紧急程度（显示文字）、level、金额、笔数；按 version 缓存。"""
+        import pandas as pd
+
+        with self.lock:
+            self._roll_day()
+            if self._frame_cache is not None and self._frame_cache[0] == self.version:
+                return self._frame_cache[1]
+            items = [(*k, round(v[0], 2), int(v[1])) for k, v in self._cells.items()]
+            version = self.version
+        df = pd.DataFrame(items, columns=["公司名称", "专利类型", "缴费月份", "level", "金额", "笔数"])
+        df["紧急程度"] = df["level"].map(URGENCY_LABELS).fillna(UNKNOWN)
+        df["_order"] = df["level"].map(URGENCY_ORDER).fillna(7).astype(int)
+        for col in CUBE_DIMS:
+            df[col] = df[col].astype("category")
+        df = df[["公司名称", "专利类型", "缴费月份", "紧急程度", "level", "_order", "金额", "笔数"]]
+        df = df.sort_values(["缴费月份", "_order", "公司名称"], ignore_index=True)
+        with self.lock:
+            self._frame_cache = (version, df)
+        return df
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"rows": len(self._rows), "cells": len(self._cells), "parsed": self._parsed,
+                    "unparsed": sum(1 for r in self._rows.values() if r.amount is None)}
+
+
+def slice_cube(cube: "pd.DataFrame", by: Iterable[str], **selected: Optional[Iterable[str]]) -> "pd.DataFrame":
+    """在 FeeCube.frame() 上切片并按 by 维度汇总金额、笔数。
+    selected 以维度名为键（公司名称=[...]、紧急程度=[...]、缴费月份=(起, 止) 闭区间），空值不筛选。"""
+    mask = None
+    for dim, values in selected.items():
+        if not values:
+            continue
+        if dim == "缴费月份" and isinstance(values, tuple):
+            start, end = values
+            col = cube[dim].astype(str)
+            m = (col >= start) & (col <= end)
+        else:
+            m = cube[dim].isin(list(values))
+        mask = m if mask is None else (mask & m)
+    view = cube if mask is None else cube[mask]
+    by = list(by)
+    if not by:
+        return view[["金额", "笔数"]].sum().to_frame().T.astype({"笔数": int})
+    out = view.groupby(by, observed=True, sort=True)[["金额", "笔数"]].sum().reset_index()
+    out["金额"] = out["金额"].round(2)
+    return out
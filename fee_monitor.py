@@ -1,122 +1,34 @@
 # -*- coding: utf-8 -*-
 """
 年费监控模块
-提供年费监控的数据存储、管理和界面功能
+提供年费监控的管理界面；数据存储与紧急程度计算见 fee_monitor_core.py
 """
 
-import json
-import os
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Dict, Any, Optional
 import pandas as pd
 import streamlit as st
 
-# 监控数据存储文件
-MONITOR_DATA_FILE = "fee_monitor_data.json"
+from fee_monitor_core import FeeMonitor as _CoreFeeMonitor, MONITOR_DATA_FILE, URGENCY_ORDER, get_urgency_level
 
-class FeeMonitor:
-    """年费监控管理类"""
-    
-    def __init__(self):
-        self.data_file = MONITOR_DATA_FILE
-        self.monitored_fees = self.load_monitored_fees()
-    
-    def load_monitored_fees(self) -> List[Dict[str, Any]]:
-        """从文件加载监控的年费数据"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                st.error(f"加载监控数据失败: {e}")
-                return []
-        return []
-    
-    def save_monitored_fees(self):
-        """保存监控的年费数据到文件"""
-        try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.monitored_fees, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            st.error(f"保存监控数据失败: {e}")
-    
-    def add_monitored_fee(self, fee_data: Dict[str, Any]) -> bool:
-        """添加年费监控项"""
-        # 检查是否已存在相同的监控项
-        for existing in self.monitored_fees:
-            if (existing.get('专利号') == fee_data.get('专利号') and 
-                existing.get('费用种类') == fee_data.get('费用种类')):
-                return False  # 已存在
-        
-        # 添加监控时间戳
-        fee_data['添加时间'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self.monitored_fees.append(fee_data)
-        self.save_monitored_fees()
-        return True
-    
-    def remove_monitored_fee(self, index: int) -> bool:
-        """移除年费监控项"""
-        if 0 <= index < len(self.monitored_fees):
-            self.monitored_fees.pop(index)
-            self.save_monitored_fees()
-            return True
-        return False
-    
-    def get_urgency_level(self, due_date_str: str, legal_status: str = "") -> Dict[str, Any]:
-        """根据到期日期和法律状态计算紧急程度"""
-        # 先基于法律状态的快速判定
-        if legal_status:
-            # “无权” 保持灰色（失效，不再需要缴费）
-            if "无权" in legal_status:
-                return {"level": "invalid", "color": "#808080", "text": "已失效", "days_left": None}
-            # “已失效” 视为需关注的已逾期（使用深红色，与到期逾期一致）
-            if "已失效" in legal_status:
-                return {"level": "overdue", "color": "#8B0000", "text": "已逾期", "days_left": None}
-        
-        if not due_date_str:
-            return {"level": "unknown", "color": "#808080", "text": "未知", "days_left": None}
-        
-        try:
-            due_date = datetime.strptime(due_date_str, '%Y-%m-%d')
-            today = datetime.now()
-            days_left = (due_date - today).days
-            
-            if days_left < 0:
-                return {"level": "overdue", "color": "#8B0000", "text": "已逾期", "days_left": days_left}
-            elif days_left <= 1:
-                return {"level": "critical", "color": "#DC143C", "text": "紧急", "days_left": days_left}
-            elif days_left <= 7:
-                return {"level": "urgent", "color": "#FF4500", "text": "急迫", "days_left": days_left}
-            elif days_left <= 30:
-                return {"level": "warning", "color": "#FF8C00", "text": "注意", "days_left": days_left}
-            elif days_left <= 90:
-                return {"level": "caution", "color": "#FFD700", "text": "提醒", "days_left": days_left}
-            else:
-                return {"level": "normal", "color": "#32CD32", "text": "正常", "days_left": days_left}
-                
-        except ValueError:
-            return {"level": "unknown", "color": "#808080", "text": "日期格式错误", "days_left": None}
-    
-    def get_monitored_fees_with_urgency(self) -> List[Dict[str, Any]]:
-        """获取带紧急程度标记的监控年费列表"""
-        result = []
-        for fee in self.monitored_fees:
-            fee_copy = fee.copy()
-            urgency = self.get_urgency_level(
-                fee.get('缴费期限届满日', ''), 
-                fee.get('当前法律状态', '')
-            )
-            fee_copy['urgency'] = urgency
-            result.append(fee_copy)
-        
-        # 按紧急程度和到期日期排序
-        urgency_order = {"invalid": 0, "overdue": 1, "critical": 2, "urgent": 3, "warning": 4, "caution": 5, "normal": 6, "unknown": 7}
-        result.sort(key=lambda x: (
-            urgency_order.get(x['urgency']['level'], 7),
-            x.get('缴费期限届满日', '9999-12-31')
-        ))
-        
-        return result
+class FeeMonitor(_CoreFeeMonitor):
+    """年费监控管理类（界面版）：加载/保存失败时通过 st.error 提示"""
+
+    def __init__(self, data_file: Optional[str] = None):
+        super().__init__(data_file=data_file, on_error=st.error)
+
+
+@st.cache_resource(show_spinner=False)
+def shared_monitor() -> FeeMonitor:
+    """进程内所有会话共用的监控实例（内部加锁），会话之间立即可见彼此的修改，也不再各自加载一份 JSON。"""
+    return FeeMonitor()
+
+
+def session_monitor() -> FeeMonitor:
+    """当前会话使用的监控实例；会话中只保存共享实例的引用（测试页等可预先放入自己的实例）。"""
+    if 'fee_monitor' not in st.session_state:
+        st.session_state.fee_monitor = shared_monitor()
+    return st.session_state.fee_monitor
 
 def render_fee_selection_ui(fee_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """渲染年费选择界面，返回用户选择的年费项"""
@@ -156,158 +68,219 @@ def render_fee_selection_ui(fee_results: List[Dict[str, Any]]) -> List[Dict[str,
     
     return selected_fees
 
+MONITOR_PAGE_SIZES = (50, 100, 200, 500)
+REMOVE_SEARCH_LIMIT = 20
+MONITOR_SORTS = {
+    "紧急程度": ["_order", "到期日期"],
+    "到期日期": ["到期日期", "_order"],
+    "金额": ["_amount", "_order"],
+    "公司名称": ["公司名称", "_order"],
+    "添加时间": ["添加时间", "_order"],
+}
+URGENCY_FILTERS = {"已失效": "invalid", "已逾期": "overdue", "紧急(≤1天)": "critical", "急迫(≤7天)": "urgent",
+                   "注意(≤30天)": "warning", "提醒(≤90天)": "caution", "正常": "normal", "未知": "unknown"}
+
+
+def urgency_frame(due_dates: pd.Series, statuses: pd.Series, today: Optional[datetime] = None) -> pd.DataFrame:
+    """批量计算紧急程度（level/color/text/days_left 四列，与输入同索引）。
+    只对不同的 (到期日, 法律状态) 组合各调用一次 get_urgency_level，再按编码整列映射回去，结果与逐行计算一致。"""
+    today = today or datetime.now()
+    keys = pd.MultiIndex.from_arrays([due_dates.fillna("").astype(str), statuses.fillna("").astype(str)])
+    codes, uniques = keys.factorize()
+    table = pd.DataFrame([get_urgency_level(d, s, today) for d, s in uniques],
+                         columns=["level", "color", "text", "days_left"])
+    out = table.iloc[codes].set_axis(due_dates.index)
+    out["days_left"] = out["days_left"].astype("Int64")
+    return out
+
+
+def monitor_table(monitor) -> pd.DataFrame:
+    """监控列表的表格（含排序/筛选用的辅助列），按监控数据版本与日期缓存在监控实例上，
+    所有会话共用；数据未变化时重新渲染不再逐项计算紧急程度。"""
+    with monitor.lock:
+        monitor.refresh()
+        stamp = (monitor.version, datetime.now().date())
+        cached = monitor.table_cache
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        fees = list(monitor.monitored_fees)
+    raw = pd.DataFrame(fees, columns=["专利名称", "专利号", "公司名称", "费用种类", "缴费期限届满日", "金额",
+                                      "当前法律状态", "添加时间"]).fillna("")
+    urgency = urgency_frame(raw["缴费期限届满日"], raw["当前法律状态"])
+    days = urgency["days_left"]
+    days_text = (days.astype("string") + "天").where(days.fillna(0) >= 0, "逾期" + days.abs().astype("string") + "天")
+    table = pd.DataFrame({
+        "专利名称": raw["专利名称"],
+        "专利号": raw["专利号"],
+        "公司名称": raw["公司名称"],
+        "费用种类": raw["费用种类"],
+        "到期日期": raw["缴费期限届满日"],
+        "金额": "¥" + raw["金额"].astype(str),
+        "剩余天数": days_text.fillna("未知").astype(object),
+        "紧急程度": urgency["text"],
+        "添加时间": raw["添加时间"],
+        "_level": urgency["level"],
+        "_order": urgency["level"].map(URGENCY_ORDER).fillna(7).astype(int),
+        "_color": urgency["color"],
+        "_days": days,
+        "_amount": pd.to_numeric(raw["金额"].astype(str).str.replace(",", ""), errors="coerce"),
+        "_search": (raw["专利号"] + " " + raw["专利名称"] + " " + raw["公司名称"] + " " + raw["费用种类"]).str.lower(),
+    })
+    table = table.sort_values(MONITOR_SORTS["紧急程度"], kind="stable", ignore_index=True)
+    with monitor.lock:
+        monitor.table_cache = (stamp, table)
+    return table
+
+
+def query_monitor_table(table: pd.DataFrame, levels: Optional[List[str]] = None, keyword: str = "",
+                        sort_by: str = "紧急程度", descending: bool = False) -> pd.DataFrame:
+    """按紧急程度与关键词筛选、排序（整列运算，不逐行调用 Python 函数）。"""
+    mask = pd.Series(True, index=table.index)
+    if levels:
+        mask &= table["_level"].isin(levels)
+    if keyword:
+        mask &= table["_search"].str.contains(keyword.strip().lower(), regex=False)
+    view = table[mask] if not mask.all() else table
+    if sort_by != "紧急程度" or descending:
+        view = view.sort_values(MONITOR_SORTS[sort_by], ascending=not descending, kind="stable", na_position="last")
+    return view
+
+
+def _style_monitor_page(page: pd.DataFrame):
+    """只对当前页着色：整行使用紧急程度颜色的浅色背景。"""
+    shown = page[["专利名称", "专利号", "公司名称", "费用种类", "到期日期", "金额", "剩余天数", "紧急程度"]]
+    colors = "background-color: " + page["_color"] + "20"
+    styles = pd.DataFrame({c: colors for c in shown.columns}, index=shown.index)
+    return shown.style.apply(lambda _: styles, axis=None)
+
+
+def _monitor_export_bytes(view: pd.DataFrame) -> bytes:
+    import io
+    export_df = pd.DataFrame({
+        "专利名称": view["专利名称"],
+        "专利号": view["专利号"],
+        "公司名称": view["公司名称"],
+        "费用种类": view["费用种类"],
+        "到期日期": view["到期日期"],
+        "金额": view["金额"].str.removeprefix("¥"),
+        "紧急程度": view["紧急程度"],
+        "剩余天数": view["_days"],
+        "添加时间": view["添加时间"],
+    })
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        export_df.to_excel(writer, index=False, sheet_name="年费监控")
+    return output.getvalue()
+
+
 def render_monitor_management_ui():
-    """渲染年费监控管理界面"""
+    """渲染年费监控管理界面（筛选、排序、分页在整表上完成，只渲染与着色当前页）"""
     st.header("年费监控")
     
-    # 初始化监控器
-    if 'fee_monitor' not in st.session_state:
-        st.session_state.fee_monitor = FeeMonitor()
-    
-    monitor = st.session_state.fee_monitor
+    monitor = session_monitor()
+    table = monitor_table(monitor)
     
-    # 获取监控的年费列表
-    monitored_fees = monitor.get_monitored_fees_with_urgency()
-    
-    if not monitored_fees:
+    if table.empty:
         st.info("暂无监控的年费项目。请先在年费查询页面查询并添加监控项目。")
         return
     
-    st.success(f"当前监控 {len(monitored_fees)} 个年费项目")
+    st.success(f"当前监控 {len(table)} 个年费项目")
     
     # 统计信息
-    col1, col2, col3, col4, col5 = st.columns(5)
-    
-    urgency_counts = {"invalid": 0, "overdue": 0, "critical": 0, "urgent": 0, "warning": 0}
-    for fee in monitored_fees:
-        level = fee['urgency']['level']
-        if level in urgency_counts:
-            urgency_counts[level] += 1
-    
-    with col1:
-        st.metric("已失效", urgency_counts["invalid"], delta=None)
-    with col2:
-        st.metric("已逾期", urgency_counts["overdue"], delta=None)
-    with col3:
-        st.metric("紧急(≤1天)", urgency_counts["critical"], delta=None)
-    with col4:
-        st.metric("急迫(≤7天)", urgency_counts["urgent"], delta=None)
-    with col5:
-        st.metric("注意(≤30天)", urgency_counts["warning"], delta=None)
+    counts = table["_level"].value_counts()
+    cols = st.columns(5)
+    for col, (label, level) in zip(cols, [("已失效", "invalid"), ("已逾期", "overdue"), ("紧急(≤1天)", "critical"),
+                                          ("急迫(≤7天)", "urgent"), ("注意(≤30天)", "warning")]):
+        with col:
+            st.metric(label, int(counts.get(level, 0)), delta=None)
     
     st.write("---")
     
     # 监控列表
     st.subheader("监控列表")
+    c1, c2, c3, c4 = st.columns([3, 3, 2, 1])
+    with c1:
+        levels = st.multiselect("紧急程度", list(URGENCY_FILTERS), key="monitor_levels")
+    with c2:
+        keyword = st.text_input("搜索（专利号/名称/公司/费用种类）", key="monitor_keyword")
+    with c3:
+        sort_by = st.selectbox("排序", list(MONITOR_SORTS), key="monitor_sort")
+    with c4:
+        descending = st.checkbox("倒序", key="monitor_desc")
+    view = query_monitor_table(table, [URGENCY_FILTERS[x] for x in levels], keyword, sort_by, descending)
     
-    # 创建表格数据
-    table_data = []
-    for i, fee in enumerate(monitored_fees):
-        urgency = fee['urgency']
-        days_text = f"{urgency['days_left']}天" if urgency['days_left'] is not None else "未知"
-        if urgency['days_left'] is not None and urgency['days_left'] < 0:
-            days_text = f"逾期{abs(urgency['days_left'])}天"
-        
-        table_data.append({
-            "序号": i + 1,
-            "专利名称": fee.get('专利名称', ''),
-            "专利号": fee.get('专利号', ''),
-            "公司名称": fee.get('公司名称', ''),
-            "费用种类": fee.get('费用种类', ''),
-            "到期日期": fee.get('缴费期限届满日', ''),
-            "金额": f"¥{fee.get('金额', '')}",
-            "剩余天数": days_text,
-            "紧急程度": urgency['text'],
-            "状态颜色": urgency['color']
-        })
+    p1, p2, p3 = st.columns([1, 1, 3])
+    with p1:
+        page_size = st.selectbox("每页", MONITOR_PAGE_SIZES, key="monitor_page_size")
+    pages = max(1, -(-len(view) // page_size))
+    # 筛选条件或数据变化后回到第 1 页，并保证页码不超出范围
+    view_stamp = (monitor.version, tuple(levels), keyword, sort_by, descending, page_size)
+    if st.session_state.get("monitor_view_stamp") != view_stamp or st.session_state.get("monitor_page", 1) > pages:
+        st.session_state.monitor_view_stamp = view_stamp
+        st.session_state.monitor_page = 1
+    with p2:
+        page = st.number_input("页码", min_value=1, max_value=pages, step=1, key="monitor_page")
+    with p3:
+        st.caption(f"筛选后 {len(view)} 项，共 {pages} 页")
+    page_df = view.iloc[(page - 1) * page_size: page * page_size]
+    st.dataframe(_style_monitor_page(page_df), use_container_width=True, hide_index=True)
     
-    if table_data:
-        df_monitor = pd.DataFrame(table_data)
-        
-        # 使用自定义样式显示表格
-        def style_urgency(row):
-            color = row['状态颜色']
-            return [f'background-color: {color}; color: white; font-weight: bold' if col == '紧急程度' 
-                   else '' for col in row.index]
-        
-        # 显示表格
-        styled_df = df_monitor.drop('状态颜色', axis=1).style.apply(
-            lambda row: [f'background-color: {table_data[row.name]["状态颜色"]}20' 
-                        for _ in row.index], axis=1
+    # 删除功能：输入关键词后只列出少量匹配项
+    st.write("---")
+    st.subheader("管理操作")
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        remove_kw = st.text_input("搜索要删除的监控项（专利号/名称/公司）", key="remove_search")
+        matches = query_monitor_table(table, keyword=remove_kw).head(REMOVE_SEARCH_LIMIT) if remove_kw.strip() else table.iloc[:0]
+        to_remove = st.selectbox(
+            "选择要删除的监控项",
+            options=list(zip(matches["专利号"], matches["费用种类"])),
+            format_func=lambda k: f"{k[0]} - {k[1]}",
+            key="remove_select",
         )
-        
-        st.dataframe(styled_df, use_container_width=True, hide_index=True)
-        
-        # 删除功能
-        st.write("---")
-        st.subheader("管理操作")
-        
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            to_remove = st.selectbox(
-                "选择要删除的监控项",
-                options=range(len(monitored_fees)),
-                format_func=lambda x: f"{monitored_fees[x].get('专利号', '')} - {monitored_fees[x].get('费用种类', '')}",
-                key="remove_select"
-            )
-        
-        with col2:
-            if st.button("删除选中项", type="secondary"):
-                if monitor.remove_monitored_fee(to_remove):
-                    st.success("删除成功！")
-                    st.rerun()
-                else:
-                    st.error("删除失败！")
-        
-        # 导出功能
-        st.write("---")
-        st.subheader("导出监控数据")
-        
-        export_df = pd.DataFrame([
-            {
-                "专利名称": fee.get('专利名称', ''),
-                "专利号": fee.get('专利号', ''),
-                "公司名称": fee.get('公司名称', ''),
-                "费用种类": fee.get('费用种类', ''),
-                "到期日期": fee.get('缴费期限届满日', ''),
-                "金额": fee.get('金额', ''),
-                "紧急程度": fee['urgency']['text'],
-                "剩余天数": fee['urgency']['days_left'],
-                "添加时间": fee.get('添加时间', '')
-            }
-            for fee in monitored_fees
-        ])
-        
-        # 导出按钮
-        import io
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            export_df.to_excel(writer, index=False, sheet_name="年费监控")
-        
+    
+    with col2:
+        if st.button("删除选中项", type="secondary", disabled=to_remove is None):
+            if monitor.remove_by_key(*to_remove):
+                st.success("删除成功！")
+                st.rerun()
+            else:
+                st.error("删除失败！")
+    
+    # 导出功能：点击后才生成 Excel
+    st.write("---")
+    st.subheader("导出监控数据")
+    
+    export_stamp = view_stamp[:-1]
+    exported = st.session_state.get("monitor_export")
+    if exported is None or exported[0] != export_stamp:
+        if st.button(f"生成 Excel（筛选后的 {len(view)} 项）", use_container_width=True):
+            exported = st.session_state.monitor_export = (export_stamp, _monitor_export_bytes(view))
+    if exported is not None and exported[0] == export_stamp:
         st.download_button(
             label="导出监控数据为 Excel",
-            data=output.getvalue(),
+            data=exported[1],
             file_name=f"年费监控_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             use_container_width=True
         )
 
-        # 一键删除全部
-        st.write("---")
-        with st.expander("危险操作：批量删除"):
-            st.warning("此操作将删除所有监控项，不可撤销。")
-            col_a, col_b = st.columns([2,1])
-            with col_a:
-                confirm_text = st.text_input("输入 DELETE 以确认删除所有监控项", key="delete_all_confirm")
-            with col_b:
-                if st.button("删除全部", type="secondary"):
-                    if confirm_text.strip() == "DELETE":
-                        monitor.monitored_fees = []
-                        monitor.save_monitored_fees()
+    # 一键删除全部
+    st.write("---")
+    with st.expander("危险操作：批量删除"):
+        st.warning("此操作将删除所有监控项，不可撤销。")
+        col_a, col_b = st.columns([2,1])
+        with col_a:
+            confirm_text = st.text_input("输入 DELETE 以确认删除所有监控项", key="delete_all_confirm")
+        with col_b:
+            if st.button("删除全部", type="secondary"):
+                if confirm_text.strip() == "DELETE":
+                    if monitor.clear():
                         st.success("已删除全部监控项。")
                         st.rerun()
-                    else:
-                        st.error("确认文本不匹配，未执行删除。")
+                else:
+                    st.error("确认文本不匹配，未执行删除。")
 
 def add_fees_to_monitor(fee_results: List[Dict[str, Any]], patent_info: Dict[str, Any] = None):
     """添加年费到监控列表的界面"""
@@ -324,73 +297,61 @@ def add_fees_to_monitor(fee_results: List[Dict[str, Any]], patent_info: Dict[str
                     del st.session_state[k]
             st.rerun()
 
-    # 初始化监控器
-    if 'fee_monitor' not in st.session_state:
-        st.session_state.fee_monitor = FeeMonitor()
-    monitor = st.session_state.fee_monitor
+    for kind, text in st.session_state.pop("monitor_add_notices", []):
+        getattr(st, kind)(text)
 
-    # 初始化已选缓存
+    monitor = session_monitor()
+
+    # 已监控的键只取一次，紧急程度整列计算；整个选择区只有一个表格控件，控件数量与结果条数无关
+    df = pd.DataFrame(list(fee_results), columns=["专利号", "费用种类", "缴费期限届满日", "金额", "当前法律状态"]).fillna("")
+    existing = monitor.monitored_keys()
+    monitored = pd.Series([k in existing for k in zip(df["专利号"], df["费用种类"])], index=df.index, dtype=bool)
+
+    # 初始化已选缓存：默认全选所有可添加项（不包含已在监控里的同专利号+费用种类组合）
     if 'monitor_fee_selected' not in st.session_state:
-        # 默认全选所有可添加项（不包含已在监控里的同专利号+费用种类组合）
-        existing_keys = set()
-        for m in st.session_state.fee_monitor.monitored_fees:
-            existing_keys.add((m.get('专利号'), m.get('费用种类')))
-        preselect = set()
-        for idx, fee in enumerate(fee_results):
-            key = (fee.get('专利号'), fee.get('费用种类'))
-            if key not in existing_keys:
-                preselect.add(idx)
-        st.session_state.monitor_fee_selected = preselect
-
-    st.markdown("<small>为避免每次勾选触发页面刷新，已改为批量选择后统一提交。</small>", unsafe_allow_html=True)
+        st.session_state.monitor_fee_selected = {int(i) for i in df.index[~monitored]}
+    selected = st.session_state.monitor_fee_selected
+    selected.difference_update(int(i) for i in df.index[monitored])
+
+    grid = pd.DataFrame({
+        "添加": df.index.isin(list(selected)),
+        "费用种类": df["费用种类"],
+        "专利号": df["专利号"],
+        "缴费期限届满日": df["缴费期限届满日"],
+        "金额": "¥" + df["金额"].astype(str),
+        "紧急程度": urgency_frame(df["缴费期限届满日"], df["当前法律状态"])["text"],
+        "已监控": monitored,
+    })
+    st.markdown(f"<small>共 {len(grid)} 项，其中 {int(monitored.sum())} 项已在监控中；勾选后统一提交，已监控的项会被忽略。</small>",
+                unsafe_allow_html=True)
 
     with st.form("monitor_add_form"):
-        selected_indices = []
-        # 构建当前已存在监控键集合
-        existing_keys_live = set((m.get('专利号'), m.get('费用种类')) for m in monitor.monitored_fees)
-
-        for i, fee in enumerate(fee_results):
-            cols = st.columns([0.6, 3, 2, 2, 1.6])
-            # 复选框状态：来源于 session 缓存
-            key = (fee.get('专利号'), fee.get('费用种类'))
-            already_monitored = key in existing_keys_live
-            default_checked = (i in st.session_state.monitor_fee_selected) and (not already_monitored)
-            with cols[0]:
-                if already_monitored:
-                    st.checkbox("", key=f"monitor_fee_{i}", value=False, disabled=True)
-                    # 保证不在选择集合
-                    if i in st.session_state.monitor_fee_selected:
-                        st.session_state.monitor_fee_selected.remove(i)
-                    checked = False
-                else:
-                    checked = st.checkbox("", key=f"monitor_fee_{i}", value=default_checked)
-            if checked:
-                st.session_state.monitor_fee_selected.add(i)
-            else:
-                if i in st.session_state.monitor_fee_selected:
-                    st.session_state.monitor_fee_selected.remove(i)
-            with cols[1]:
-                st.write(fee.get('费用种类',''))
-            with cols[2]:
-                st.write(fee.get('缴费期限届满日',''))
-            with cols[3]:
-                st.write(f"¥{fee.get('金额','')}")
-            with cols[4]:
-                urgency = monitor.get_urgency_level(
-                    fee.get('缴费期限届满日',''),
-                    fee.get('当前法律状态','')
-                )
-                st.markdown(f'<span style="color:{urgency["color"]};font-weight:bold">{urgency["text"]}</span>', unsafe_allow_html=True)
-
-        submit = st.form_submit_button("添加选中项到监控", type="primary")
+        edited = st.data_editor(
+            grid, hide_index=True, use_container_width=True,
+            disabled=[c for c in grid.columns if c != "添加"],
+            column_config={"添加": st.column_config.CheckboxColumn("添加", default=False)},
+            key=f"monitor_add_editor_{st.session_state.get('monitor_add_rev', 0)}",
+        )
+        c1, c2, c3 = st.columns([2, 1, 1])
+        with c1:
+            submit = st.form_submit_button("添加选中项到监控", type="primary")
+        with c2:
+            select_all = st.form_submit_button("全选未监控")
+        with c3:
+            select_none = st.form_submit_button("全不选")
+
+    if select_all or select_none:
+        st.session_state.monitor_fee_selected = {int(i) for i in df.index[~monitored]} if select_all else set()
+        st.session_state.monitor_add_rev = st.session_state.get('monitor_add_rev', 0) + 1
+        st.rerun()
 
     if submit:
-        chosen = sorted(list(st.session_state.monitor_fee_selected))
+        chosen = [int(i) for i in edited.index[edited["添加"] & ~monitored]]
+        st.session_state.monitor_fee_selected = {int(i) for i in edited.index[edited["添加"]]}
         if not chosen:
-            st.warning("请至少选择一个年费项。")
+            st.warning("请至少选择一个尚未监控的年费项。")
             return
-        added_count = 0
-        duplicate_count = 0
+        fees = []
         for idx in chosen:
             fee = fee_results[idx].copy()
             if patent_info:
@@ -398,15 +359,16 @@ def add_fees_to_monitor(fee_results: List[Dict[str, Any]], patent_info: Dict[str
                     '专利名称': patent_info.get('专利名称', fee.get('专利名称', '')),
                     '公司名称': patent_info.get('公司名称', fee.get('公司名称', '')),
                 })
-            if monitor.add_monitored_fee(fee):
-                added_count += 1
-            else:
-                duplicate_count += 1
+            fees.append(fee)
+        added_count, duplicate_count = monitor.add_monitored_fees(fees)
+        notices = []
         if added_count:
-            st.success(f"成功添加 {added_count} 个年费项到监控！")
+            notices.append(("success", f"成功添加 {added_count} 个年费项到监控！"))
         if duplicate_count:
-            st.info(f"有 {duplicate_count} 个年费项已存在或被忽略。")
-        # 将已成功添加的索引从已选集合中移除，保留未添加的
-        for idx in chosen:
-            if idx in st.session_state.monitor_fee_selected:
-                st.session_state.monitor_fee_selected.remove(idx)
\ No newline at end of file
+            notices.append(("info", f"有 {duplicate_count} 个年费项已存在或被忽略。"))
+        # 将已提交的索引从已选集合中移除，保留未提交的
+        st.session_state.monitor_fee_selected.difference_update(chosen)
+        st.session_state.monitor_add_rev = st.session_state.get('monitor_add_rev', 0) + 1
+        # 重跑一次，让上方表格的“已监控”列与勾选状态反映本次添加；提示信息跨重跑保留
+        st.session_state.monitor_add_notices = notices
+        st.rerun()
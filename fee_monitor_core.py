@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+年费监控核心模块（纯 Python）
+提供监控数据的存储与紧急程度计算，不依赖 Streamlit / pandas，
+可在命令行批处理、测试与后台任务中直接使用。界面部分见 fee_monitor.py。
+
+多进程安全（多个 Streamlit 工作进程、cron 批处理同时写入）：
+  - 每次修改在进程间文件锁（<数据文件>.lock，POSIX 用 fcntl.flock，Windows 用 msvcrt.locking）内进行，
+    先按需重新加载磁盘上的最新数据，再应用修改并写回，不会覆盖其他进程的写入；
+  - 写入先写临时文件再 os.replace 原子替换，读取方不会读到写了一半的文件；
+  - 读取前只 stat 一次数据文件（inode、修改时间、大小），变化了才重新加载，其他进程的修改随即可见；
+  - save_monitored_fees() 整体写回时做乐观并发检查：加载之后文件已被其他进程修改则不写入并重新加载。
+"""
+
+import json
+import os
+import stat
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from file_lock import exclusive_file_lock
+from timing import span
+
+# 监控数据存储文件
+MONITOR_DATA_FILE = "fee_monitor_data.json"
+
+# 紧急程度排序（数值越小越靠前）
+URGENCY_ORDER = {"invalid": 0, "overdue": 1, "critical": 2, "urgent": 3, "warning": 4, "caution": 5, "normal": 6, "unknown": 7}
+
+
+def _print_error(msg: str):
+    print(f"[FeeMonitor] {msg}", file=sys.stderr)
+
+
+def _fee_key(fee: Dict[str, Any]) -> Tuple[Any, Any]:
+    return fee.get('专利号'), fee.get('费用种类')
+
+
+class FeeMonitor:
+    """年费监控管理类
+
+    on_error: 加载/保存失败时的回调，默认输出到 stderr；界面层可传入 st.error。
+    实例可在线程间共享（界面中所有会话共用一个实例）：读写 monitored_fees 均在 self.lock 内进行；
+    进程之间通过文件锁与重新加载保持一致（见模块说明）。version 在每次重新加载或写入后递增，可用作缓存键。
+    """
+
+    def __init__(self, data_file: Optional[str] = None, on_error: Optional[Callable[[str], Any]] = None):
+        self.data_file = data_file or MONITOR_DATA_FILE
+        self.on_error = on_error or _print_error
+        self.lock = threading.RLock()
+        self.version = 0
+        self._stamp = None
+        self._locked = False
+        # 界面层按 (version, 日期) 缓存的派生表格（fee_monitor.monitor_table），在 lock 内读写
+        self.table_cache: Optional[Tuple[Any, Any]] = None
+        self.monitored_fees = self.load_monitored_fees()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.data_file)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def load_monitored_fees(self) -> List[Dict[str, Any]]:
+        """从文件加载监控的年费数据"""
+        with self.lock:
+            self._stamp = self._file_stamp()
+            self.version += 1
+            if self._stamp is not None:
+                try:
+                    with open(self.data_file, 'r', encoding='utf-8') as f:
+                        return json.load(f)
+                except Exception as e:
+                    self.on_error(f"加载监控数据失败: {e}")
+                    return []
+            return []
+
+    def refresh(self) -> bool:
+        """数据文件被其他进程修改过则重新加载，返回是否重新加载；未变化时只有一次 stat。"""
+        with self.lock:
+            if self._file_stamp() == self._stamp:
+                return False
+            self.monitored_fees = self.load_monitored_fees()
+            return True
+
+    @contextmanager
+    def _file_lock(self):
+        """线程锁 + 进程间文件锁；同一线程内可重入。"""
+        with self.lock:
+            if self._locked:
+                yield
+                return
+            with exclusive_file_lock(self.data_file + '.lock'):
+                self._locked = True
+                try:
+                    yield
+                finally:
+                    self._locked = False
+
+    @contextmanager
+    def _transaction(self):
+        """在锁内先同步磁盘上的最新数据，由调用方通过 _replace() 写回新列表。"""
+        with self._file_lock():
+            self.refresh()
+            yield
+
+    def _write(self) -> bool:
+        directory = os.path.dirname(os.path.abspath(self.data_file))
+        try:
+            with span("monitor.save"):
+                fd, tmp = tempfile.mkstemp(prefix='.fee_monitor_', suffix='.tmp', dir=directory)
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(self.monitored_fees, f, ensure_ascii=False, indent=2)
+                    # mkstemp 创建的文件为 0600：沿用原文件权限，新文件用 0644
+                    try:
+                        mode = stat.S_IMODE(os.stat(self.data_file).st_mode)
+                    except FileNotFoundError:
+                        mode = 0o644
+                    os.chmod(tmp, mode)
+                    os.replace(tmp, self.data_file)
+                except BaseException:
+                    if os.path.exists(tmp):
+                        os.unlink(tmp)
+                    raise
+        except Exception as e:
+            self.on_error(f"保存监控数据失败: {e}")
+            return False
+        self._stamp = self._file_stamp()
+        self.version += 1
+        return True
+
+    def _replace(self, fees: List[Dict[str, Any]]) -> bool:
+        """以 fees 作为新的监控列表写回；写入失败时恢复原列表，内存不留下未落盘的修改。"""
+        previous = self.monitored_fees
+        self.monitored_fees = fees
+        if self._write():
+            return True
+        self.monitored_fees = previous
+        return False
+
+    def save_monitored_fees(self) -> bool:
+        """保存监控的年费数据到文件。
+        乐观并发：上次加载后文件已被其他进程修改时不覆盖，改为重新加载并返回 False（调用方可在最新数据上重做修改）。"""
+        with self._file_lock():
+            if self._file_stamp() != self._stamp:
+                self.on_error("监控数据已被其他会话或进程修改，已重新加载，请重试本次操作")
+                self.monitored_fees = self.load_monitored_fees()
+                return False
+            return self._write()
+
+    def add_monitored_fee(self, fee_data: Dict[str, Any]) -> bool:
+        """添加年费监控项"""
+        with self._transaction():
+            # 检查是否已存在相同的监控项
+            key = _fee_key(fee_data)
+            if any(_fee_key(existing) == key for existing in self.monitored_fees):
+                return False  # 已存在
+
+            # 添加监控时间戳
+            fee_data['添加时间'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            return self._replace(self.monitored_fees + [fee_data])
+
+    def add_monitored_fees(self, fees: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """批量添加年费监控项（一次加锁、一次写入），返回 (新增数, 已存在或重复数)；保存失败时新增数为 0"""
+        with self._transaction():
+            keys = {_fee_key(m) for m in self.monitored_fees}
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            new = []
+            for fee_data in fees:
+                key = _fee_key(fee_data)
+                if key in keys:
+                    continue
+                keys.add(key)
+                fee_data['添加时间'] = now
+                new.append(fee_data)
+            skipped = len(fees) - len(new)
+            if new and not self._replace(self.monitored_fees + new):
+                return 0, skipped
+            return len(new), skipped
+
+    def remove_monitored_fee(self, index: int) -> bool:
+        """按 monitored_fees 中的位置移除年费监控项（位置随其他进程的修改而变，界面请用 remove_by_key）"""
+        with self.lock:
+            if not 0 <= index < len(self.monitored_fees):
+                return False
+            key = _fee_key(self.monitored_fees[index])
+        return self.remove_by_key(*key)
+
+    def remove_by_key(self, patent_no: str, fee_type: str) -> bool:
+        """按 (专利号, 费用种类) 移除年费监控项；已被其他会话删除时返回 False"""
+        with self._transaction():
+            kept = [f for f in self.monitored_fees if _fee_key(f) != (patent_no, fee_type)]
+            if len(kept) == len(self.monitored_fees):
+                return False
+            return self._replace(kept)
+
+    def clear(self) -> bool:
+        """删除全部监控项，返回是否保存成功"""
+        with self._transaction():
+            return self._replace([])
+
+    def monitored_keys(self) -> set:
+        """已监控的 (专利号, 费用种类) 集合"""
+        with self.lock:
+            self.refresh()
+            return {_fee_key(m) for m in self.monitored_fees}
+
+    def get_urgency_level(self, due_date_str: str, legal_status: str = "") -> Dict[str, Any]:
+        """根据到期日期和法律状态计算紧急程度"""
+        return get_urgency_level(due_date_str, legal_status)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """当前监控项列表的副本（先按需重新加载）"""
+        with self.lock:
+            self.refresh()
+            return list(self.monitored_fees)
+
+    def get_monitored_fees_with_urgency(self) -> List[Dict[str, Any]]:
+        """获取带紧急程度标记的监控年费列表"""
+        result = []
+        with self.lock:
+            self.refresh()
+            fees = list(self.monitored_fees)
+        for fee in fees:
+            fee_copy = fee.copy()
+            urgency = self.get_urgency_level(
+                fee.get('缴费期限届满日', ''),
+                fee.get('当前法律状态', '')
+            )
+            fee_copy['urgency'] = urgency
+            result.append(fee_copy)
+
+        # 按紧急程度和到期日期排序
+        result.sort(key=lambda x: (
+            URGENCY_ORDER.get(x['urgency']['level'], 7),
+            x.get('缴费期限届满日', '9999-12-31')
+        ))
+
+        return result
+
+
+def get_urgency_level(due_date_str: str, legal_status: str = "", today: Optional[datetime] = None) -> Dict[str, Any]:
+    """根据到期日期和法律状态计算紧急程度"""
+    # 先基于法律状态的快速判定
+    if legal_status:
+        # “无权” 保持灰色（失效，不再需要缴费）
+        if "无权" in legal_status:
+            return {"level": "invalid", "color": "#808080", "text": "已失效", "days_left": None}
+        # “已失效” 视为需关注的已逾期（使用深红色，与到期逾期一致）
+        if "已失效" in legal_status:
+            return {"level": "overdue", "color": "#8B0000", "text": "已逾期", "days_left": None}
+
+    if not due_date_str:
+        return {"level": "unknown", "color": "#808080", "text": "未知", "days_left": None}
+
+    try:
+        due_date = datetime.strptime(due_date_str, '%Y-%m-%d')
+        today = today or datetime.now()
+        days_left = (due_date - today).days
+
+        if days_left < 0:
+            return {"level": "overdue", "color": "#8B0000", "text": "已逾期", "days_left": days_left}
+        elif days_left <= 1:
+            return {"level": "critical", "color": "#DC143C", "text": "紧急", "days_left": days_left}
+        elif days_left <= 7:
+            return {"level": "urgent", "color": "#FF4500", "text": "急迫", "days_left": days_left}
+        elif days_left <= 30:
+            return {"level": "warning", "color": "#FF8C00", "text": "注意", "days_left": days_left}
+        elif days_left <= 90:
+            return {"level": "caution", "color": "#FFD700", "text": "提醒", "days_left": days_left}
+        else:
+            return {"level": "normal", "color": "#32CD32", "text": "正常", "days_left": days_left}
+
+    except ValueError:
+        return {"level": "unknown", "color": "#808080", "text": "日期格式错误", "days_left": None}
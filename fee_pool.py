@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+多进程年费查询（每个工作进程独占一个浏览器与上下文，跨任务复用）
+单个进程内 Playwright 受限于一个事件循环，_extract_fee_rows 的解析又受 GIL 限制；
+大批量时把申请号分发到多个进程，结果仍按完成顺序回到调用方（配合 fee_batch.run_fee_batch 的 executor 参数）。
+
+  - 进程数 = CPU 核数 × workers_per_core（环境变量 CNIPA_WORKERS_PER_CORE，默认 0.5）
+  - 每个进程（含其浏览器子进程）的常驻内存超过 max_rss_mb（CNIPA_WORKER_MAX_RSS_MB，默认 1500）时，
+    在任务之间重启该进程的浏览器；max_tasks_per_child 可再按任务数整体回收进程。
+
+用法：
+    with make_fee_pool(storage_state, backend="browser") as pool:
+        outcome = run_fee_batch(patents, pooled_query, executor=pool, workers=pool.workers)
+其中 pooled_query 必须是模块级函数（spawn 方式需可 pickle），在工作进程中调用 worker_query(app_no)。
+"""
+
+import asyncio
+import atexit
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+WORKERS_PER_CORE = float(os.getenv("CNIPA_WORKERS_PER_CORE", "0.5"))
+MAX_RSS_MB = float(os.getenv("CNIPA_WORKER_MAX_RSS_MB", "1500"))
+
+# 同一进程内多个 BrowserWorker（batch_cli 线程模式）依次启动 Playwright，以便认出各自新增的驱动进程
+_start_lock = threading.Lock()
+
+
+def default_workers(workers_per_core: Optional[float] = None) -> int:
+    wpc = WORKERS_PER_CORE if workers_per_core is None else workers_per_core
+    return max(1, int(round((os.cpu_count() or 1) * wpc)))
+
+
+def _children_map() -> Dict[int, List[int]]:
+    """{父进程号: [子进程号]}；仅 Linux 可用，其他平台返回空字典。"""
+    proc = Path("/proc")
+    children: Dict[int, List[int]] = {}
+    if not proc.exists():
+        return children
+    for d in proc.iterdir():
+        if not d.name.isdigit():
+            continue
+        try:
+            # /proc/<pid>/stat 第 2 列 comm 可能含空格，取最后一个 ')' 之后的字段
+            fields = (d / "stat").read_text().rsplit(")", 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(d.name))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def child_pids(pid: Optional[int] = None) -> Set[int]:
+    """直接子进程号集合。"""
+    return set(_children_map().get(pid or os.getpid(), []))
+
+
+def process_tree_rss_mb(pid: Optional[int] = None) -> float:
+    """进程及其全部子孙进程（浏览器）的常驻内存，单位 MB；仅 Linux 可用，其他平台返回 0（不做限制）。"""
+    pid = pid or os.getpid()
+    proc = Path("/proc")
+    if not proc.exists():
+        return 0.0
+    children = _children_map()
+    page_kb = os.sysconf("SC_PAGE_SIZE") / 1024
+    total_kb, stack = 0.0, [pid]
+    while stack:
+        p = stack.pop()
+        try:
+            total_kb += int((proc / str(p) / "statm").read_text().split()[1]) * page_kb
+        except (OSError, IndexError, ValueError):
+            pass
+        stack.extend(children.get(p, []))
+    return total_kb / 1024
+
+
+class BrowserWorker:
+    """
+    常驻浏览器：首个任务时启动，之后所有任务共用同一上下文与查询页面（CnipaFeeSession）。
+    自带事件循环，同一时刻只能在一个线程中使用（进程池的每个进程一个，batch_cli 单账号线程模式每个线程一个，
+    多账号时由 AccountRegistry 按账号池化、随并发名额借出）。
+    内存上限只按本实例启动的 Playwright 驱动进程及其浏览器子进程计算，同进程内其他线程的浏览器不计入。
+    """
+
+    def __init__(self, storage_state: Optional[dict], headful: bool, max_rss_mb: float):
+        self.storage_state = storage_state
+        self.headful = headful
+        self.max_rss_mb = max_rss_mb
+        self.loop = asyncio.new_event_loop()
+        self._pw = self._browser = self._ctx = self._session = None
+        self._own_pids: Set[int] = set()
+        self.restarts = 0
+
+    async def _ensure(self):
+        if self._ctx is not None:
+            return
+        from playwright.async_api import async_playwright
+        from cnipa_fee_query import _new_browser_context
+        with _start_lock:
+            before = child_pids()
+            self._pw = await async_playwright().start()
+            self._own_pids = child_pids() - before
+        self._browser, self._ctx, self._stats = await _new_browser_context(self._pw, self.headful, self.storage_state)
+
+    async def _query(self, app_no: str) -> List[Dict]:
+        from cnipa_fee_query import CnipaFeeSession, _add_block_totals
+        await self._ensure()
+        if self._session is None:
+            # 页面停留在查询表单上，后续专利只需提交一次
+            self._session = CnipaFeeSession(self._ctx)
+        try:
+            return await self._session.query(app_no)
+        finally:
+            # 上下文跨任务复用：按次计入累计统计后清零
+            _add_block_totals(self._stats)
+            self._stats.requests = self._stats.blocked = self._stats.loaded_bytes = 0
+            self._stats.blocked_by_type.clear()
+
+    async def _shutdown(self):
+        if self._session is not None:
+            await self._session.close()
+        if self._browser is not None:
+            await self._browser.close()
+        if self._pw is not None:
+            await self._pw.stop()
+        self._pw = self._browser = self._ctx = self._session = None
+        self._own_pids = set()
+
+    def rss_mb(self) -> float:
+        """本实例浏览器（驱动进程树）的常驻内存；认不出驱动进程时退回整个进程树。"""
+        if self._own_pids:
+            return sum(process_tree_rss_mb(p) for p in self._own_pids)
+        return process_tree_rss_mb()
+
+    def query(self, app_no: str) -> List[Dict]:
+        try:
+            return self.loop.run_until_complete(self._query(app_no))
+        finally:
+            if self.max_rss_mb and self.rss_mb() > self.max_rss_mb:
+                self.loop.run_until_complete(self._shutdown())
+                self.restarts += 1
+
+    def close(self):
+        try:
+            self.loop.run_until_complete(self._shutdown())
+        finally:
+            self.loop.close()
+
+
+_backend = "browser"
+_state: Optional[dict] = None
+_browser_worker: Optional[BrowserWorker] = None
+
+
+def _init_worker(storage_state: Optional[dict], backend: str, headful: bool, max_rss_mb: float,
+                 cwd: str, env: Dict[str, str]):
+    global _backend, _state, _browser_worker
+    # spawn 出来的进程需要与父进程相同的工作目录、模块路径与 CNIPA_* 配置
+    os.chdir(cwd)
+    here = str(Path(__file__).resolve().parent)
+    if here not in sys.path:
+        sys.path.insert(0, here)
+    os.environ.update(env)
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+    _backend, _state = backend, storage_state
+    if backend == "browser":
+        _browser_worker = BrowserWorker(storage_state, headful, max_rss_mb)
+        atexit.register(_browser_worker.close)
+
+
+def worker_query(app_no: str) -> List[Dict]:
+    """在工作进程中查询一个申请号，返回 [{'费用种类':..., '缴费期限届满日':..., '金额':...}]。"""
+    if _backend == "http":
+        from cnipa_http_client import query_due_fees_http
+        return query_due_fees_http(app_no, storage_state=_state)
+    if _browser_worker is None:
+        raise RuntimeError("worker_query 只能在 make_fee_pool 创建的进程池中调用")
+    return _browser_worker.query(app_no)
+
+
+class FeePool(ProcessPoolExecutor):
+    """查询进程池；workers 为创建时确定的工作进程数，作为 run_fee_batch 的在途任务上限。"""
+
+    def __init__(self, workers: int, **kwargs):
+        super().__init__(max_workers=workers, **kwargs)
+        self.workers = workers
+
+
+def make_fee_pool(storage_state: Optional[dict] = None, backend: str = "browser", *,
+                  workers: Optional[int] = None, workers_per_core: Optional[float] = None,
+                  max_rss_mb: Optional[float] = None, max_tasks_per_child: Optional[int] = None,
+                  headful: bool = False) -> FeePool:
+    """创建查询进程池（spawn 方式，避免 fork 带入父进程的线程与事件循环）。"""
+    if storage_state is None:
+        from cnipa_http_client import load_storage_state
+        storage_state = load_storage_state()
+    env = {k: v for k, v in os.environ.items() if k.startswith(("CNIPA_", "PATENT_FEE_"))}
+    return FeePool(
+        workers or default_workers(workers_per_core),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(storage_state, backend, headful, MAX_RSS_MB if max_rss_mb is None else max_rss_mb,
+                  os.getcwd(), env),
+        max_tasks_per_child=max_tasks_per_child,
+    )
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+年费日历预测（整个专利组合的全部未来年费）
+年费监控只知道 CNIPA 当前列出的应缴费（通常每件专利一两年），预算需要直到保护期届满的完整年费计划。
+这里按每件专利的“专利类型”“申请时间”与当前所处年度，依 CNIPA 年费标准推算全部未来年费：
+  - 第 N 年年费的缴费期限为申请日起满 N-1 年的对应日（与 CNIPA 列出的“缴费期限届满日”一致）；
+  - 保护期：发明 20 年，实用新型 10 年，外观设计 15 年（2021-06-01 前申请的为 10 年）；
+  - 当前年度：已知的应缴费（年费查询结果 / 监控项的“费用种类”，如“实用新型专利第4年年费”）中最早的年度，
+    否则为申请日之后下一个未到的周年对应的年度；
+  - 缴纳比例：已知应缴费的专利按实际金额 / 标准金额推算（费减），其余用 pay_ratio（FEE_PAY_RATIO，默认 1 即全额）；
+  - 当前法律状态含“无权/失效/无效”的专利不再预测。
+全部计算按列完成（numpy），十万件专利的展开与按年份 / 公司汇总在毫秒到百毫秒级。
+
+对外函数：
+  - project_fees(patents, fees=None, ...) -> DataFrame   每行一笔未来年费
+  - rollup_by_year(projection) / rollup_by_company_year(projection)
+  - annual_fee(专利类型, 年度) / parse_fee_kind(费用种类)
+"""
+
+import os
+import re
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+PAY_RATIO = float(os.getenv("FEE_PAY_RATIO", "1"))
+
+# CNIPA 年费标准（元）：(截至第几年, 金额)
+ANNUITY_TABLE = {
+    "发明": [(3, 900), (6, 1200), (9, 2000), (12, 4000), (15, 6000), (20, 8000)],
+    "实用新型": [(3, 600), (5, 900), (8, 1200), (10, 2000)],
+    "外观设计": [(3, 600), (5, 900), (8, 1200), (10, 2000), (15, 3000)],
+}
+PATENT_TYPES = tuple(ANNUITY_TABLE)
+MAX_YEAR = 20
+DESIGN_TERM_CHANGE = date(2021, 6, 1)  # 此后申请的外观设计保护期 15 年
+INVALID_STATUS = "无权|失效|无效"
+
+FEE_KIND_RE = re.compile(r"(发明|实用新型|外观设计)专利第(\d+)年年费$")
+
+Record = Dict[str, Any]
+
+
+def annual_fee(ptype: str, year: int) -> Optional[int]:
+    """标准年费金额；超出保护期或类型未知时返回 None。"""
+    for upto, amount in ANNUITY_TABLE.get(ptype, []):
+        if year <= upto:
+            return amount
+    return None
+
+
+def parse_fee_kind(kind: Any) -> Optional[Tuple[str, int]]:
+    """“实用新型专利第4年年费” -> ("实用新型", 4)；滞纳金等其他费用返回 None。"""
+    m = FEE_KIND_RE.search(str(kind or "").strip())
+    return (m.group(1), int(m.group(2))) if m else None
+
+
+def fee_kind(ptype: str, year: int) -> str:
+    return f"{ptype}专利第{year}年年费"
+
+
+def _fee_grid():
+    import numpy as np
+
+    grid = np.zeros((len(PATENT_TYPES), MAX_YEAR + 1))
+    for t, ptype in enumerate(PATENT_TYPES):
+        for n in range(1, MAX_YEAR + 1):
+            grid[t, n] = annual_fee(ptype, n) or 0
+    return grid
+
+
+def known_annuities(fees: Iterable[Record]) -> Dict[str, Tuple[int, Optional[float]]]:
+    """从应缴费记录得到 {专利号: (最早的应缴年度, 缴纳比例)}；比例取该年度实际金额 / 标准金额。"""
+    out: Dict[str, Tuple[int, Optional[float]]] = {}
+    for fee in fees:
+        parsed = parse_fee_kind(fee.get("费用种类"))
+        key = fee.get("专利号")
+        if not parsed or not key:
+            continue
+        ptype, year = parsed
+        if key in out and out[key][0] <= year:
+            continue
+        ratio = None
+        try:
+            standard = annual_fee(ptype, year)
+            if standard:
+                ratio = float(str(fee.get("金额", "")).replace(",", "").replace("¥", "")) / standard
+        except ValueError:
+            pass
+        out[key] = (year, ratio)
+    return out
+
+
+def project_fees(patents: "pd.DataFrame", fees: Optional[Iterable[Record]] = None, *, today: Optional[date] = None,
+                 until: Optional[date] = None, pay_ratio: Optional[float] = None,
+                 include_invalid: bool = False) -> "pd.DataFrame":
+    """
+    patents 为检索结果（REQUIRED_COLUMNS 结构）；fees 为已知应缴费（年费查询结果 / 监控项），用于确定当前年度与费减比例。
+    返回列：专利号、公司名称、专利类型（均为 category）、年度、费用种类（category）、缴费期限届满日（datetime64）、金额。
+    包含缴费期限不早于 today（默认今天）、不晚于 until（默认保护期届满）的年费；
+    已知应缴费中更早的年度（如已过期限、仍可缴纳的年费）从该年度起一并列出。
+    """
+    import numpy as np
+    import pandas as pd
+
+    today = today or date.today()
+    pay_ratio = PAY_RATIO if pay_ratio is None else pay_ratio
+
+    df = patents[["专利号", "公司名称", "专利类型", "申请时间", "当前法律状态"]].drop_duplicates("专利号")
+    filed = pd.to_datetime(df["申请时间"], format="%Y-%m-%d", errors="coerce")
+    ptype = pd.Categorical(df["专利类型"], categories=PATENT_TYPES)
+    keep = filed.notna().to_numpy() & (ptype.codes >= 0)
+    if not include_invalid:
+        keep &= ~df["当前法律状态"].fillna("").astype(str).str.contains(INVALID_STATUS).to_numpy()
+    df, filed, tcode = df[keep], filed[keep], ptype.codes[keep].astype(np.int64)
+
+    y = filed.dt.year.to_numpy(np.int64)
+    m = filed.dt.month.to_numpy(np.int64)
+    d = filed.dt.day.to_numpy(np.int64)
+
+    def anniversaries_before(day: date, inclusive: bool) -> "np.ndarray":
+        """申请日之后、day 之前（inclusive 时含当天）已经过的周年数。"""
+        later = (m > day.month) | ((m == day.month) & ((d > day.day) if inclusive else (d >= day.day)))
+        return day.year - y - later
+
+    # 今天之前已过 k 个周年，下一个（含今天）为第 k+1 个周年，对应第 k+2 年年费
+    start = anniversaries_before(today, inclusive=False) + 2
+    ratio = np.full(len(df), pay_ratio, dtype=float)
+    if fees is not None:
+        known = known_annuities(fees)
+        if known:
+            keys = df["专利号"].to_numpy()
+            for i in np.flatnonzero(pd.Index(keys).isin(list(known))):
+                year, r = known[keys[i]]
+                start[i] = min(start[i], year)
+                if r is not None:
+                    ratio[i] = r
+    start = np.maximum(start, 1)
+
+    design_old = (tcode == PATENT_TYPES.index("外观设计")) & (filed < pd.Timestamp(DESIGN_TERM_CHANGE)).to_numpy()
+    term = np.array([MAX_YEAR if t == "发明" else max(n for n, _ in ANNUITY_TABLE[t]) for t in PATENT_TYPES])[tcode]
+    term = np.where(design_old, 10, term)
+    last = term if until is None else np.minimum(term, anniversaries_before(until, inclusive=True) + 1)
+
+    counts = np.clip(last - start + 1, 0, None)
+    idx = np.repeat(np.arange(len(df)), counts)
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    year = start[idx] + (np.arange(idx.size) - offsets)
+
+    # 缴费期限：申请日 + (年度 - 1) 年；2 月 29 日申请的在平年取 2 月 28 日
+    due_year = y[idx] + year - 1
+    months = ((due_year - 1970) * 12 + m[idx] - 1).astype("datetime64[M]")
+    month_len = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64)
+    due = months.astype("datetime64[D]") + (np.minimum(d[idx], month_len) - 1)
+
+    grid = _fee_grid()
+    kinds = [fee_kind(t, n) for t in PATENT_TYPES for n in range(MAX_YEAR + 1)]
+    out = pd.DataFrame({
+        "专利号": pd.Categorical.from_codes(idx, categories=pd.Index(df["专利号"].to_numpy())),
+        "公司名称": pd.Categorical(df["公司名称"].fillna("").to_numpy())[idx],
+        "专利类型": pd.Categorical.from_codes(tcode[idx], categories=PATENT_TYPES),
+        "年度": year,
+        "费用种类": pd.Categorical.from_codes(tcode[idx] * (MAX_YEAR + 1) + year, categories=kinds),
+        "缴费期限届满日": due.astype("datetime64[ns]"),
+        "金额": np.round(grid[tcode[idx], year] * ratio[idx], 2),
+    })
+    return out
+
+
+def rollup_by_year(projection: "pd.DataFrame") -> "pd.DataFrame":
+    """按缴费期限所在年份汇总：年份、笔数、金额。"""
+    import numpy as np
+    import pandas as pd
+
+    if projection.empty:
+        return pd.DataFrame({"年份": pd.Series(dtype=int), "笔数": pd.Series(dtype=int), "金额": pd.Series(dtype=float)})
+    years = projection["缴费期限届满日"].to_numpy().astype("datetime64[Y]").astype(np.int64) + 1970
+    base = years.min()
+    counts = np.bincount(years - base)
+    amounts = np.bincount(years - base, weights=projection["金额"].to_numpy())
+    nz = np.flatnonzero(counts)
+    return pd.DataFrame({"年份": nz + base, "笔数": counts[nz], "金额": np.round(amounts[nz], 2)})
+
+
+def rollup_by_company_year(projection: "pd.DataFrame") -> "pd.DataFrame":
+    """按公司 × 缴费年份汇总：公司名称、年份、笔数、金额（按公司、年份排序）。"""
+    import numpy as np
+    import pandas as pd
+
+    if projection.empty:
+        return pd.DataFrame({"公司名称": pd.Series(dtype=object), "年份": pd.Series(dtype=int),
+                             "笔数": pd.Series(dtype=int), "金额": pd.Series(dtype=float)})
+    company = projection["公司名称"].astype("category").cat
+    years = projection["缴费期限届满日"].to_numpy().astype("datetime64[Y]").astype(np.int64) + 1970
+    base, span_ = years.min(), years.max() - years.min() + 1
+    keys = company.codes.astype(np.int64) * span_ + (years - base)
+    counts = np.bincount(keys, minlength=len(company.categories) * span_)
+    amounts = np.bincount(keys, weights=projection["金额"].to_numpy(), minlength=counts.size)
+    nz = np.flatnonzero(counts)
+    out = pd.DataFrame({
+        "公司名称": np.asarray(company.categories, dtype=object)[nz // span_],
+        "年份": nz % span_ + base,
+        "笔数": counts[nz],
+        "金额": np.round(amounts[nz], 2),
+    })
+    return out.sort_values(["公司名称", "年份"], ignore_index=True)
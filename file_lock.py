@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+进程间文件锁（纯 Python，不依赖第三方库）
+POSIX 用 fcntl.flock，Windows 用 msvcrt.locking；锁文件只用于加锁，内容为空。
+年费监控数据、本地数据集分区与年费查询断点文件的读-改-写都在排他锁内进行；
+数据集的读取持共享锁，与分区合并互斥、读取之间互不阻塞（Windows 无共享锁，退化为排他锁）。
+"""
+
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def exclusive_file_lock(path: str):
+    """进程间排他锁（阻塞等待）。"""
+    with _file_lock(path, shared=False):
+        yield
+
+
+@contextmanager
+def shared_file_lock(path: str):
+    """进程间共享锁（阻塞等待）：多个持有者可同时持有，与 exclusive_file_lock 互斥。"""
+    with _file_lock(path, shared=True):
+        yield
+
+
+@contextmanager
+def _file_lock(path: str, shared: bool):
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK 重试约 10 秒后仍失败会抛出，继续等待
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟服务（离线压测 / 基准测试用）
+  - mock_servers.baiten：百腾检索接口 /router/openService/search
+  - mock_servers.cnipa ：CNIPA 缴费服务/费用查询静态站点与费用接口
+
+示例：
+    python -m mock_servers.baiten --port 8765 --docs 100000 --latency-ms 50
+    python -m mock_servers.cnipa --port 8766
+    BAITEN_SEARCH_URL=http://127.0.0.1:8765/router/openService/search \\
+    CNIPA_BASE_URL=http://localhost:8766 python batch_cli.py targets.txt
+"""
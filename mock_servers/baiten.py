@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+百腾检索接口模拟服务
+实现 search_baiten_post / normalize_baiten_payload 依赖的协议：
+  POST /router/openService/search（application/x-www-form-urlencoded）
+  - 校验 client_sign == md5("2025" + len(query) + app_secret)，不符返回 code=401（HTTP 200，客户端会换签名重试）
+  - 关键词对 申请人/标题/申请号/发明人 做子串匹配，"*" 匹配全部；按申请日倒序分页
+  - 检索式可用 " AND " 追加条件 ad:[YYYYMMDD TO YYYYMMDD] 与 type:cn_in（portfolio_harvest 的切分语法）
+  - max_result_window > 0 时只允许翻到前 N 条，更深的页返回 code=400
+  - 返回 {"code": 200, "total": N, "documents": [{"field_values": {...}}]}
+
+用法：
+    python -m mock_servers.baiten --port 8765 --docs 100000 --latency-ms 30 --error-rate 0.01
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import make_baiten_documents
+from mock_servers.common import MockHTTPServer, QuietHandler
+
+SEARCH_PATH = "/router/openService/search"
+_DATE_CLAUSE_RE = re.compile(r"^ad:\[(\d{8}) TO (\d{8})\]$", re.IGNORECASE)
+_TYPE_CLAUSE_RE = re.compile(r"^type:(\w+)$", re.IGNORECASE)
+
+
+@dataclass
+class BaitenConfig:
+    app_secret: str = "5df54358-2885-4cde-9254-e7916cecbe69"
+    docs: int = 10_000
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    max_page_size: int = 10
+    max_result_window: int = 0  # 可翻页的最大条数，0 不限
+    sign_upper: bool = False  # 服务端接受的签名大小写；False 时客户端首轮即通过
+    check_sign: bool = True
+    seed: int = 42
+    verbose: bool = False
+
+
+class BaitenDataset:
+    """按申请日倒序排列的合成文档集合，带简单的查询结果缓存。"""
+
+    def __init__(self, n: int, seed: int = 42, cache_size: int = 256):
+        docs = make_baiten_documents(n, seed)
+        docs.sort(key=lambda d: d["field_values"]["ad"], reverse=True)
+        self.docs = docs
+        self._blobs = [self._blob(d["field_values"]) for d in docs]
+        self._cache: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _blob(fv: Dict[str, Any]) -> str:
+        parts = []
+        for k in ("pa", "ti", "an", "in"):
+            v = fv.get(k)
+            parts.append(" ".join(v) if isinstance(v, list) else str(v or ""))
+        return "\n".join(parts).lower()
+
+    @staticmethod
+    def _parse(query: str):
+        """拆出 ad/type 条件，其余部分（去掉外层括号）作为关键词。"""
+        terms, date_range, ptype = [], None, None
+        for part in re.split(r"\s+AND\s+", query or "", flags=re.IGNORECASE):
+            part = part.strip()
+            m = _DATE_CLAUSE_RE.match(part)
+            if m:
+                date_range = (m.group(1), m.group(2))
+                continue
+            m = _TYPE_CLAUSE_RE.match(part)
+            if m:
+                ptype = m.group(1).lower()
+                continue
+            if part.startswith("(") and part.endswith(")"):
+                part = part[1:-1].strip()
+            terms.append(part)
+        return " AND ".join(terms), date_range, ptype
+
+    def match(self, query: str) -> List[int]:
+        q = (query or "").strip().lower()
+        with self._lock:
+            hit = self._cache.get(q)
+            if hit is not None:
+                self._cache.move_to_end(q)
+                return hit
+        term, date_range, ptype = self._parse(q)
+        if term in ("", "*"):
+            idx = list(range(len(self.docs)))
+        else:
+            idx = [i for i, b in enumerate(self._blobs) if term in b]
+        if date_range:
+            lo, hi = date_range
+            idx = [i for i in idx if lo <= self.docs[i]["field_values"]["ad"] <= hi]
+        if ptype:
+            idx = [i for i in idx if ptype in self.docs[i]["field_values"]["type"]]
+        with self._lock:
+            self._cache[q] = idx
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return idx
+
+
+def expected_sign(query: str, app_secret: str, upper: bool = False) -> str:
+    h = hashlib.md5(("2025" + str(len(query)) + app_secret).encode("utf-8")).hexdigest()
+    return h.upper() if upper else h
+
+
+class BaitenHandler(QuietHandler):
+    def do_POST(self):
+        if urlparse(self.path).path != SEARCH_PATH:
+            self.send_body(404, b"not found", "text/plain")
+            return
+        server = self.server
+        cfg: BaitenConfig = server.config
+        form = parse_qs(self.read_body().decode("utf-8"), keep_blank_values=True)
+        params = {k: v[0] for k, v in form.items()}
+
+        if server.inject():
+            self.send_body(500, b"injected error", "text/plain")
+            return
+
+        query = params.get("query", "")
+        if cfg.check_sign and params.get("client_sign") != expected_sign(query, cfg.app_secret, cfg.sign_upper):
+            self._json({"code": 401, "msg": "client_sign error"})
+            return
+
+        try:
+            page_index = max(1, int(params.get("page_index", 1)))
+            page_size = min(max(1, int(params.get("page_size", 10))), cfg.max_page_size)
+        except ValueError:
+            self._json({"code": 400, "msg": "bad paging params"})
+            return
+
+        idx = server.dataset.match(query)
+        start = (page_index - 1) * page_size
+        if cfg.max_result_window and start + page_size > cfg.max_result_window:
+            self._json({"code": 400, "msg": f"最多只能翻到前 {cfg.max_result_window} 条"})
+            return
+        page = [server.dataset.docs[i] for i in idx[start:start + page_size]]
+        self._json({"code": 200, "msg": "success", "total": len(idx), "documents": page})
+
+    def _json(self, obj: Dict[str, Any]):
+        self.send_body(200, json.dumps(obj, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+
+def make_server(host: str = "127.0.0.1", port: int = 0, config: Optional[BaitenConfig] = None) -> MockHTTPServer:
+    cfg = config or BaitenConfig()
+    server = MockHTTPServer((host, port), BaitenHandler, cfg)
+    server.dataset = BaitenDataset(cfg.docs, cfg.seed)
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="百腾检索接口模拟服务")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--docs", type=int, default=10_000, help="数据集规模")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="返回 HTTP 500 的比例 0~1")
+    ap.add_argument("--max-result-window", type=int, default=0, help="只允许翻到前 N 条（模拟深翻页限制）")
+    ap.add_argument("--sign-upper", action="store_true", help="只接受大写签名（验证客户端的签名重试）")
+    ap.add_argument("--no-sign-check", action="store_true")
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args(argv)
+    cfg = BaitenConfig(docs=args.docs, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                       error_rate=args.error_rate, max_result_window=args.max_result_window, sign_upper=args.sign_upper,
+                       check_sign=not args.no_sign_check, verbose=args.verbose)
+    server = make_server(args.host, args.port, cfg)
+    print(f"Baiten mock: {server.base_url}{SEARCH_PATH}  ({cfg.docs} docs)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
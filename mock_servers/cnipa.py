@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+CNIPA 缴费服务模拟站点
+覆盖 _open_roots / _goto_fee_query / _wait_find_input_and_button / _extract_fee_rows 走过的页面：
+  GET  /od/public/index、/od/public、/od  首页（菜单 缴费服务 → 费用查询 → 应缴费查询表单）
+  POST /od/api/fee/dueFees               费用接口 {"appNo": "..."} → {"code": 200, "data": [{feeName, deadline, amount}]}
+  GET  /static/*                          样式、脚本、图片、字体（图片/字体按配置大小生成，用于资源拦截测试）
+  GET  /analytics.js                      统计脚本；首页以另一主机名引用，模拟第三方域名
+
+登录态：请求需携带名为 SESSION 的 cookie（--no-auth 关闭校验），否则首页返回登录页、接口返回 401。
+费用数据由申请号确定性生成：第 5 位数字 1/2/3 对应发明/实用新型/外观设计，按申请日周年列出接下来两期年费。
+
+用法：
+    python -m mock_servers.cnipa --port 8766 --latency-ms 200 --empty-rate 0.1
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+from datetime import date
+from http.cookies import SimpleCookie
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from mock_servers.common import MockHTTPServer, QuietHandler
+
+SITE_DIR = Path(__file__).resolve().parent / "cnipa_site"
+FEE_API_PATH = "/od/api/fee/dueFees"
+ROOT_PATHS = ("/od/public/index", "/od/public", "/od", "/od/")
+
+_TYPE_BY_DIGIT = {"1": "发明", "2": "实用新型", "3": "外观设计", "8": "发明", "9": "实用新型"}
+# 年度 -> 年费（元，未减缴），上限为保护期
+_ANNUAL_FEE = {
+    "发明": [(3, 900), (6, 1200), (9, 2000), (12, 4000), (15, 6000), (20, 8000)],
+    "实用新型": [(3, 600), (5, 900), (8, 1200), (10, 2000)],
+    "外观设计": [(3, 600), (5, 900), (8, 1200), (10, 2000), (15, 3000)],
+}
+
+
+@dataclass
+class CnipaConfig:
+    latency_ms: float = 0.0      # 费用接口延迟
+    page_latency_ms: float = 0.0  # 首页 HTML 延迟
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    empty_rate: float = 0.0      # 返回“暂无数据”的申请号比例
+    fee_ratio: float = 0.15      # 费减后缴纳比例
+    require_auth: bool = True
+    session_rps: float = 0.0     # 每个 SESSION（账号）每秒最多请求费用接口次数，超出返回 429
+    image_kb: int = 300
+    font_kb: int = 120
+    seed: int = 0
+    verbose: bool = False
+
+
+def _annual_fee(kind: str, year: int) -> Optional[int]:
+    for upto, amount in _ANNUAL_FEE.get(kind, []):
+        if year <= upto:
+            return amount
+    return None
+
+
+def fees_for(app_no: str, today: Optional[date] = None, fee_ratio: float = 0.15, empty_rate: float = 0.0) -> List[Dict[str, str]]:
+    """按申请号确定性生成应缴费列表（接口字段名）。"""
+    digits = re.sub(r"\D", "", app_no or "")
+    if len(digits) < 12:
+        return []
+    rng = random.Random(int(hashlib.md5(digits.encode()).hexdigest()[:8], 16))
+    if rng.random() < empty_rate:
+        return []
+    kind = _TYPE_BY_DIGIT.get(digits[4], "发明")
+    filed = date(int(digits[:4]), rng.randint(1, 12), rng.randint(1, 28))
+    today = today or date.today()
+    due = filed.replace(year=today.year)
+    if due < today:
+        due = due.replace(year=today.year + 1)
+    rows = []
+    for k in range(2):
+        d = due.replace(year=due.year + k)
+        n = d.year - filed.year + 1
+        amount = _annual_fee(kind, n)
+        if amount is None:
+            break
+        rows.append({"feeName": f"{kind}专利第{n}年年费", "deadline": d.isoformat(), "amount": f"{amount * fee_ratio:.2f}"})
+    return rows
+
+
+class CnipaHandler(QuietHandler):
+    def _authed(self) -> bool:
+        if not self.server.config.require_auth:
+            return True
+        session = self._session()
+        return bool(session) and session not in self.server.revoked
+
+    def _session(self) -> str:
+        cookie = SimpleCookie(self.headers.get("Cookie") or "")
+        return cookie["SESSION"].value if "SESSION" in cookie else ""
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        server = self.server
+        if path in ROOT_PATHS:
+            server.page_delay()
+            if not self._authed():
+                self.send_body(200, server.files["login.html"], "text/html; charset=utf-8")
+                return
+            self.send_body(200, server.render_index(self.headers.get("Host") or ""), "text/html; charset=utf-8")
+        elif path.startswith("/static/"):
+            asset = server.assets.get(path)
+            if asset is None:
+                self.send_body(404, b"not found", "text/plain")
+            else:
+                self.send_body(200, asset[0], asset[1], {"Cache-Control": "no-store"})
+        elif path == "/analytics.js":
+            self.send_body(200, b"window.__analytics = (window.__analytics || 0) + 1;", "application/javascript")
+        elif path == "/favicon.ico":
+            self.send_body(204, b"", "image/x-icon")
+        else:
+            self.send_body(404, b"not found", "text/plain")
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path != FEE_API_PATH:
+            self.send_body(404, b"not found", "text/plain")
+            return
+        body = self.read_body()
+        server = self.server
+        cfg: CnipaConfig = server.config
+        if server.inject():
+            self.send_body(500, b"injected error", "text/plain")
+            return
+        if not self._authed():
+            self._json(401, {"code": 401, "msg": "请先登录"})
+            return
+        try:
+            app_no = str(json.loads(body.decode("utf-8") or "{}").get("appNo", ""))
+        except ValueError:
+            self._json(400, {"code": 400, "msg": "bad request"})
+            return
+        wait = server.throttle(self._session())
+        if wait:
+            # Retry-After 带小数以便压测时快速恢复（正式站点为整数秒）
+            self.send_body(429, b'{"code": 429, "msg": "too many requests"}', "application/json",
+                           {"Retry-After": f"{wait:.3f}"})
+            return
+        server.stats["fee_api"] += 1
+        self._json(200, {"code": 200, "data": fees_for(app_no, fee_ratio=cfg.fee_ratio, empty_rate=cfg.empty_rate)})
+
+    def _json(self, status: int, obj: Dict[str, Any]):
+        self.send_body(status, json.dumps(obj, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+
+class CnipaServer(MockHTTPServer):
+    def __init__(self, addr, config: CnipaConfig):
+        super().__init__(addr, CnipaHandler, config)
+        self.files = {p.name: p.read_bytes() for p in SITE_DIR.iterdir() if p.is_file()}
+        rng = random.Random(config.seed)
+        self.assets = {
+            "/static/site.css": (self.files["site.css"], "text/css; charset=utf-8"),
+            "/static/app.js": (self.files["app.js"], "application/javascript; charset=utf-8"),
+            "/static/banner.jpg": (b"\xff\xd8\xff" + rng.randbytes(config.image_kb * 1024), "image/jpeg"),
+            "/static/footer.png": (b"\x89PNG" + rng.randbytes(config.image_kb * 256), "image/png"),
+            "/static/font.woff2": (b"wOF2" + rng.randbytes(config.font_kb * 1024), "font/woff2"),
+        }
+        self.stats = {"fee_api": 0}
+        self.revoked = set()          # 视为已失效的 SESSION 值（模拟单个账号登录过期）
+        self.by_session: Dict[str, int] = {}
+        self._last_call: Dict[str, float] = {}
+
+    def throttle(self, session: str) -> float:
+        """按 SESSION 限流；返回需等待的秒数，0 表示放行。"""
+        with self.rng_lock:
+            self.by_session[session] = self.by_session.get(session, 0) + 1
+            if not self.config.session_rps:
+                return 0.0
+            now = time.monotonic()
+            gap = 1.0 / self.config.session_rps
+            last = self._last_call.get(session)
+            if last is not None and now - last < gap:
+                return gap - (now - last)
+            self._last_call[session] = now
+            return 0.0
+
+    def page_delay(self):
+        if self.config.page_latency_ms:
+            time.sleep(self.config.page_latency_ms / 1000.0)
+
+    def render_index(self, host_header: str) -> bytes:
+        # 以另一主机名引用统计脚本，使其在浏览器看来属于第三方域名
+        port = self.server_address[1]
+        other = "127.0.0.1" if host_header.startswith("localhost") else "localhost"
+        html = self.files["index.html"].decode("utf-8")
+        html = html.replace("{{ANALYTICS_ORIGIN}}", f"http://{other}:{port}").replace("{{USER}}", "测试用户")
+        return html.encode("utf-8")
+
+
+def make_server(host: str = "127.0.0.1", port: int = 0, config: Optional[CnipaConfig] = None) -> CnipaServer:
+    return CnipaServer((host, port), config or CnipaConfig())
+
+
+def mock_storage_state(base_url: str, session: str = "mock-session") -> Dict[str, Any]:
+    """与模拟站点匹配的 storage_state（Playwright 格式）；session 不同即视为不同账号。"""
+    host = urlparse(base_url).hostname
+    return {
+        "cookies": [{
+            "name": "SESSION", "value": session, "domain": host, "path": "/",
+            "expires": -1, "httpOnly": True, "secure": False, "sameSite": "Lax",
+        }],
+        "origins": [],
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="CNIPA 缴费服务模拟站点")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8766)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="费用接口延迟")
+    ap.add_argument("--page-latency-ms", type=float, default=0.0, help="首页延迟")
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--empty-rate", type=float, default=0.0, help="“暂无数据”比例")
+    ap.add_argument("--session-rps", type=float, default=0.0, help="每个账号（SESSION）每秒请求上限，超出返回 429")
+    ap.add_argument("--no-auth", action="store_true", help="不校验 SESSION cookie")
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args(argv)
+    cfg = CnipaConfig(latency_ms=args.latency_ms, page_latency_ms=args.page_latency_ms, jitter_ms=args.jitter_ms,
+                      error_rate=args.error_rate, empty_rate=args.empty_rate,
+                      require_auth=not args.no_auth, session_rps=args.session_rps, verbose=args.verbose)
+    server = make_server(args.host, args.port, cfg)
+    print(f"CNIPA mock: {server.base_url}/od/public/index  (CNIPA_BASE_URL={server.base_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
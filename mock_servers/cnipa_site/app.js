@@ -0,0 +1,45 @@
+// 模拟 CNIPA 单页应用：菜单异步展开、应缴费查询表单、费用接口渲染结果表
+(function () {
+  var SUBMENU_DELAY_MS = 150;
+  var PANEL_DELAY_MS = 250;
+
+  function $(id) { return document.getElementById(id); }
+
+  $("menu-pay").addEventListener("click", function () {
+    setTimeout(function () { $("submenu-pay").hidden = false; }, SUBMENU_DELAY_MS);
+  });
+  $("menu-fee").addEventListener("click", function () {
+    setTimeout(function () { $("fee-panel").hidden = false; }, PANEL_DELAY_MS);
+  });
+
+  function render(rows) {
+    var box = $("result");
+    if (!rows.length) {
+      box.innerHTML = '<div class="empty">暂无数据</div>';
+      return;
+    }
+    var html = '<table class="el-table" id="cp_result_table"><thead><tr>' +
+      '<th>序号</th><th>费用种类</th><th>缴费期限届满日</th><th>金额</th></tr></thead><tbody>';
+    rows.forEach(function (r, i) {
+      html += '<tr><td>' + (i + 1) + '</td><td>' + r.feeName + '</td><td>' + r.deadline +
+        '</td><td>' + r.amount + '</td></tr>';
+    });
+    box.innerHTML = html + '</tbody></table>';
+  }
+
+  function query() {
+    var appNo = $("applicationNo").value.trim();
+    if (!appNo) return;
+    fetch("/od/api/fee/dueFees", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      credentials: "same-origin",
+      body: JSON.stringify({ appNo: appNo })
+    }).then(function (r) { return r.json(); })
+      .then(function (js) { render(js.data || []); })
+      .catch(function () { render([]); });
+  }
+
+  $("btn-query").addEventListener("click", query);
+  $("applicationNo").addEventListener("keydown", function (e) { if (e.key === "Enter") query(); });
+})();
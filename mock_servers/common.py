@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""模拟服务的公共部分：线程化 HTTP 服务、后台启动、延迟/错误注入。"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Iterator, Type
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024
+
+    def __init__(self, addr, handler: Type[BaseHTTPRequestHandler], config):
+        super().__init__(addr, handler)
+        self.config = config
+        self.rng = random.Random(getattr(config, "seed", 0))
+        self.rng_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def inject(self) -> bool:
+        """按配置休眠模拟延迟；返回 True 表示本次应返回错误。"""
+        cfg = self.config
+        with self.rng_lock:
+            jitter = self.rng.uniform(-cfg.jitter_ms, cfg.jitter_ms) if cfg.jitter_ms else 0.0
+            fail = self.rng.random() < cfg.error_rate
+        delay = max(0.0, cfg.latency_ms + jitter) / 1000.0
+        if delay:
+            time.sleep(delay)
+        return fail
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        if getattr(self.server.config, "verbose", False):
+            super().log_message(fmt, *args)
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def read_body(self) -> bytes:
+        n = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(n) if n else b""
+
+
+@contextmanager
+def running(server: MockHTTPServer) -> Iterator[str]:
+    """在后台线程运行服务，退出时关闭；yield 服务根地址。"""
+    t = threading.Thread(target=server.serve_forever, name=type(server).__name__, daemon=True)
+    t.start()
+    try:
+        yield server.base_url
+    finally:
+        server.shutdown()
+        server.server_close()
+        t.join(timeout=5)
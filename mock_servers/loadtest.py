@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+离线压测：启动本地百腾模拟服务，用 search_baiten_post 并发打满，统计吞吐与延迟分位数。
+用法：
+    python -m mock_servers.loadtest --requests 5000 --concurrency 32 --docs 50000
+    python -m mock_servers.loadtest --url http://127.0.0.1:8765/router/openService/search   # 压已启动的服务
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from baiten_api import search_baiten_post, DEFAULT_APP_KEY, DEFAULT_APP_SECRET
+from data_utils import normalize_baiten_payload
+from mock_servers.baiten import BaitenConfig, SEARCH_PATH, make_server
+from mock_servers.common import running
+
+QUERIES = ["*", "安徽测试001", "安徽测试042", "测试装置", "张某0", "CN2015"]
+
+
+def _one(url: str, i: int):
+    t0 = time.perf_counter()
+    resp = search_baiten_post(DEFAULT_APP_KEY, DEFAULT_APP_SECRET, QUERIES[i % len(QUERIES)],
+                              url=url, page_index=1 + i % 5, page_size=10)
+    ok = bool(resp.get("ok"))
+    if ok:
+        normalize_baiten_payload(resp["response"])
+    return ok, time.perf_counter() - t0
+
+
+def run(url: str, requests: int, concurrency: int) -> dict:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: _one(url, i), range(requests)))
+    wall = time.perf_counter() - t0
+    lat = sorted(r[1] for r in results)
+    ok = sum(1 for r in results if r[0])
+    return {
+        "requests": requests, "ok": ok, "failed": requests - ok, "seconds": wall,
+        "rps": requests / wall if wall else 0.0,
+        "p50_ms": statistics.median(lat) * 1000,
+        "p95_ms": lat[int(0.95 * (len(lat) - 1))] * 1000,
+        "p99_ms": lat[int(0.99 * (len(lat) - 1))] * 1000,
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="百腾检索接口离线压测")
+    ap.add_argument("--url", help="已运行的模拟服务地址；不填则自动启动一个")
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--docs", type=int, default=10_000)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    args = ap.parse_args(argv)
+
+    if args.url:
+        res = run(args.url, args.requests, args.concurrency)
+    else:
+        cfg = BaitenConfig(docs=args.docs, latency_ms=args.latency_ms, error_rate=args.error_rate)
+        with running(make_server(config=cfg)) as base:
+            res = run(base + SEARCH_PATH, args.requests, args.concurrency)
+    print(f"{res['requests']} 次请求，成功 {res['ok']}，失败 {res['failed']}，用时 {res['seconds']:.2f}s，"
+          f"{res['rps']:.0f} req/s，p50 {res['p50_ms']:.1f}ms，p95 {res['p95_ms']:.1f}ms，p99 {res['p99_ms']:.1f}ms")
+    return 0 if res["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+本地列式专利数据集（Parquet，按申请年份分区，读取时内存映射）
+检索结果（REQUIRED_COLUMNS 结构）写入 PATENT_DATASET_DIR（默认 patent_dataset/）：
+    patent_dataset/申请年份=2021/part-0.parquet
+每个分区内按公司名称排序、按专利号去重（同一专利再次写入时以新记录为准），
+文件的行组统计信息因此可用于按公司跳过行组；申请日期区间先裁剪分区目录再下推到行组。
+每个分区的合并（读旧文件、写新文件、删旧文件）在该分区的进程间文件锁（<分区>/.write.lock）内进行，
+多个会话或进程同时写入同一年份时依次合并，不会留下重复专利号或因旧文件已被删除而失败。
+读取（scan/count/distinct/aggregates）期间对各分区持共享锁，不会看到合并中途新旧文件并存或文件被删除的状态。
+
+筛选与仪表盘直接查询数据集，只读取命中的行与需要的列，不必把整个专利组合放进每个会话的内存：
+  - scan(filters, columns=None, limit=None) -> DataFrame     filters 与 data_utils.apply_filters 同结构
+  - count(filters) / distinct(column, filters=None)
+  - aggregates(filters) -> 与 data_utils.dashboard_aggregates 相同的分组统计（在 Arrow 中完成）
+依赖 pyarrow（按需导入）。
+"""
+
+import os
+import uuid
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from data_utils import REQUIRED_COLUMNS
+from file_lock import exclusive_file_lock, shared_file_lock
+
+BASE = Path(__file__).parent
+DATASET_DIR = Path(os.getenv("PATENT_DATASET_DIR", str(BASE / "patent_dataset"))).expanduser()
+PARTITION_COLUMN = "申请年份"
+ROW_GROUP_SIZE = 64 * 1024
+UNKNOWN_YEAR = "未知"
+
+Record = Dict[str, Any]
+
+
+def _year_of(date_str: Any) -> str:
+    s = str(date_str or "")
+    return s[:4] if len(s) >= 4 and s[:4].isdigit() else UNKNOWN_YEAR
+
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema([(c, pa.string()) for c in REQUIRED_COLUMNS])
+
+
+def _filter_expression(filters: Optional[Dict[str, Any]]):
+    """把 apply_filters 的筛选字典转成 Arrow 表达式（含申请年份分区裁剪）。"""
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    f = filters or {}
+    expr = None
+
+    def _and(e):
+        nonlocal expr
+        expr = e if expr is None else (expr & e)
+
+    if f.get("公司名称"):
+        _and(ds.field("公司名称").isin(list(f["公司名称"])))
+    if f.get("专利类型"):
+        _and(ds.field("专利类型").isin(list(f["专利类型"])))
+    if f.get("法律状态"):
+        _and(ds.field("当前法律状态").isin(list(f["法律状态"])))
+    if f.get("发明人关键词"):
+        _and(pc.match_substring(ds.field("发明人"), f["发明人关键词"]))
+    if f.get("开始"):
+        _and(ds.field("申请时间") >= f["开始"])
+        _and(ds.field(PARTITION_COLUMN) >= _year_of(f["开始"]))
+    if f.get("结束"):
+        _and(ds.field("申请时间") <= f["结束"])
+        # “未知”年份排在数字之后，这里按年份上界裁剪时一并排除
+        _and(ds.field(PARTITION_COLUMN) <= _year_of(f["结束"]))
+    return expr
+
+
+class PatentDataset:
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else DATASET_DIR
+
+    def _dataset(self):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.fs as pafs
+
+        files = sorted(str(p) for p in self.path.glob(f"{PARTITION_COLUMN}=*/*.parquet"))
+        if not files:
+            return None
+        # use_mmap：读取时内存映射文件，多个会话共享操作系统页缓存，不各自复制一份
+        # 分区值一律按字符串解析（“未知”年份与数字年份共存）
+        partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive")
+        return ds.dataset(files, format="parquet", partitioning=partitioning,
+                          partition_base_dir=str(self.path), filesystem=pafs.LocalFileSystem(use_mmap=True))
+
+    @contextmanager
+    def _reading(self):
+        """对所有分区持共享锁，在锁内列出文件并读取；yield 数据集（无数据时为 None）。"""
+        with ExitStack() as stack:
+            # 写入每次只持一个分区的排他锁，读者按固定顺序加共享锁，不会死锁
+            for part_dir in sorted(p for p in self.path.glob(f"{PARTITION_COLUMN}=*") if p.is_dir()):
+                stack.enter_context(shared_file_lock(str(part_dir / ".write.lock")))
+            yield self._dataset()
+
+    def exists(self) -> bool:
+        return any(self.path.glob(f"{PARTITION_COLUMN}=*/*.parquet"))
+
+    def version(self) -> float:
+        """数据集最近修改时间，用作缓存键。"""
+        mtimes = []
+        for p in self.path.glob(f"{PARTITION_COLUMN}=*/*.parquet"):
+            try:
+                mtimes.append(p.stat().st_mtime)
+            except FileNotFoundError:  # 列出后被并发的合并删除
+                continue
+        return max(mtimes, default=0.0)
+
+    def write(self, records: Iterable[Record]) -> int:
+        """按申请年份合并写入（同一专利号以新记录为准），只重写受影响的分区，返回写入的记录数。"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        # 批内按专利号去重（后出现的为准），再按年份分组
+        by_year: Dict[str, Dict[str, Record]] = {}
+        for r in records:
+            if not r.get("专利号"):
+                continue
+            row = {c: "" if r.get(c) is None else str(r.get(c)) for c in REQUIRED_COLUMNS}
+            by_year.setdefault(_year_of(row["申请时间"]), {})[row["专利号"]] = row
+        schema = _schema()
+        for year, rows in by_year.items():
+            part_dir = self.path / f"{PARTITION_COLUMN}={year}"
+            part_dir.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pylist(list(rows.values()), schema=schema)
+            with exclusive_file_lock(str(part_dir / ".write.lock")):
+                # 锁内再列出旧文件：等锁期间其他写入者可能已替换了分区
+                old_files = sorted(part_dir.glob("*.parquet"))
+                if old_files:
+                    old = pa.concat_tables(pq.read_table(str(p), schema=schema, memory_map=True) for p in old_files)
+                    # 旧分区中被本次覆盖的专利号整列过滤掉，不经过 Python 对象
+                    old = old.filter(pc.invert(pc.is_in(old.column("专利号"), value_set=table.column("专利号"))))
+                    table = pa.concat_tables([old, table])
+                table = table.sort_by([("公司名称", "ascending"), ("申请时间", "descending")])
+                tmp = part_dir / f".part-{uuid.uuid4().hex}.parquet.tmp"
+                pq.write_table(table, str(tmp), row_group_size=ROW_GROUP_SIZE, compression="zstd")
+                new = part_dir / f"part-{uuid.uuid4().hex[:8]}.parquet"
+                os.replace(tmp, new)
+                for p in old_files:
+                    p.unlink(missing_ok=True)
+        return sum(len(rows) for rows in by_year.values())
+
+    def scan(self, filters: Optional[Dict[str, Any]] = None, columns: Optional[List[str]] = None,
+             limit: Optional[int] = None):
+        """读取命中筛选条件的记录（谓词与列投影下推到 Parquet），返回 REQUIRED_COLUMNS 结构的 DataFrame。"""
+        import pandas as pd
+
+        columns = columns or list(REQUIRED_COLUMNS)
+        with self._reading() as dset:
+            if dset is None:
+                return pd.DataFrame(columns=columns)
+            expr = _filter_expression(filters)
+            if limit is not None:
+                table = dset.head(limit, columns=columns, filter=expr)
+            else:
+                table = dset.to_table(columns=columns, filter=expr)
+        return table.to_pandas()
+
+    def count(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        with self._reading() as dset:
+            return 0 if dset is None else dset.count_rows(filter=_filter_expression(filters))
+
+    def distinct(self, column: str, filters: Optional[Dict[str, Any]] = None) -> List[str]:
+        import pyarrow.compute as pc
+
+        with self._reading() as dset:
+            if dset is None:
+                return []
+            values = pc.unique(dset.to_table(columns=[column], filter=_filter_expression(filters)).column(column))
+        return sorted(v for v in values.to_pylist() if v)
+
+    def aggregates(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """与 dashboard_aggregates 相同的三张统计表；分组在 Arrow 中完成，只读取三列。"""
+        import pandas as pd
+        import pyarrow.compute as pc
+
+        with self._reading() as dset:
+            if dset is None:
+                empty = pd.DataFrame(columns=["数量"])
+                return {"by_type": empty, "by_company_type": empty, "by_year": empty}
+            t = dset.to_table(columns=["公司名称", "专利类型", "申请时间"], filter=_filter_expression(filters))
+        t = t.append_column("申请年份", pc.utf8_slice_codeunits(t.column("申请时间"), 0, 4))
+
+        def group(keys: List[str]) -> pd.DataFrame:
+            out = t.group_by(keys).aggregate([([], "count_all")]).to_pandas()
+            return out.rename(columns={"count_all": "数量"})[keys + ["数量"]].sort_values(keys, ignore_index=True)
+
+        return {
+            "by_type": group(["专利类型"]),
+            "by_company_type": group(["公司名称", "专利类型"]),
+            "by_year": group(["申请年份"]),
+        }
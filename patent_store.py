@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+本地专利库（SQLite，按“专利号”为主键）与增量同步
+每条检索结果（normalize_baiten_payload 的标准化记录）连同首次/最近出现时间、最近变化时间与内容指纹写入本地库，
+并记录它命中过哪些检索式。同一检索式再次同步时按申请日倒序（ad_sort desc）翻页，
+遇到整页都是库中已有且内容未变的记录即停止翻页，只把新增与变化的记录写入库中；
+检索结果取自本地库（records_for_query），无需重新下载全部页。
+
+注意：提前停止只能发现新申请的专利及排在前面的变化；较早专利的法律状态变化需定期全量同步（full=True）。
+
+库文件路径可通过环境变量 PATENT_STORE_FILE 覆盖（默认 patent_store.sqlite3）。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from data_utils import REQUIRED_COLUMNS
+
+BASE = Path(__file__).parent
+STORE_FILE = Path(os.getenv("PATENT_STORE_FILE", str(BASE / "patent_store.sqlite3"))).expanduser()
+
+Record = Dict[str, Any]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patents (
+    app_no TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    app_date TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    last_changed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS query_hits (
+    query TEXT NOT NULL,
+    app_no TEXT NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (query, app_no)
+);
+CREATE TABLE IF NOT EXISTS sync_runs (
+    query TEXT NOT NULL,
+    ts REAL NOT NULL,
+    pages INTEGER NOT NULL,
+    new INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    full INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sync_runs_query ON sync_runs (query, ts);
+"""
+
+
+def record_fingerprint(record: Record) -> str:
+    """只对标准化字段计算指纹，接口返回的其他字段变化不算变化。"""
+    payload = json.dumps([str(record.get(c, "") or "") for c in REQUIRED_COLUMNS], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class UpsertStats:
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+
+
+@dataclass
+class SyncResult:
+    query: str
+    pages: int = 0
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    stopped_early: bool = False
+    full: bool = False
+    elapsed_s: float = 0.0
+
+
+class PatentStore:
+    """单个连接 + 锁，可在检索线程间共享。"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else STORE_FILE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM patents").fetchone()[0]
+
+    def upsert(self, records: Iterable[Record], query: Optional[str] = None,
+               now: Optional[float] = None) -> UpsertStats:
+        """写入一批记录；新增或内容变化的记录更新 data/last_changed，其余只刷新 last_seen。"""
+        now = now or time.time()
+        stats = UpsertStats()
+        rows = [(r["专利号"], r) for r in records if r.get("专利号")]
+        if not rows:
+            return stats
+        with self._lock, self._conn:
+            known = dict(self._conn.execute(
+                f"SELECT app_no, fingerprint FROM patents WHERE app_no IN ({','.join('?' * len(rows))})",
+                [k for k, _ in rows]).fetchall())
+            for key, rec in rows:
+                fp = record_fingerprint(rec)
+                old = known.get(key)
+                if old == fp:
+                    stats.unchanged += 1
+                    self._conn.execute("UPDATE patents SET last_seen = ? WHERE app_no = ?", (now, key))
+                else:
+                    if old is None:
+                        stats.new += 1
+                    else:
+                        stats.changed += 1
+                    known[key] = fp
+                    data = json.dumps({c: rec.get(c, "") for c in REQUIRED_COLUMNS}, ensure_ascii=False)
+                    self._conn.execute(
+                        "INSERT INTO patents (app_no, data, fingerprint, app_date, first_seen, last_seen, last_changed) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(app_no) DO UPDATE SET "
+                        "data = excluded.data, fingerprint = excluded.fingerprint, app_date = excluded.app_date, "
+                        "last_seen = excluded.last_seen, last_changed = excluded.last_changed",
+                        (key, data, fp, rec.get("申请时间") or "", now, now, now))
+                if query is not None:
+                    self._conn.execute(
+                        "INSERT INTO query_hits (query, app_no, last_seen) VALUES (?, ?, ?) "
+                        "ON CONFLICT(query, app_no) DO UPDATE SET last_seen = excluded.last_seen",
+                        (query, key, now))
+        return stats
+
+    def get(self, app_no: str) -> Optional[Record]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM patents WHERE app_no = ?", (app_no,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def records_for_query(self, query: str) -> List[Record]:
+        """该检索式命中过的全部专利（按申请日倒序）。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p.data FROM query_hits q JOIN patents p ON p.app_no = q.app_no "
+                "WHERE q.query = ? ORDER BY p.app_date DESC, p.app_no", (query,)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def last_sync(self, query: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ts, pages, new, changed, full FROM sync_runs WHERE query = ? ORDER BY ts DESC LIMIT 1",
+                (query,)).fetchone()
+        if row is None:
+            return None
+        return {"ts": row[0], "pages": row[1], "new": row[2], "changed": row[3], "full": bool(row[4])}
+
+    def record_sync(self, result: SyncResult):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO sync_runs (query, ts, pages, new, changed, full) VALUES (?, ?, ?, ?, ?, ?)",
+                               (result.query, time.time(), result.pages, result.new, result.changed, int(result.full)))
+
+
+def sync_query(store: PatentStore, query: str, pages: Iterable[List[Record]], *, full: Optional[bool] = None,
+               stop_after_known_pages: int = 1) -> SyncResult:
+    """
+    pages 为按申请日倒序逐页产出的标准化记录（如 batch_cli.iter_search_records），只在需要时才取下一页。
+    该检索式首次同步或 full=True 时取完全部页；否则连续 stop_after_known_pages 页没有新增或变化即停止。
+    """
+    t0 = time.perf_counter()
+    if full is None:
+        full = store.last_sync(query) is None
+    result = SyncResult(query=query, full=full)
+    known_streak = 0
+    it = iter(pages)
+    try:
+        for records in it:
+            result.pages += 1
+            stats = store.upsert(records, query=query)
+            result.new += stats.new
+            result.changed += stats.changed
+            result.unchanged += stats.unchanged
+            known_streak = known_streak + 1 if stats.new == stats.changed == 0 else 0
+            if not full and known_streak >= stop_after_known_pages:
+                result.stopped_early = True
+                break
+    finally:
+        # 提前停止时关闭生成器，不再发出后续页的请求
+        close = getattr(it, "close", None)
+        if close is not None:
+            close()
+    result.elapsed_s = time.perf_counter() - t0
+    store.record_sync(result)
+    return result
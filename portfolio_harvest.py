@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+大批量专利组合检索（突破每页 10 条与深翻页限制）
+检索接口每页最多 10 条，且通常只允许翻到前 BAITEN_MAX_RESULT_WINDOW 条。一个两万件专利的公司逐页取需要
+两千次串行请求，深处的页还取不到。这里把大查询按申请日区间（二分到单日）再按专利类型切分成若干子查询，
+使每个子查询的命中数都不超过可翻页范围，然后并发获取所有子查询的所有页，按“专利号”去重。
+
+子查询通过检索式追加条件实现，条件写法可用环境变量调整（以接口文档为准）：
+  BAITEN_DATE_CLAUSE  默认 "ad:[{start} TO {end}]"（日期为 YYYYMMDD）
+  BAITEN_TYPE_CLAUSE  默认 "type:{type}"（type 为 cn_in / cn_um / cn_dm）
+与原检索式以 " AND " 连接；mock_servers.baiten 实现了同样的语法。
+
+对外函数：
+  - harvest_portfolio(query, ...) -> HarvestResult
+"""
+
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from baiten_api import DEFAULT_APP_KEY, DEFAULT_APP_SECRET, DEFAULT_SEARCH_URL, search_baiten_post
+from data_utils import normalize_baiten_payload
+from timing import span
+
+PAGE_SIZE = 10
+MAX_RESULT_WINDOW = int(os.getenv("BAITEN_MAX_RESULT_WINDOW", "2000"))
+HARVEST_WORKERS = int(os.getenv("BAITEN_HARVEST_WORKERS", "8"))
+DATE_CLAUSE = os.getenv("BAITEN_DATE_CLAUSE", "ad:[{start} TO {end}]")
+TYPE_CLAUSE = os.getenv("BAITEN_TYPE_CLAUSE", "type:{type}")
+PATENT_TYPES = ("cn_in", "cn_um", "cn_dm")
+FIRST_YEAR = 1985  # 中国专利法施行
+
+Record = Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class Partition:
+    start: date
+    end: date
+    ptype: Optional[str] = None
+    whole: bool = False  # 不加任何条件的原检索式
+
+    def query(self, base: str) -> str:
+        if self.whole:
+            return base
+        clauses = [f"({base})", DATE_CLAUSE.format(start=self.start.strftime("%Y%m%d"), end=self.end.strftime("%Y%m%d"))]
+        if self.ptype:
+            clauses.append(TYPE_CLAUSE.format(type=self.ptype))
+        return " AND ".join(clauses)
+
+    def split(self) -> List["Partition"]:
+        """按日期二分；已是单日则按专利类型拆分；两者都无法再拆时返回空列表。"""
+        if self.start < self.end:
+            mid = self.start + timedelta(days=(self.end - self.start).days // 2)
+            return [Partition(self.start, mid, self.ptype), Partition(mid + timedelta(days=1), self.end, self.ptype)]
+        if self.ptype is None:
+            return [Partition(self.start, self.end, t) for t in PATENT_TYPES]
+        return []
+
+    def label(self) -> str:
+        if self.whole:
+            return "全部"
+        return f"{self.start:%Y-%m-%d}~{self.end:%Y-%m-%d}" + (f" {self.ptype}" if self.ptype else "")
+
+
+@dataclass
+class HarvestResult:
+    records: List[Record] = field(default_factory=list)   # 按“专利号”去重
+    total_reported: Optional[int] = None                  # 原检索式的命中总数
+    covered: int = 0                                      # 各子查询命中数之和
+    partitions: int = 0
+    requests: int = 0
+    duplicates: int = 0                                   # 重复记录（含父子分片第 1 页的重叠）
+    truncated: List[str] = field(default_factory=list)    # 拆到最细仍超出可翻页范围的子查询
+    failed_pages: int = 0
+    elapsed_s: float = 0.0
+
+
+def _fetch_page(query: str, page_index: int, app_key: str, app_secret: str, url: str,
+                retries: int = 1) -> Tuple[List[Record], Optional[int]]:
+    for attempt in range(retries + 1):
+        with span("harvest.page"):
+            resp = search_baiten_post(app_key=app_key, app_secret=app_secret, query=query, url=url,
+                                      page_index=page_index, page_size=PAGE_SIZE)
+        if resp.get("ok"):
+            return normalize_baiten_payload(resp["response"])
+        if attempt == retries:
+            raise RuntimeError(f"检索 {query!r} 第 {page_index} 页失败（HTTP {resp.get('http_status')}）")
+    return [], None
+
+
+def harvest_portfolio(query: str, *, app_key: str = DEFAULT_APP_KEY, app_secret: str = DEFAULT_APP_SECRET,
+                      url: str = DEFAULT_SEARCH_URL, workers: int = HARVEST_WORKERS, max_window: int = MAX_RESULT_WINDOW,
+                      start_year: int = FIRST_YEAR, end_year: Optional[int] = None,
+                      on_records: Optional[Callable[[List[Record], HarvestResult], None]] = None,
+                      on_progress: Optional[Callable[[str], None]] = None) -> HarvestResult:
+    """
+    获取检索式的全部命中。on_records(新记录, 当前结果) 在调用线程中随每页到达调用（已去重），可用于流式展示；
+    on_progress(说明) 报告切分进度。单页失败记入 failed_pages，不中断其余页。
+    """
+    t0 = time.perf_counter()
+    out = HarvestResult()
+    seen = set()
+    window = max(PAGE_SIZE, max_window - max_window % PAGE_SIZE)
+
+    def take(records: List[Record]):
+        fresh = []
+        for r in records:
+            key = r.get("专利号")
+            if not key or key in seen:
+                out.duplicates += bool(key)
+                continue
+            seen.add(key)
+            fresh.append(r)
+        out.records.extend(fresh)
+        if fresh and on_records is not None:
+            on_records(fresh, out)
+
+    def probe(part: Partition):
+        return part, _fetch_page(part.query(query), 1, app_key, app_secret, url)
+
+    root = Partition(date(start_year, 1, 1), date(end_year or date.today().year, 12, 31), whole=True)
+    leaves: List[Tuple[Partition, int]] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # 1) 探测：每个分片取第 1 页得到命中数（第 1 页的记录同时收下），超出可翻页范围的继续拆分
+        frontier = [root]
+        while frontier:
+            futures = [pool.submit(probe, p) for p in frontier]
+            frontier = []
+            for fut in as_completed(futures):
+                out.requests += 1
+                try:
+                    part, (records, total) = fut.result()
+                except Exception:
+                    out.failed_pages += 1
+                    continue
+                if part.whole:
+                    out.total_reported = total
+                take(records)
+                total = len(records) if total is None else total
+                if total <= window:
+                    if total:
+                        leaves.append((part, total))
+                    continue
+                if part.whole:
+                    part = Partition(root.start, root.end)
+                children = part.split()
+                if not children:
+                    out.truncated.append(part.label())
+                    leaves.append((part, total))
+                    continue
+                frontier.extend(children)
+            if frontier and on_progress is not None:
+                on_progress(f"拆分检索式：{len(frontier)} 个子查询待探测，已获取 {len(out.records)} 条")
+
+        out.partitions = len(leaves)
+        out.covered = sum(t for _, t in leaves)
+        # 2) 并发获取所有分片的剩余页
+        jobs = {pool.submit(_fetch_page, part.query(query), page, app_key, app_secret, url): (part, page)
+                for part, total in leaves for page in range(2, math.ceil(min(total, window) / PAGE_SIZE) + 1)}
+        if on_progress is not None:
+            on_progress(f"{len(leaves)} 个子查询，共 {len(jobs)} 页待获取")
+        for fut in as_completed(jobs):
+            out.requests += 1
+            try:
+                records, _ = fut.result()
+            except Exception:
+                out.failed_pages += 1
+                continue
+            take(records)
+    out.elapsed_s = time.perf_counter() - t0
+    return out
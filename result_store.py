@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+进程内共享的结果存储（引用计数，纯 Python，不依赖 Streamlit）
+每个浏览器会话原本各自持有一份检索结果 DataFrame 与年费查询结果；多个用户查看同一个大专利组合时内存随会话数线性增长。
+这里按内容哈希（或调用方给定的键）只保存一份，会话只持有 ResultHandle：
+  - put(value, key=None) -> ResultHandle     内容相同的结果复用已有条目，引用计数 +1
+  - open(key) -> Optional[ResultHandle]       按键取已有结果的新句柄
+  - handle.value                              只读视图：DataFrame 为浅拷贝（共享数据，不共享列结构），列表为元组
+  - handle.release()                          引用计数 -1，归零即释放；句柄被回收（会话结束）时自动释放
+  - handle.derived(name, fn, stamp=None)      由结果派生的数据（如表格样式），每个条目只计算一次，随条目一起释放；
+                                              同名派生数据只保留一份，stamp（如参数、日期）变化时重新计算并替换旧值
+视图中的数据由所有会话共享，调用方不得原地修改（筛选、排序等返回新对象的操作不受影响）。
+"""
+
+import hashlib
+import json
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def content_key(value: Any) -> str:
+    """结果内容的哈希：DataFrame 按列名 + 逐行哈希，其他按 JSON。"""
+    h = hashlib.sha1()
+    try:
+        import pandas as pd
+    except ImportError:  # pragma: no cover - 纯 Python 环境
+        pd = None
+    if pd is not None and isinstance(value, pd.DataFrame):
+        h.update(json.dumps([str(c) for c in value.columns], ensure_ascii=False).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    else:
+        h.update(json.dumps(value, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def _view(value: Any) -> Any:
+    copy = getattr(value, "copy", None)
+    if copy is not None and hasattr(value, "columns"):
+        return copy(deep=False)
+    return value
+
+
+class _Entry:
+    __slots__ = ("value", "refs", "derived")
+
+    def __init__(self, value: Any):
+        self.value = value
+        self.refs = 0
+        self.derived: Dict[str, Any] = {}
+
+
+class ResultHandle:
+    """会话持有的句柄；不持有数据本身，只是对共享条目的一次引用。"""
+
+    def __init__(self, store: "ResultStore", key: str):
+        self.key = key
+        self._store = store
+        self._finalizer = weakref.finalize(self, store._release, key)
+
+    @property
+    def value(self) -> Any:
+        return self._store._value(self.key)
+
+    def derived(self, name: str, fn: Callable[[Any], Any], stamp: Hashable = None) -> Any:
+        return self._store._derived(self.key, name, fn, stamp)
+
+    def release(self):
+        self._finalizer()
+
+    @property
+    def released(self) -> bool:
+        return not self._finalizer.alive
+
+    def __repr__(self):
+        return f"ResultHandle({self.key[:12]}{', released' if self.released else ''})"
+
+
+class ResultStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+
+    def put(self, value: Any, key: Optional[str] = None) -> ResultHandle:
+        key = key or content_key(value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(_freeze(value))
+            entry.refs += 1
+        return ResultHandle(self, key)
+
+    def open(self, key: str) -> Optional[ResultHandle]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.refs += 1
+        return ResultHandle(self, key)
+
+    def _value(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            raise KeyError(f"结果 {key} 已释放")
+        return _view(entry.value)
+
+    def _derived(self, key: str, name: str, fn: Callable[[Any], Any], stamp: Hashable = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            cached = None if entry is None else entry.derived.get(name)
+        if entry is None:
+            raise KeyError(f"结果 {key} 已释放")
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        # 在锁外计算；并发时可能重复计算一次。同名只保留最新 stamp 的一份，旧参数的派生数据随之释放
+        value = fn(entry.value)
+        with self._lock:
+            entry.derived[name] = (stamp, value)
+        return value
+
+    def _release(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refs -= 1
+            if entry.refs <= 0:
+                del self._entries[key]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "refs": sum(e.refs for e in self._entries.values())}
+
+
+_default_store = ResultStore()
+
+
+def get_store() -> ResultStore:
+    """进程内默认存储（Streamlit 的所有会话共用一个进程）。"""
+    return _default_store
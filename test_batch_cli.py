@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+命令行批处理工具测试脚本
+"""
+
+import csv
+import tempfile
+from pathlib import Path
+
+from batch_cli import read_targets, is_application_number, RowWriter, FEE_COLUMNS
+
+
+def test_batch_cli_helpers():
+    """测试目标文件解析与流式写出"""
+    with tempfile.TemporaryDirectory() as tmp:
+        targets = Path(tmp) / "targets.txt"
+        targets.write_text("# 注释\n安徽天墅建设集团有限公司\n\nCN202222927164.1\n2022229271641\n安徽天墅建设集团有限公司\n", encoding="utf-8")
+        items = read_targets(targets)
+        assert items == ["安徽天墅建设集团有限公司", "CN202222927164.1", "2022229271641"]
+        assert [is_application_number(t) for t in items] == [False, True, True]
+
+        out = Path(tmp) / "fees.csv"
+        writer = RowWriter(out, FEE_COLUMNS)
+        writer.write([{"专利号": "CN202222927164.1", "费用种类": "实用新型专利第4年年费", "缴费期限届满日": "2025-12-03", "金额": "135.00"}])
+        writer.write([])
+        writer.close()
+        assert writer.rows_written == 1
+        with open(out, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert rows[0]["金额"] == "135.00"
+        print("批处理工具辅助函数测试通过")
+
+
+if __name__ == "__main__":
+    test_batch_cli_helpers()
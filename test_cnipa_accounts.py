@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+多账号登录状态管理测试脚本（HTTP 后端 + 本地模拟站点，无需浏览器）
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+from cnipa_accounts import Account, AccountRegistry
+from cnipa_http_client import CnipaHttpClient
+from fee_batch import run_fee_batch
+from mock_servers import cnipa
+from mock_servers.common import running
+
+
+def _registry(base, **kw):
+    clients = {}
+
+    def client(state):
+        key = state["cookies"][0]["value"]
+        if key not in clients:
+            clients[key] = CnipaHttpClient(state, fee_api_url=base + cnipa.FEE_API_PATH, base_url=base)
+        return clients[key]
+
+    registry = AccountRegistry([
+        Account("甲", cnipa.mock_storage_state(base, "session-jia"), owners=["甲科技"], **kw),
+        Account("乙", cnipa.mock_storage_state(base, "session-yi"), owners=["乙电子"], **kw),
+        Account("丙", cnipa.mock_storage_state(base, "session-bing"), **kw),
+    ], probe_state=lambda st: client(st).probe())
+    return registry, registry.wrap(lambda p, st: client(st).query_due_fees(p["专利号"]))
+
+
+def test_routes_by_owner_and_spreads_the_rest():
+    """测试归属专利只走所属账号、其余专利分摊到各账号，且遵守每账号限流"""
+    patents = ([{"专利号": f"20221{i:07d}1", "公司名称": "甲科技有限公司"} for i in range(4)]
+               + [{"专利号": f"20222{i:07d}1", "公司名称": "某研究所"} for i in range(12)])
+    with running(cnipa.make_server(config=cnipa.CnipaConfig(session_rps=20))) as base:
+        registry, query = _registry(base, concurrency=2, rate_per_min=1200)
+        out = run_fee_batch(patents, query, probe=registry.probe, workers=registry.total_concurrency())
+    assert not out.failed and len(out.results) == 16
+    status = {row["账号"]: row for row in registry.status()}
+    assert sum(row["完成"] for row in status.values()) == 16
+    assert status["甲"]["完成"] >= 4 and status["乙"]["完成"] > 0 and status["丙"]["完成"] > 0
+    print("多账号路由测试通过")
+
+
+def test_rate_limited_account_cools_down():
+    """测试接口返回 429 时该账号冷却后重试，查询最终成功"""
+    patents = [{"专利号": f"20223{i:07d}1", "公司名称": "乙电子"} for i in range(5)]
+    with running(cnipa.make_server(config=cnipa.CnipaConfig(session_rps=10))) as base:
+        registry, query = _registry(base, concurrency=2)
+        out = run_fee_batch(patents, query, workers=4)
+    assert not out.failed and len(out.results) == 5
+    assert registry.get("乙").rate_limited > 0 and registry.get("乙").completed == 5
+    print("账号限流测试通过")
+
+
+def test_expired_account_only_pauses_its_patents():
+    """测试单个账号失效：其归属专利进入 pending，未归属专利改派其他账号继续"""
+    owned = [{"专利号": f"20224{i:07d}1", "公司名称": "甲科技"} for i in range(3)]
+    free = [{"专利号": f"20225{i:07d}1", "公司名称": ""} for i in range(6)]
+    server = cnipa.make_server()
+    server.revoked.add("session-jia")
+    with running(server) as base:
+        registry, query = _registry(base)
+        out = run_fee_batch(owned + free, query, workers=registry.total_concurrency())
+    assert not out.session_expired and out.expired_accounts == ["甲"]
+    assert sorted(p["专利号"] for p in out.pending) == [p["专利号"] for p in owned]
+    assert len(out.results) == 6 and registry.get("甲").expired
+    print("账号失效测试通过")
+
+
+def test_load_registry_file():
+    """测试注册表文件读取（state 相对路径、默认并发）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        d = Path(tmp)
+        (d / "states").mkdir()
+        (d / "states" / "a.json").write_text(json.dumps(cnipa.mock_storage_state("http://127.0.0.1", "a")))
+        (d / "accounts.json").write_text(json.dumps({"accounts": [
+            {"name": "A", "state": "states/a.json", "owners": ["A公司"], "rate_per_min": 30}]}, ensure_ascii=False))
+        registry = AccountRegistry.load(d / "accounts.json", concurrency=3)
+    a = registry.get("A")
+    assert len(registry) == 1 and a.concurrency == 3 and a.min_interval == 2.0
+    assert registry.owner_of({"公司名称": "A公司北京分公司"}) is a
+    print("注册表读取测试通过")
+
+
+
+def test_workers_pooled_per_account():
+    """测试常驻资源按账号池化：每个账号创建的资源数不超过其并发数，且同一资源不会被两个查询同时使用"""
+    import threading
+    import time
+
+    created, busy, overlap = [], set(), []
+    lock = threading.Lock()
+
+    def make(acct):
+        with lock:
+            created.append(acct.name)
+        return object()
+
+    def query(patent, state, worker):
+        with lock:
+            if id(worker) in busy:
+                overlap.append(worker)
+            busy.add(id(worker))
+        time.sleep(0.01)
+        with lock:
+            busy.discard(id(worker))
+        return [{"专利号": patent["专利号"]}]
+
+    registry = AccountRegistry([Account(n, {"cookies": []}, concurrency=2) for n in ("甲", "乙", "丙")],
+                               probe_state=lambda st: None)
+    patents = [{"专利号": str(i), "公司名称": ""} for i in range(60)]
+    out = run_fee_batch(patents, registry.wrap(query, worker=make), workers=registry.total_concurrency())
+    assert len(out.results) == 60 and not overlap
+    assert all(created.count(n) <= 2 for n in ("甲", "乙", "丙")) and len(created) <= 6
+    closed = []
+    assert registry.close_workers(closed.append) == len(created) == len(closed)
+    print("账号资源池测试通过")
+
+if __name__ == "__main__":
+    test_routes_by_owner_and_spreads_the_rest()
+    test_rate_limited_account_cools_down()
+    test_expired_account_only_pauses_its_patents()
+    test_load_registry_file()
+    test_workers_pooled_per_account()
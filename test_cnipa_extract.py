@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+CNIPA 结果表解析测试脚本
+浏览器内提取（EXTRACT_FEE_ROWS_JS）与 Python 参考实现用同一批页面比对；本机未安装 Chromium 时跳过浏览器用例。
+"""
+
+import asyncio
+from pathlib import Path
+
+from cnipa_fee_query import _extract_fee_rows, _map_by_header, parse_fee_tables
+
+FIXTURES = Path(__file__).parent / "benchmarks" / "fixtures"
+
+# 组件库表格：表头与表体分属同一容器下的两个 <table>
+COMPONENT_TABLE_HTML = """<html><body><div class="el-table">
+<table><tr><th>序号</th><th>费用种类</th><th>缴费期限届满日</th><th>金额</th></tr></table>
+<table>
+<tr><td>1</td><td>实用新型专利第4年年费</td><td>2025-12-03</td><td>135.00</td></tr>
+<tr><td>2</td><td>著录项目变更费</td><td>2025-12-03</td><td>200.00</td></tr>
+<tr><td>3</td><td>实用新型专利第4年年费滞纳金</td><td>2026-01-03</td><td>6.75</td></tr>
+<tr><td>4</td><td>不完整行</td></tr>
+</table></div><div>退出</div></body></html>"""
+
+# 与 benchmarks.run 的旧版提取相同：把页面上全部表格的单元格交给 Python 参考实现
+_ALL_TABLES_JS = """(nodes) => nodes.map(t =>
+    Array.from(t.querySelectorAll('tr')).map(tr =>
+        Array.from(tr.querySelectorAll('th,td')).map(td => td.innerText.trim())))"""
+
+
+def test_map_by_header_merged_component_table():
+    """测试组件库表格（表头/表体分属两个 table，按容器合并行）的解析与年费过滤"""
+    rows = [
+        ["序号", "费用种类", "缴费期限届满日", "金额"],
+        ["1", "实用新型专利第4年年费", "2025-12-03", "135.00"],
+        ["2", "著录项目变更费", "2025-12-03", "200.00"],
+        ["3", "实用新型专利第4年年费滞纳金", "2026-01-03", "6.75"],
+        ["4", "不完整行"],
+    ]
+    assert _map_by_header(rows) == [
+        {"费用种类": "实用新型专利第4年年费", "缴费期限届满日": "2025-12-03", "金额": "135.00"},
+        {"费用种类": "实用新型专利第4年年费滞纳金", "缴费期限届满日": "2026-01-03", "金额": "6.75"},
+    ]
+    assert _map_by_header([["公告", "系统将于每周日凌晨维护"]]) == []
+    print("结果表解析测试通过")
+
+
+def test_parse_fee_tables_dedupes_and_falls_back_to_text():
+    """测试多个表格重复的费用行只保留一次；没有表格命中时按全文正则解析"""
+    table = [["费用种类", "缴费期限届满日", "金额"], ["发明专利第5年年费", "2026-03-01", "1200.00"]]
+    layout = [["首页", "帮助"]]
+    rows = parse_fee_tables([layout, table, table], "")
+    assert rows == [{"费用种类": "发明专利第5年年费", "缴费期限届满日": "2026-03-01", "金额": "1200.00"}]
+    fallback = parse_fee_tables([layout], "发明专利第5年年费 2026-03-01 1200.00")
+    assert len(fallback) == 1 and fallback[0]["金额"] == "1200.00"
+    print("费用表提取测试通过")
+
+
+async def _browser_cases():
+    """返回 [(页面名, 浏览器内提取结果, Python 参考结果)]；无法启动 Chromium 时返回错误说明。"""
+    from playwright.async_api import async_playwright
+
+    pages = {"component": COMPONENT_TABLE_HTML}
+    for path in sorted(FIXTURES.glob("cnipa_fee_result*.html")):
+        pages[path.stem] = path.read_text(encoding="utf-8")
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch(headless=True)
+        except Exception as e:
+            return str(e).splitlines()[0] if str(e) else type(e).__name__
+        try:
+            page = await browser.new_page()
+            out = []
+            for name, html in pages.items():
+                await page.set_content(html)
+                tables = await page.eval_on_selector_all("table", _ALL_TABLES_JS)
+                reference = parse_fee_tables(tables, await page.inner_text("body"))
+                out.append((name, await _extract_fee_rows(page), reference))
+            await page.set_content("<html><body><div>首页</div></body></html>")
+            out.append(("no_result_scoped", await _extract_fee_rows(page, scoped=True), None))
+            return out
+        finally:
+            await browser.close()
+
+
+def test_browser_extract_matches_python_reference():
+    """测试浏览器内提取（生产路径）与 Python 参考实现在相同页面上结果一致"""
+    cases = asyncio.run(_browser_cases())
+    if isinstance(cases, str):
+        msg = f"未能启动 Chromium，跳过浏览器内提取测试：{cases}"
+        try:
+            import pytest
+        except ImportError:
+            print(msg)
+            return
+        pytest.skip(msg)
+    for name, rows, reference in cases:
+        assert rows == reference, f"{name}: 浏览器内提取 {rows} 与参考实现 {reference} 不一致"
+    assert dict((n, r) for n, r, _ in cases)["component"] == [
+        {"费用种类": "实用新型专利第4年年费", "缴费期限届满日": "2025-12-03", "金额": "135.00"},
+        {"费用种类": "实用新型专利第4年年费滞纳金", "缴费期限届满日": "2026-01-03", "金额": "6.75"},
+    ]
+    print("浏览器内提取测试通过")
+
+
+if __name__ == "__main__":
+    test_map_by_header_merged_component_table()
+    test_parse_fee_tables_dedupes_and_falls_back_to_text()
+    test_browser_extract_matches_python_reference()
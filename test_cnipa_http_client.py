@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+CNIPA HTTP 后端测试脚本（使用本地模拟站点）
+"""
+
+import os
+
+from cnipa_http_client import CnipaHttpClient, http_backend_enabled, parse_fee_payload
+from mock_servers import cnipa
+from mock_servers.common import running
+
+
+def test_parse_fee_payload():
+    """测试接口字段映射、年费过滤与去重"""
+    payload = {"code": 200, "data": {"list": [
+        {"feeTypeName": "实用新型专利第4年年费", "dueDate": "2025-12-03 00:00:00", "payAmount": 135},
+        {"feeTypeName": "实用新型专利第4年年费", "dueDate": "2025-12-03", "payAmount": 135},
+        {"feeTypeName": "著录项目变更费", "dueDate": "2025-12-03", "payAmount": 200},
+    ]}}
+    rows = parse_fee_payload(payload)
+    assert rows == [{"费用种类": "实用新型专利第4年年费", "缴费期限届满日": "2025-12-03", "金额": "135"}]
+
+
+def test_http_client_against_mock():
+    """测试复用登录 cookie 查询，以及登录失效时报错"""
+    with running(cnipa.make_server()) as base:
+        api = base + cnipa.FEE_API_PATH
+        client = CnipaHttpClient(cnipa.mock_storage_state(base), fee_api_url=api)
+        rows = client.query_due_fees("2022229271641")
+        assert rows and set(rows[0]) == {"费用种类", "缴费期限届满日", "金额"}
+
+        expired = CnipaHttpClient({"cookies": []}, fee_api_url=api)
+        try:
+            expired.query_due_fees("2022229271641")
+        except RuntimeError as e:
+            assert "登录状态已失效" in str(e)
+        else:
+            raise AssertionError("未携带登录 cookie 时应报错")
+        print("HTTP 后端测试通过")
+
+
+def test_backend_disabled_without_explicit_url():
+    """测试未设置 CNIPA_FEE_API_URL 时 http 后端不可用（接口未经正式站点确认，不提供默认地址）"""
+    from cnipa_fee_query import available_backends
+
+    old = os.environ.pop("CNIPA_FEE_API_URL", None)
+    try:
+        assert not http_backend_enabled() and available_backends() == ("browser",)
+        try:
+            CnipaHttpClient({"cookies": []}).query_due_fees("2022229271641")
+        except RuntimeError as e:
+            assert "CNIPA_FEE_API_URL" in str(e)
+        else:
+            raise AssertionError("未配置费用接口时应报错")
+        os.environ["CNIPA_FEE_API_URL"] = "http://127.0.0.1:1/fees"
+        assert available_backends() == ("browser", "http")
+    finally:
+        if old is None:
+            os.environ.pop("CNIPA_FEE_API_URL", None)
+        else:
+            os.environ["CNIPA_FEE_API_URL"] = old
+    print("HTTP 后端开关测试通过")
+
+
+if __name__ == "__main__":
+    test_parse_fee_payload()
+    test_http_client_against_mock()
+    test_backend_disabled_without_explicit_url()
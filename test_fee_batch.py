@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+登录态探测与批量年费查询暂停/续跑测试脚本
+"""
+
+import tempfile
+from pathlib import Path
+
+from cnipa_common import SessionExpiredError
+from cnipa_http_client import CnipaHttpClient, SessionHealth, cookies_expired
+from fee_batch import run_fee_batch
+from fee_checkpoint import FeeCheckpoint
+from mock_servers import cnipa
+from mock_servers.common import running
+
+
+def test_probe_session_against_mock():
+    """测试有效 cookie 探测通过、无 cookie 或过期 cookie 判定为失效"""
+    with running(cnipa.make_server()) as base:
+        ok = CnipaHttpClient(cnipa.mock_storage_state(base), base_url=base).probe()
+        assert ok.ok and not ok.expired
+        dead = CnipaHttpClient({"cookies": []}, base_url=base).probe()
+        assert dead.expired and not dead.ok
+    state = cnipa.mock_storage_state("http://127.0.0.1")
+    state["cookies"][0]["expires"] = 1
+    assert cookies_expired(state)
+
+    # SPA 外壳：静态 HTML 里只有脚本与“登录”字样，没有登录表单，不能据此判定失效
+    server = cnipa.make_server()
+    server.files["index.html"] = ('<html><body><div id="app">登录中…</div>'
+                                  '<script src="/static/app.js"></script></body></html>').encode("utf-8")
+    with running(server) as base:
+        unknown = CnipaHttpClient(cnipa.mock_storage_state(base), base_url=base).probe()
+        assert not unknown.ok and not unknown.expired
+    out = run_fee_batch([{"专利号": "CN1"}], lambda p: [], probe=lambda: unknown)
+    assert not out.session_expired and "CN1" in out.results
+    print("登录态探测测试通过")
+
+
+def test_batch_pauses_and_resumes():
+    """测试登录失效时停止派发、返回未完成专利，换登录态后只续跑剩余部分"""
+    patents = [{"专利号": f"CN2022{i:08d}"} for i in range(10)]
+    calls = []
+    session = {"alive": True, "expire_at": 4}
+
+    def query(p):
+        calls.append(p["专利号"])
+        if len(calls) == session["expire_at"]:
+            session["alive"] = False
+        if not session["alive"]:
+            raise SessionExpiredError("登录状态已失效")
+        return [{"专利号": p["专利号"], "金额": "90.00"}]
+
+    def probe():
+        return SessionHealth(ok=session["alive"], expired=not session["alive"], reason="" if session["alive"] else "已跳转到登录页")
+
+    first = run_fee_batch(patents, query, probe=probe, probe_every=2)
+    assert first.session_expired
+    assert len(first.results) == 3
+    assert [p["专利号"] for p in first.pending] == [p["专利号"] for p in patents[3:]]
+
+    # 失效时直接不启动
+    before = len(calls)
+    again = run_fee_batch(first.pending, query, probe=probe)
+    assert again.session_expired and len(calls) == before and len(again.pending) == 7
+
+    session.update(alive=True, expire_at=None)
+    calls.clear()
+    resumed = run_fee_batch(first.pending, query, probe=probe, workers=3)
+    assert not resumed.session_expired and not resumed.pending
+    assert sorted(calls) == [p["专利号"] for p in patents[3:]]
+    print("批量暂停/续跑测试通过")
+
+
+
+def test_generic_failures_trigger_probe_and_requeue():
+    """测试登录失效表现为普通错误（超时）时：连续失败即探测，确认失效后失败的专利改入 pending"""
+    patents = [{"专利号": f"CN2024{i:08d}"} for i in range(20)]
+    session = {"alive": True}
+    calls = []
+
+    def query(p):
+        calls.append(p["专利号"])
+        if len(calls) > 4:
+            session["alive"] = False
+        if not session["alive"]:
+            raise TimeoutError("等待查询输入框超时")
+        return []
+
+    def probe():
+        return SessionHealth(ok=session["alive"], expired=not session["alive"], reason="已跳转到登录页")
+
+    out = run_fee_batch(patents, query, probe=probe, probe_every=100, probe_interval=3600)
+    assert out.session_expired and len(out.results) == 4 and not out.failed
+    assert len(calls) == 7 and len(out.pending) == 16
+
+    # 登录态正常时的普通失败仍记为失败，不会反复探测
+    probes = []
+    ok = lambda: probes.append(1) or SessionHealth(ok=True, expired=False, reason="")
+    out = run_fee_batch(patents, lambda p: (_ for _ in ()).throw(TimeoutError("超时")), probe=ok,
+                        probe_every=100, probe_interval=3600)
+    assert len(out.failed) == 20 and not out.pending and len(probes) == 1 + 20 // 3
+    print("普通错误触发探测测试通过")
+
+def test_checkpoint_skips_completed():
+    """测试断点：新进程重跑时只查询未完成的专利，过期断点重新查询，残行被忽略"""
+    patents = [{"专利号": f"CN2023{i:08d}"} for i in range(6)]
+    calls = []
+
+    def crashing(p):
+        calls.append(p["专利号"])
+        if len(calls) > 2:
+            raise SessionExpiredError("登录状态已失效")
+        return [{"专利号": p["专利号"], "金额": "135.00"}]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "ckpt.jsonl"
+        run_fee_batch(patents, crashing, checkpoint=FeeCheckpoint(path))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"key": "CN2023000')  # 模拟写到一半被杀
+
+        calls.clear()
+        seen = []
+        out = run_fee_batch(patents, lambda p: calls.append(p["专利号"]) or [], checkpoint=FeeCheckpoint(path),
+                            on_result=lambda p, rows: seen.append(p["专利号"]))
+        assert out.from_checkpoint == 2 and len(calls) == 4
+        assert sorted(seen) == [p["专利号"] for p in patents]
+        assert out.results[patents[0]["专利号"]] == [{"专利号": patents[0]["专利号"], "金额": "135.00"}]
+
+        calls.clear()
+        expired = FeeCheckpoint(path, ttl_hours=0)
+        run_fee_batch(patents, lambda p: calls.append(p["专利号"]) or [], checkpoint=expired)
+        assert len(calls) == 6
+        assert FeeCheckpoint(path).compact() == 6
+    print("断点续跑测试通过")
+
+
+
+def test_checkpoint_compact_keeps_other_writers():
+    """测试压缩时保留其他实例（其他会话/进程）在压缩期间及之前追加的断点行"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "ckpt.jsonl"
+        mine, other = FeeCheckpoint(path), FeeCheckpoint(path)
+        mine.record("CN1", [{"金额": "1"}])
+        other.record("CN2", [{"金额": "2"}])
+        assert mine.compact() == 2
+
+        def append(i):
+            FeeCheckpoint(path).record(f"CN{100 + i}", [])
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(append, i) for i in range(20)]
+            for _ in range(5):
+                mine.compact()
+            for f in futures:
+                f.result()
+        assert len(FeeCheckpoint(path)) == 22
+        assert FeeCheckpoint(path).get("CN2") == [{"金额": "2"}]
+    print("断点压缩测试通过")
+
+
+if __name__ == "__main__":
+    test_probe_session_against_mock()
+    test_batch_pauses_and_resumes()
+    test_generic_failures_trigger_probe_and_requeue()
+    test_checkpoint_skips_completed()
+    test_checkpoint_compact_keeps_other_writers()
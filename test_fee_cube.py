@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+年费成本立方体测试脚本
+"""
+
+from collections import defaultdict
+from datetime import date
+
+from benchmarks.synthetic import make_monitor_entries
+from fee_cube import FeeCube, patent_type_of, parse_amount, slice_cube
+from fee_monitor_core import get_urgency_level
+
+
+def _expected(fees):
+    """直接逐行汇总原始记录（同一 (专利号, 费用种类) 只计一次）"""
+    unique = {(f["专利号"], f["费用种类"]): f for f in fees}
+    out = defaultdict(lambda: [0.0, 0])
+    for f in unique.values():
+        cell = (f["公司名称"], patent_type_of(f), f["缴费期限届满日"][:7],
+                get_urgency_level(f["缴费期限届满日"], f["当前法律状态"])["level"])
+        out[cell][0] += parse_amount(f["金额"]) or 0.0
+        out[cell][1] += 1
+    return {k: (round(v[0], 2), v[1]) for k, v in out.items()}
+
+
+def test_incremental_sync_matches_full_rebuild():
+    """测试增量同步（新增、删除、金额变化、跨来源去重）后的单元格与全量重算一致，未变化的记录不重新解析"""
+    monitor = make_monitor_entries(500)
+    query = [dict(f) for f in monitor[:50]] + make_monitor_entries(30, start=500)
+    cube = FeeCube()
+    assert cube.sync("monitor", 1, lambda: monitor)
+    assert cube.sync("query", "a", lambda: query)
+    assert cube.cells() == _expected(monitor + query)
+    assert cube.stats()["rows"] == 530 and cube.stats()["parsed"] == 530
+
+    # 版本未变：不读取记录
+    assert not cube.sync("monitor", 1, lambda: 1 / 0)
+
+    # 监控删掉 100 项（其中 20 项仍在年费查询结果中）、改一项金额、新增 5 项
+    monitor2 = monitor[30:450] + make_monitor_entries(5, start=1000)
+    monitor2[100] = dict(monitor2[100], 金额="9,999.50")
+    version = cube.version
+    assert cube.sync("monitor", 2, lambda: monitor2)
+    assert cube.version > version
+    assert cube.cells() == _expected(monitor2 + query)
+    assert cube.stats()["parsed"] == 530 + 5 + 1
+
+    cube.remove_source("query")
+    assert cube.cells() == _expected(monitor2)
+    frame = cube.frame()
+    assert frame["笔数"].sum() == len(monitor2)
+    assert abs(frame["金额"].sum() - sum(parse_amount(f["金额"]) for f in monitor2)) < 0.01
+    print("增量同步测试通过")
+
+
+def test_day_change_rebuckets_without_reparsing():
+    """测试跨天后紧急程度重新归类，只用已解析的字段"""
+    today = date.today().isoformat()
+    fees = [{"专利号": "CN202222927164.1", "费用种类": "实用新型专利第5年年费", "公司名称": "甲公司",
+             "缴费期限届满日": today, "金额": "¥135", "当前法律状态": "有权"}]
+    cube = FeeCube()
+    cube.sync("monitor", 1, lambda: fees)
+    level = next(iter(cube.cells()))[3]
+    for cell in list(cube._cells):  # 模拟昨天计算的结果
+        cube._cells[(*cell[:3], "normal")] = cube._cells.pop(cell)
+    for row in cube._rows.values():
+        row.level = "normal"
+    cube._day = date(2000, 1, 1)
+    version = cube.version
+    assert next(iter(cube.cells()))[3] == level and cube.version > version
+    assert cube.stats()["parsed"] == 1
+    print("跨天重新归类测试通过")
+
+
+def test_slice_and_parsing():
+    """测试切片汇总与金额、专利类型解析"""
+    fees = make_monitor_entries(300)
+    cube = FeeCube()
+    cube.sync("monitor", 1, lambda: fees)
+    frame = cube.frame()
+    company = frame["公司名称"].cat.categories[0]
+    months = sorted(frame["缴费月份"].astype(str).unique())
+    start, end = months[1], months[3]
+    want = [f for f in fees if f["公司名称"] == company and start <= f["缴费期限届满日"][:7] <= end]
+    total = slice_cube(frame, [], 公司名称=[company], 缴费月份=(start, end))
+    assert int(total["笔数"].iloc[0]) == len(want)
+    assert abs(float(total["金额"].iloc[0]) - sum(float(f["金额"]) for f in want)) < 0.01
+    by_type = slice_cube(frame, ["专利类型"])
+    assert by_type["笔数"].sum() == len(fees)
+
+    assert parse_amount("1,200.00") == 1200.0 and parse_amount("¥135") == 135.0 and parse_amount("") is None
+    assert patent_type_of({"费用种类": "发明专利第3年年费滞纳金"}) == "发明"
+    assert patent_type_of({"费用种类": "年费", "专利号": "CN202130000001.0"}) == "外观设计"
+    print("切片测试通过")
+
+
+if __name__ == "__main__":
+    test_incremental_sync_matches_full_rebuild()
+    test_day_change_rebuckets_without_reparsing()
+    test_slice_and_parsing()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+多进程年费查询测试脚本（HTTP 后端 + 本地模拟站点，无需浏览器）
+"""
+
+import os
+import subprocess
+import sys
+
+from fee_batch import run_fee_batch
+from fee_pool import BrowserWorker, child_pids, make_fee_pool, process_tree_rss_mb, worker_query
+from mock_servers import cnipa
+from mock_servers.common import running
+
+
+def _query(patent):
+    return worker_query(patent["专利号"])
+
+
+def test_process_pool_streams_results():
+    """测试进程池分发查询、结果逐个回传，以及内存统计可用"""
+    with running(cnipa.make_server()) as base:
+        old = os.environ.get("CNIPA_FEE_API_URL")
+        os.environ["CNIPA_FEE_API_URL"] = base + cnipa.FEE_API_PATH
+        try:
+            patents = [{"专利号": f"20221{i:07d}1"} for i in range(12)]
+            seen = []
+            with make_fee_pool(cnipa.mock_storage_state(base), "http", workers=2) as pool:
+                assert pool.workers == 2
+                out = run_fee_batch(patents, _query, executor=pool, workers=pool.workers,
+                                    on_result=lambda p, rows: seen.append(p["专利号"]))
+        finally:
+            if old is None:
+                os.environ.pop("CNIPA_FEE_API_URL", None)
+            else:
+                os.environ["CNIPA_FEE_API_URL"] = old
+    assert not out.failed and len(out.results) == 12
+    assert sorted(seen) == sorted(p["专利号"] for p in patents)
+    assert all(rows and "费用种类" in rows[0] for rows in out.results.values())
+    if os.path.exists("/proc"):
+        assert process_tree_rss_mb() > 0
+    print("进程池查询测试通过")
+
+
+def test_worker_rss_counts_only_own_browser():
+    """测试线程模式下每个 BrowserWorker 只按自己的驱动进程树计算内存，不计入同进程内其他浏览器"""
+    if not os.path.exists("/proc"):
+        print("非 Linux，跳过")
+        return
+    code = "import sys, time; b = bytearray(%d); sys.stdout.write('ok'); sys.stdout.flush(); time.sleep(30)"
+    mine = subprocess.Popen([sys.executable, "-c", code % (1 << 20)], stdout=subprocess.PIPE)
+    other = subprocess.Popen([sys.executable, "-c", code % (200 << 20)], stdout=subprocess.PIPE)
+    worker = BrowserWorker(None, False, max_rss_mb=100)
+    try:
+        mine.stdout.read(2)
+        other.stdout.read(2)
+        assert {mine.pid, other.pid} <= child_pids()
+        worker._own_pids = {mine.pid}
+        assert 0 < worker.rss_mb() < 100 < process_tree_rss_mb()
+    finally:
+        worker.loop.close()
+        for p in (mine, other):
+            p.kill()
+            p.wait()
+    print("单个浏览器内存统计测试通过")
+
+
+if __name__ == "__main__":
+    test_process_pool_streams_results()
+    test_worker_rss_counts_only_own_browser()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+年费日历预测测试脚本
+"""
+
+from datetime import date
+
+import pandas as pd
+
+from benchmarks.synthetic import make_baiten_payload
+from data_utils import build_dataframe, normalize_baiten_payload
+from fee_projection import annual_fee, parse_fee_kind, project_fees, rollup_by_company_year, rollup_by_year
+
+
+def _patent(no, ptype, filed, status="有权", company="甲公司"):
+    return {"专利号": no, "公司名称": company, "专利类型": ptype, "申请时间": filed, "当前法律状态": status}
+
+
+def test_schedule_matches_cnipa_listing():
+    """测试由已知应缴费确定当前年度与费减比例，缴费期限为申请日周年对应日，至保护期届满为止"""
+    patents = pd.DataFrame([
+        _patent("CN202222927164.1", "实用新型", "2022-12-03"),
+        _patent("CN201610000001.X", "发明", "2016-02-29", company="乙公司"),
+        _patent("CN202130000001.0", "外观设计", "2021-06-01"),
+        _patent("CN202130000002.0", "外观设计", "2021-05-31"),
+        _patent("CN201610000002.X", "发明", "2016-03-01", status="专利权终止无权"),
+    ])
+    fees = [{"专利号": "CN202222927164.1", "费用种类": "实用新型专利第4年年费", "金额": "135.00"},
+            {"专利号": "CN202222927164.1", "费用种类": "实用新型专利第4年年费滞纳金", "金额": "45.00"}]
+    proj = project_fees(patents, fees, today=date(2026, 10, 19))
+
+    um = proj[proj["专利号"] == "CN202222927164.1"]
+    assert list(um["年度"]) == list(range(4, 11))
+    assert str(um["缴费期限届满日"].iloc[0].date()) == "2025-12-03"
+    assert list(um["金额"]) == [135.0, 135.0, 180.0, 180.0, 180.0, 300.0, 300.0]  # 费减后 15%
+    assert um["费用种类"].iloc[1] == "实用新型专利第5年年费"
+
+    inv = proj[proj["专利号"] == "CN201610000001.X"]
+    assert inv["年度"].iloc[0] == 12 and inv["年度"].iloc[-1] == 20
+    assert [str(d.date()) for d in inv["缴费期限届满日"].iloc[:2]] == ["2027-02-28", "2028-02-29"]
+    assert inv["金额"].iloc[0] == annual_fee("发明", 12)
+
+    assert proj[proj["专利号"] == "CN202130000001.0"]["年度"].max() == 15
+    assert proj[proj["专利号"] == "CN202130000002.0"]["年度"].max() == 10
+    assert "CN201610000002.X" not in set(proj["专利号"])
+    assert parse_fee_kind("外观设计专利第11年年费") == ("外观设计", 11)
+    print("年费计划测试通过")
+
+
+def test_rollups_match_groupby():
+    """测试按年份、按公司×年份汇总与 pandas groupby 一致"""
+    df = build_dataframe(normalize_baiten_payload(make_baiten_payload(5000))[0])
+    proj = project_fees(df, today=date(2026, 1, 1), until=date(2035, 12, 31))
+    assert len(proj) and proj["缴费期限届满日"].max() <= pd.Timestamp("2035-12-31")
+    year = proj["缴费期限届满日"].dt.year
+    want = proj.groupby(year)["金额"].agg(["size", "sum"])
+    got = rollup_by_year(proj).set_index("年份")
+    assert list(got.index) == list(want.index)
+    assert (got["笔数"] == want["size"]).all() and (got["金额"] - want["sum"]).abs().max() < 0.01
+
+    want = proj.groupby([proj["公司名称"].astype(str), year])["金额"].sum()
+    got = rollup_by_company_year(proj).set_index(["公司名称", "年份"])["金额"]
+    assert len(got) == len(want) and (got - want.reindex(got.index)).abs().max() < 0.01
+    print("年费汇总测试通过")
+
+
+if __name__ == "__main__":
+    test_schedule_matches_cnipa_listing()
+    test_rollups_match_groupby()
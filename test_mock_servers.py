@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟服务测试脚本
+"""
+
+import requests
+
+from baiten_api import search_baiten_post, DEFAULT_APP_KEY, DEFAULT_APP_SECRET
+from data_utils import normalize_baiten_payload
+from mock_servers import baiten, cnipa
+from mock_servers.common import running
+
+
+def test_baiten_mock_contract():
+    """测试检索接口签名校验、分页与标准化"""
+    cfg = baiten.BaitenConfig(docs=200, sign_upper=True)
+    with running(baiten.make_server(config=cfg)) as base:
+        resp = search_baiten_post(DEFAULT_APP_KEY, DEFAULT_APP_SECRET, "*", url=base + baiten.SEARCH_PATH,
+                                  page_index=2, page_size=50)
+        assert resp["ok"]
+        # 服务端只接受大写签名，客户端第二轮才通过
+        assert resp["which"] == {"encoding": "utf-8", "upper": True}
+        records, total = normalize_baiten_payload(resp["response"])
+        assert total == 200 and len(records) == 10
+        assert records[0]["申请时间"] >= records[-1]["申请时间"]
+        print("百腾模拟服务测试通过")
+
+
+def test_cnipa_mock_site():
+    """测试 CNIPA 模拟站点的登录态与费用接口"""
+    with running(cnipa.make_server()) as base:
+        assert "登录" in requests.get(base + "/od/public/index", timeout=5).text
+        r = requests.post(base + cnipa.FEE_API_PATH, json={"appNo": "2022229271641"}, timeout=5)
+        assert r.status_code == 401
+
+        s = requests.Session()
+        s.cookies.set("SESSION", "x")
+        assert "退出" in s.get(base + "/od/public/index", timeout=5).text
+        rows = s.post(base + cnipa.FEE_API_PATH, json={"appNo": "CN202222927164.1"}, timeout=5).json()["data"]
+        assert rows and rows[0]["feeName"].startswith("实用新型专利第")
+        print("CNIPA 模拟站点测试通过")
+
+
+if __name__ == "__main__":
+    test_baiten_mock_contract()
+    test_cnipa_mock_site()
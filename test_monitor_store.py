@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+年费监控数据多进程并发写入测试脚本
+"""
+
+import multiprocessing
+import os
+import tempfile
+
+from fee_monitor_core import FeeMonitor
+
+
+def _add_many(path: str, start: int, n: int):
+    monitor = FeeMonitor(data_file=path)
+    for i in range(start, start + n):
+        monitor.add_monitored_fee({"专利号": f"CN{i:012d}", "费用种类": "年费", "缴费期限届满日": "2030-01-01"})
+
+
+def test_processes_do_not_lose_writes():
+    """测试多个进程各自持有监控实例并发添加，全部写入都保留"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "monitor.json")
+        procs = [multiprocessing.Process(target=_add_many, args=(path, k * 50, 50)) for k in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(60)
+            assert p.exitcode == 0
+        assert len(FeeMonitor(data_file=path).monitored_fees) == 200
+    print("多进程并发写入测试通过")
+
+
+def test_reload_and_optimistic_save():
+    """测试其他实例的修改随即可见；整体写回时检测到冲突不覆盖；按键删除"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "monitor.json")
+        errors = []
+        a = FeeMonitor(data_file=path, on_error=errors.append)
+        b = FeeMonitor(data_file=path, on_error=errors.append)
+        assert a.add_monitored_fee({"专利号": "CN1", "费用种类": "年费"})
+        assert b.monitored_keys() == {("CN1", "年费")}
+        assert not b.add_monitored_fee({"专利号": "CN1", "费用种类": "年费"})
+
+        # b 在旧数据上整体改写，a 在此期间写入了新项：b 的保存被拒绝并重新加载
+        b.monitored_fees.append({"专利号": "CN2", "费用种类": "年费"})
+        a.add_monitored_fee({"专利号": "CN3", "费用种类": "年费"})
+        assert not b.save_monitored_fees() and errors
+        assert b.monitored_keys() == {("CN1", "年费"), ("CN3", "年费")}
+
+        assert b.remove_by_key("CN1", "年费")
+        assert not a.remove_by_key("CN1", "年费")
+        assert a.monitored_keys() == {("CN3", "年费")}
+    print("重新加载与乐观并发测试通过")
+
+
+def test_bulk_add_writes_once():
+    """测试批量添加一次写入，已存在与批内重复的项被忽略"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "monitor.json")
+        monitor = FeeMonitor(data_file=path)
+        monitor.add_monitored_fee({"专利号": "CN1", "费用种类": "年费"})
+        version = monitor.version
+        fees = [{"专利号": f"CN{i}", "费用种类": "年费"} for i in range(500)]
+        assert monitor.add_monitored_fees(fees + fees[:10]) == (499, 11)
+        assert monitor.version == version + 1
+        assert len(FeeMonitor(data_file=path).monitored_fees) == 500
+    print("批量添加测试通过")
+
+
+
+def test_save_keeps_file_mode():
+    """测试原子写入沿用原文件权限，新文件为 0644（而非临时文件的 0600）"""
+    if os.name == "nt":
+        print("Windows，跳过")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "monitor.json")
+        monitor = FeeMonitor(data_file=path)
+        monitor.add_monitored_fee({"专利号": "CN1", "费用种类": "年费"})
+        assert os.stat(path).st_mode & 0o777 == 0o644
+        os.chmod(path, 0o664)
+        monitor.add_monitored_fee({"专利号": "CN2", "费用种类": "年费"})
+        assert os.stat(path).st_mode & 0o777 == 0o664
+    print("文件权限测试通过")
+
+
+def test_failed_save_rolls_back():
+    """测试保存失败时内存中的修改被撤销、返回失败，不会留下未落盘的监控项"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "monitor.json")
+        errors = []
+        monitor = FeeMonitor(data_file=path, on_error=errors.append)
+        assert monitor.add_monitored_fee({"专利号": "CN1", "费用种类": "年费"})
+        monitor._write = lambda: False  # 模拟磁盘写满等写入失败
+        assert not monitor.add_monitored_fee({"专利号": "CN2", "费用种类": "年费"})
+        assert monitor.add_monitored_fees([{"专利号": "CN3", "费用种类": "年费"}]) == (0, 0)
+        assert not monitor.remove_by_key("CN1", "年费")
+        assert not monitor.clear()
+        assert [f["专利号"] for f in monitor.snapshot()] == ["CN1"]
+    print("保存失败回滚测试通过")
+
+if __name__ == "__main__":
+    test_processes_do_not_lose_writes()
+    test_reload_and_optimistic_save()
+    test_bulk_add_writes_once()
+    test_save_keeps_file_mode()
+    test_failed_save_rolls_back()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+年费监控列表（整表筛选/排序/分页）测试脚本
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from fee_monitor import monitor_table, query_monitor_table, urgency_frame
+from fee_monitor_core import FeeMonitor, get_urgency_level
+
+
+def _fees(n: int):
+    today = datetime.now()
+    statuses = ["专利权维持", "专利权无权", "已失效", ""]
+    out = []
+    for i in range(n):
+        due = (today + timedelta(days=i % 200 - 20)).strftime("%Y-%m-%d") if i % 37 else ("" if i % 2 else "2024/01/01")
+        out.append({"专利号": f"CN{i:08d}", "专利名称": f"装置{i}", "公司名称": f"公司{i % 7}", "费用种类": "年费",
+                    "缴费期限届满日": due, "当前法律状态": statuses[i % 4], "金额": str(900 + i % 3)})
+    return out
+
+
+def test_urgency_frame_matches_scalar():
+    """测试批量紧急程度与逐项 get_urgency_level 一致"""
+    fees = _fees(500)
+    today = datetime.now()
+    df = pd.DataFrame(fees)
+    got = urgency_frame(df["缴费期限届满日"], df["当前法律状态"], today)
+    for i, fee in enumerate(fees):
+        want = get_urgency_level(fee["缴费期限届满日"], fee["当前法律状态"], today)
+        row = got.iloc[i]
+        assert (row["level"], row["text"], row["color"]) == (want["level"], want["text"], want["color"])
+        assert (None if pd.isna(row["days_left"]) else row["days_left"]) == want["days_left"]
+    print("批量紧急程度测试通过")
+
+
+def test_monitor_table_order_filter_and_cache():
+    """测试表格默认顺序与逐项排序一致、筛选排序正确、数据变化后缓存失效"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "monitor.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(_fees(3000), f, ensure_ascii=False)
+        monitor = FeeMonitor(data_file=path)
+        table = monitor_table(monitor)
+        assert list(table["专利号"]) == [f["专利号"] for f in monitor.get_monitored_fees_with_urgency()]
+        assert monitor_table(monitor) is table
+
+        view = query_monitor_table(table, ["overdue"], "公司3", "金额", True)
+        assert len(view) and set(view["_level"]) == {"overdue"} and view["公司名称"].eq("公司3").all()
+        assert view["_amount"].is_monotonic_decreasing
+
+        other = FeeMonitor(data_file=path)
+        assert other.remove_by_key("CN00000001", "年费")
+        table2 = monitor_table(monitor)
+        assert table2 is not table and len(table2) == 2999
+    print("监控表格测试通过")
+
+
+if __name__ == "__main__":
+    test_urgency_frame_matches_scalar()
+    test_monitor_table_order_filter_and_cache()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+本地专利库与增量同步测试脚本
+"""
+
+import tempfile
+from pathlib import Path
+
+from benchmarks.synthetic import make_baiten_payload
+from data_utils import normalize_baiten_payload
+from patent_store import PatentStore, sync_query
+
+
+def _pages(records, fetched):
+    """模拟按申请日倒序逐页检索，记录实际取了多少页。"""
+    for i in range(0, len(records), 10):
+        fetched.append(i // 10 + 1)
+        yield records[i:i + 10]
+
+
+def test_incremental_sync_stops_at_known_records():
+    """测试首次全量同步、再次同步遇到已知且未变的页即停止，只写入新增与变化"""
+    records, _ = normalize_baiten_payload(make_baiten_payload(300))
+    records.sort(key=lambda r: r["申请时间"], reverse=True)
+    with tempfile.TemporaryDirectory() as tmp, PatentStore(Path(tmp) / "store.sqlite3") as store:
+        fetched = []
+        first = sync_query(store, "*", _pages(records[12:], fetched))
+        assert first.full and first.new == 288 and len(fetched) == 29
+
+        # 新申请了 12 件，另有一件较新的专利法律状态变化
+        changed = dict(records[15], 当前法律状态="专利权终止无权")
+        latest = records[:12] + [changed] + records[12:15] + records[16:]
+        fetched.clear()
+        second = sync_query(store, "*", _pages(latest, fetched))
+        assert second.stopped_early and not second.full
+        assert second.new == 12 and second.changed == 1
+        assert len(fetched) == 3  # 第 3 页全部已知即停止，不再请求后续页
+        assert store.get(changed["专利号"])["当前法律状态"] == "专利权终止无权"
+
+        hits = store.records_for_query("*")
+        assert len(hits) == 300 and hits[0]["专利号"] == records[0]["专利号"]
+        assert store.last_sync("*")["new"] == 12
+    print("增量同步测试通过")
+
+
+if __name__ == "__main__":
+    test_incremental_sync_stops_at_known_records()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+大批量专利组合检索（检索式切分 + 并发翻页）测试脚本
+"""
+
+from mock_servers import baiten
+from mock_servers.common import running
+from portfolio_harvest import harvest_portfolio
+
+
+def test_harvest_beyond_result_window():
+    """测试命中数超过可翻页范围时自动切分，取全全部记录且按专利号去重"""
+    config = baiten.BaitenConfig(docs=3000, max_result_window=200)
+    with running(baiten.make_server(config=config)) as base:
+        url = base + baiten.SEARCH_PATH
+        pages = []
+        out = harvest_portfolio("*", url=url, max_window=200, workers=8,
+                                on_records=lambda recs, res: pages.append(len(recs)))
+    assert out.total_reported == 3000 and out.covered == 3000
+    assert len(out.records) == 3000 == len({r["专利号"] for r in out.records})
+    assert out.partitions > 1 and not out.truncated and not out.failed_pages
+    assert sum(pages) == 3000
+    print(f"切分检索测试通过：{out.partitions} 个子查询，{out.requests} 次请求")
+
+
+def test_small_query_uses_plain_paging():
+    """测试命中数在可翻页范围内时不切分，直接并发翻页"""
+    with running(baiten.make_server(config=baiten.BaitenConfig(docs=3000))) as base:
+        out = harvest_portfolio("安徽测试001", url=base + baiten.SEARCH_PATH, max_window=200)
+    assert out.partitions == 1 and len(out.records) == out.total_reported > 0
+    assert out.requests == -(-out.total_reported // 10)
+    print("小查询翻页测试通过")
+
+
+if __name__ == "__main__":
+    test_harvest_beyond_result_window()
+    test_small_query_uses_plain_paging()
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+CNIPA 浏览器资源拦截策略测试脚本
+"""
+
+from cnipa_fee_query import ResourcePolicy
+
+
+def test_resource_policy():
+    """测试按资源类型与第三方域名拦截，第一方文档/脚本/接口放行"""
+    policy = ResourcePolicy(first_party=("cpquery.cnipa.gov.cn", "cnipa.gov.cn"))
+    base = "https://interactive.cponline.cnipa.gov.cn"
+    assert not policy.should_block("document", base + "/od/public/index")
+    assert not policy.should_block("script", base + "/static/app.js")
+    assert not policy.should_block("xhr", base + "/od/api/fee/dueFees")
+    assert not policy.should_block("stylesheet", base + "/static/site.css")
+    assert policy.should_block("image", base + "/static/banner.jpg")
+    assert policy.should_block("font", base + "/static/font.woff2")
+    assert policy.should_block("script", "https://hm.baidu.com/hm.js")
+    third_party_only = ResourcePolicy(block_types=frozenset(), first_party=("cnipa.gov.cn",))
+    assert not third_party_only.should_block("image", "data:image/png;base64,AAAA")
+
+    off = ResourcePolicy(block_types=frozenset(), block_third_party=False)
+    assert not off.active
+    assert not off.should_block("image", "https://hm.baidu.com/a.png")
+    print("资源拦截策略测试通过")
+
+
+if __name__ == "__main__":
+    test_resource_policy()
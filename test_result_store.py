@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+进程内共享结果存储与共享监控实例测试脚本
+"""
+
+import gc
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synthetic import make_baiten_payload
+from data_utils import build_dataframe, normalize_baiten_payload
+from fee_monitor_core import FeeMonitor
+from result_store import ResultStore
+
+
+def test_identical_results_are_stored_once():
+    """测试多个会话放入相同内容只保存一份，句柄释放或被回收后引用计数归零即清除"""
+    records, _ = normalize_baiten_payload(make_baiten_payload(500))
+    store = ResultStore()
+    # 模拟 30 个会话各自检索到同一个组合（各自构建的 DataFrame）
+    handles = [store.put(build_dataframe(records)) for _ in range(30)]
+    assert len(store) == 1 and store.stats()["refs"] == 30
+    assert len({h.key for h in handles}) == 1
+
+    view = handles[0].value
+    view["临时列"] = 1  # 视图的列结构不影响共享结果
+    assert "临时列" not in handles[1].value.columns
+
+    fees = store.put([{"专利号": "1", "金额": "900"}])
+    assert isinstance(fees.value, tuple) and len(store) == 2
+    fees.release()
+    fees.release()  # 重复释放无效
+    assert len(store) == 1
+
+    for h in handles[:-1]:
+        h.release()
+    assert store.stats()["refs"] == 1
+    del handles, h
+    gc.collect()
+    assert len(store) == 0
+    print("共享结果存储测试通过")
+
+
+def test_shared_monitor_concurrent_adds():
+    """测试多个线程共用一个监控实例并发添加，不丢失、不重复"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "monitor.json")
+        monitor = FeeMonitor(data_file=path)
+        fees = [{"专利号": f"CN{i:012d}", "费用种类": "年费", "缴费期限届满日": "2030-01-01"} for i in range(200)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            added = list(pool.map(lambda f: monitor.add_monitored_fee(dict(f)), fees + fees))
+        assert sum(added) == 200
+        assert len(FeeMonitor(data_file=path).monitored_fees) == 200
+        monitor.clear()
+        assert FeeMonitor(data_file=path).monitored_fees == []
+    print("共享监控实例并发测试通过")
+
+
+
+def test_derived_keeps_latest_stamp_only():
+    """测试同名派生数据只保留最新 stamp 的一份，stamp 不变时不重复计算"""
+    store = ResultStore()
+    handle = store.put([1, 2, 3])
+    calls = []
+
+    def total(ratio):
+        return lambda v: calls.append(ratio) or sum(v) * ratio
+
+    assert handle.derived("projection", total(1), stamp=1) == 6
+    assert handle.derived("projection", total(1), stamp=1) == 6
+    for ratio in range(2, 50):
+        assert handle.derived("projection", total(ratio), stamp=ratio) == 6 * ratio
+    assert calls == list(range(1, 50))
+    assert len(store._entries[handle.key].derived) == 1
+    print("派生数据替换测试通过")
+
+if __name__ == "__main__":
+    test_identical_results_are_stored_once()
+    test_shared_monitor_concurrent_adds()
+    test_derived_keeps_latest_stamp_only()
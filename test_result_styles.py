@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+检索结果表格着色测试脚本
+"""
+
+from benchmarks.run import _legacy_style_table
+from benchmarks.synthetic import make_baiten_payload
+from data_utils import apply_filters, build_dataframe, normalize_baiten_payload, result_styles
+from result_store import ResultStore
+
+
+def test_style_arrays_match_cell_callbacks():
+    """测试整列样式数组与旧版逐格回调的着色结果一致，且随结果集只计算一次、可按筛选后的行取子集"""
+    df = build_dataframe(normalize_baiten_payload(make_baiten_payload(2000))[0])
+    df.loc[df.index[:5], "当前法律状态"] = None  # 非字符串不着色
+
+    calls = []
+
+    def compute(value):
+        calls.append(1)
+        return result_styles(value)
+
+    handle = ResultStore().put(df)
+    styles = handle.derived("styles", compute)
+    assert handle.derived("styles", compute) is styles and len(calls) == 1
+
+    sub = apply_filters(handle.value, {"专利类型": ["发明"]})
+    legacy = _legacy_style_table(sub)
+    legacy._compute()
+    part = styles.loc[sub.index]
+    current = sub.style.apply(lambda _: part, axis=None, subset=list(part.columns))
+    current._compute()
+    assert legacy.ctx == current.ctx and len(current.ctx) > 0
+    print("表格着色测试通过")
+
+
+if __name__ == "__main__":
+    test_style_arrays_match_cell_callbacks()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+耗时统计模块测试脚本
+"""
+
+import asyncio
+
+import timing
+
+
+def test_timing_spans():
+    """测试 span / timed 记录与导出"""
+    timing.reset()
+    timing.enable(False)
+    with timing.span("off"):
+        pass
+    assert "off" not in timing.snapshot()
+
+    timing.enable()
+    try:
+        @timing.timed("test.sync")
+        def f(x):
+            return x * 2
+
+        @timing.timed("test.async")
+        async def g():
+            return "ok"
+
+        assert f(2) == 4
+        assert asyncio.run(g()) == "ok"
+        with timing.span("test.span"):
+            pass
+
+        snap = timing.snapshot()
+        assert snap["test.sync"]["count"] == 1
+        assert snap["test.async"]["count"] == 1
+        assert sum(snap["test.span"]["buckets"].values()) == 1
+        prom = timing.to_prometheus()
+        assert 'patent_fee_stage_seconds_count{stage="test.sync"} 1' in prom
+        assert 'le="+Inf"' in prom
+        print("耗时统计测试通过")
+    finally:
+        timing.enable(False)
+        timing.reset()
+
+
+if __name__ == "__main__":
+    test_timing_spans()
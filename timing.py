@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+热点路径耗时统计（轻量 span / 计时器）
+
+用法：
+    from timing import span, timed
+
+    with span("baiten.http"):
+        ...
+
+    @timed("cnipa.extract_fee_rows")
+    async def _extract_fee_rows(page): ...
+
+默认关闭，关闭时 span() 返回共享的空对象、timed() 包装只多一次布尔判断。
+开启方式：环境变量 PATENT_FEE_TIMING=1，或调用 enable()。
+设置 PATENT_FEE_TIMING_DUMP=path（.json 或 .prom）会在进程退出时写出统计结果。
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+# 直方图桶上界（秒），覆盖毫秒级的 pandas 操作到数十秒的页面导航
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# inspect.CO_COROUTINE；避免为一个标志位导入 inspect
+_CO_COROUTINE = 0x80
+# 每个阶段保留最近的样本用于计算分位数
+RESERVOIR_SIZE = 2048
+
+_enabled = os.getenv("PATENT_FEE_TIMING", "").strip() not in ("", "0", "false", "False")
+_lock = threading.Lock()
+_stats: Dict[str, "_StageStats"] = {}
+
+
+class _StageStats:
+    __slots__ = ("count", "total", "min", "max", "buckets", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # 最后一个为 +Inf
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.recent.append(seconds)
+
+
+def enable(on: bool = True):
+    global _enabled
+    _enabled = bool(on)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def record(name: str, seconds: float):
+    """记录一次耗时（秒）。关闭状态下直接返回。"""
+    if not _enabled:
+        return
+    with _lock:
+        st = _stats.get(name)
+        if st is None:
+            st = _stats[name] = _StageStats()
+        st.add(seconds)
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str):
+    """计时上下文管理器；异常同样计入耗时。"""
+    return _Span(name) if _enabled else _NOOP
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """函数计时装饰器，支持普通函数与协程函数。"""
+    def deco(fn):
+        stage = name or f"{fn.__module__}.{fn.__qualname__}"
+        if getattr(getattr(fn, "__code__", None), "co_flags", 0) & _CO_COROUTINE:
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                t0 = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    record(stage, time.perf_counter() - t0)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(stage, time.perf_counter() - t0)
+        return wrapper
+    return deco
+
+
+def _quantile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """返回各阶段统计：次数、总耗时、min/max/均值、p50/p95/p99（秒）及直方图。"""
+    with _lock:
+        items = [(k, v.count, v.total, v.min, v.max, list(v.buckets), sorted(v.recent)) for k, v in _stats.items()]
+    out = {}
+    for name, count, total, mn, mx, buckets, recent in sorted(items):
+        out[name] = {
+            "count": count,
+            "sum": total,
+            "min": mn if count else 0.0,
+            "max": mx,
+            "mean": total / count if count else 0.0,
+            "p50": _quantile(recent, 0.50),
+            "p95": _quantile(recent, 0.95),
+            "p99": _quantile(recent, 0.99),
+            "buckets": {("+Inf" if i == len(BUCKETS) else str(BUCKETS[i])): n for i, n in enumerate(buckets)},
+        }
+    return out
+
+
+def to_json() -> str:
+    return json.dumps({"generated_at": time.time(), "stages": snapshot()}, ensure_ascii=False, indent=2)
+
+
+def to_prometheus(metric: str = "patent_fee_stage_seconds") -> str:
+    """导出 Prometheus 文本格式（histogram，累计桶）。"""
+    lines = [f"# HELP {metric} Latency of instrumented pipeline stages.", f"# TYPE {metric} histogram"]
+    for name, s in snapshot().items():
+        cum = 0
+        for le, n in s["buckets"].items():
+            cum += n
+            lines.append(f'{metric}_bucket{{stage="{name}",le="{le}"}} {cum}')
+        lines.append(f'{metric}_sum{{stage="{name}"}} {s["sum"]:.6f}')
+        lines.append(f'{metric}_count{{stage="{name}"}} {s["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def dump(path: str):
+    """按扩展名写出统计：.prom / .txt 为 Prometheus 文本，其余为 JSON。"""
+    text = to_prometheus() if str(path).endswith((".prom", ".txt")) else to_json()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+_dump_path = os.getenv("PATENT_FEE_TIMING_DUMP")
+if _dump_path:
+    atexit.register(lambda: dump(_dump_path))